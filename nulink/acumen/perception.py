@@ -19,7 +19,8 @@ import random
 import weakref
 from collections import deque
 from collections.abc import KeysView
-from typing import Optional, Dict, Iterable, List, Tuple, NamedTuple, Union, Any
+from threading import RLock
+from typing import Optional, Dict, Iterable, List, Tuple, NamedTuple, Union, Any, Callable, Hashable
 
 import maya
 from eth_typing import ChecksumAddress
@@ -34,7 +35,8 @@ class ArchivedFleetState(NamedTuple):
     checksum: str
     nickname: Nickname
     timestamp: maya.MayaDT
-    population: int
+    population: Optional[int]  # unknown for the remote states learned from partial responses
+    nodes_updated: Tuple[ChecksumAddress, ...] = ()  # nodes added or updated since the previous archived state
 
     def to_json(self):
         return dict(checksum=bytes(self.checksum).hex(),
@@ -82,21 +84,41 @@ class FleetState:
     def __init__(self,
                  nodes: Dict[ChecksumAddress, 'Ursula'],
                  this_node_ref: Optional[weakref.ReferenceType],
-                 this_node_metadata: Optional[NodeMetadata]):
-        self.checksum = FleetStateChecksum(this_node=this_node_metadata,
-                                           other_nodes=[node.metadata() for node in nodes.values()])
-        self.nickname = Nickname.from_seed(bytes(self.checksum), length=1)
+                 this_node_metadata: Optional[NodeMetadata],
+                 checksum: Optional[FleetStateChecksum] = None):
         self._nodes = nodes
         self.timestamp = maya.now()
         self._this_node_ref = this_node_ref
         self._this_node_metadata = this_node_metadata
 
-    def archived(self) -> ArchivedFleetState:
+        # Calculated on demand
+        self._checksum = checksum
+        self._nickname = None
+
+    @property
+    def checksum(self) -> FleetStateChecksum:
+        # The checksum peers compare is a hash of the whole sorted list of node metadata,
+        # so it cannot be updated incrementally without breaking compatibility with them.
+        # Instead, it is calculated at most once per state, and is carried over
+        # to the next state when the fleet has not changed.
+        if self._checksum is None:
+            self._checksum = FleetStateChecksum(this_node=self._this_node_metadata,
+                                                other_nodes=[node.metadata() for node in self._nodes.values()])
+        return self._checksum
+
+    @property
+    def nickname(self) -> Nickname:
+        if self._nickname is None:
+            self._nickname = Nickname.from_seed(bytes(self.checksum), length=1)
+        return self._nickname
+
+    def archived(self, nodes_updated: Iterable[ChecksumAddress] = ()) -> ArchivedFleetState:
         # 存储所有节点的 以太坊地址和节点个数
         return ArchivedFleetState(checksum=self.checksum,
                                   nickname=self.nickname,
                                   timestamp=self.timestamp,
-                                  population=self.population)
+                                  population=self.population,
+                                  nodes_updated=tuple(nodes_updated))
 
     def _calculate_diff(self,
                         this_node_updated: bool,
@@ -139,19 +161,21 @@ class FleetState:
 
         diff = self._calculate_diff(this_node_updated, nodes_to_add, nodes_to_remove)
 
-        if not diff.empty():
-            # TODO: if nodes were kept in a Merkle tree,
-            # we'd have to only recalculate log(N) checksums.
-            # Is it worth it?
-            nodes = dict(self._nodes)
-            nodes_to_add_dict = {node.checksum_address: node for node in nodes_to_add}
-            for checksum_address in diff.nodes_updated:
-                new_node = nodes_to_add_dict[checksum_address]
-                nodes[checksum_address] = new_node
-            for checksum_address in diff.nodes_removed:
-                del nodes[checksum_address]
-        else:
-            nodes = self._nodes
+        if diff.empty():
+            # Nothing has changed, so the checksum of the current state is still valid.
+            new_state = FleetState(nodes=self._nodes,
+                                   this_node_ref=self._this_node_ref,
+                                   this_node_metadata=this_node_metadata,
+                                   checksum=self._checksum)
+            return new_state, diff
+
+        nodes = dict(self._nodes)
+        nodes_to_add_dict = {node.checksum_address: node for node in nodes_to_add}
+        for checksum_address in diff.nodes_updated:
+            new_node = nodes_to_add_dict[checksum_address]
+            nodes[checksum_address] = new_node
+        for checksum_address in diff.nodes_removed:
+            del nodes[checksum_address]
 
         new_state = FleetState(nodes=nodes,
                                this_node_ref=self._this_node_ref,
@@ -222,12 +246,15 @@ class FleetSensor:
     """
     log = Logger("Learning")
 
+    # Also limits how far back the fleet state diffs can be served to learners.
+    _ARCHIVED_STATES_LIMIT = 32
+
     def __init__(self, domain: str, this_node: Optional['Ursula'] = None):
 
         self._domain = domain
 
         self._current_state = FleetState.new(this_node)
-        self._archived_states = deque([self._current_state.archived()], maxlen=5)  # 存储所有节点的 以太坊地址和节点个数
+        self._archived_states = deque([self._current_state.archived()], maxlen=self._ARCHIVED_STATES_LIMIT)  # 存储所有节点的 以太坊地址和节点个数
         self._remote_states = {}
         self._remote_last_seen = {}
 
@@ -237,20 +264,30 @@ class FleetSensor:
 
         self._auto_update_state = False
 
+        # Nodes are recorded and marked from the learning threads as well as the reactor's.
+        self._lock = RLock()
+
+        # Signed metadata responses for the current fleet state, cleared every time it changes.
+        self._metadata_responses = {}
+
+        # Nodes removed from the fleet state so far, for learners to tell whether they forgot any
+        self.nodes_forgotten = 0
+
     def record_node(self, node: 'Ursula'):
         #  domain is network  e.g. mainnet
         if node.domain == self._domain:
-            # Replace the existing object with a newer object, even if they're equal
-            # (this object can be mutated externally).
-            # This behavior is supposed to be consistent with that of the node storage
-            # (where a newer object with the same `checksum_address` replaces an older one).
-            if node in self._nodes_to_add:
-                self._nodes_to_add.remove(node)
-            self._nodes_to_add.add(node)
-
-            if self._auto_update_state:
-                self.log.info(f"Updating fleet state after saving node {node}")
-                self.record_fleet_state()
+            with self._lock:
+                # Replace the existing object with a newer object, even if they're equal
+                # (this object can be mutated externally).
+                # This behavior is supposed to be consistent with that of the node storage
+                # (where a newer object with the same `checksum_address` replaces an older one).
+                if node in self._nodes_to_add:
+                    self._nodes_to_add.remove(node)
+                self._nodes_to_add.add(node)
+
+                if self._auto_update_state:
+                    self.log.info(f"Updating fleet state after saving node {node}")
+                    self.record_fleet_state()
         else:
             msg = f"Rejected node {node} because its domain is '{node.domain}' but we're only tracking '{self._domain}'"
             self.log.warn(msg)
@@ -324,37 +361,76 @@ class FleetSensor:
         return self._current_state.addresses()
 
     def record_fleet_state(self, skip_this_node: bool = False) -> StateDiff:
-        new_state, diff = self._current_state.with_updated_nodes(nodes_to_add=self._nodes_to_add,
-                                                                 nodes_to_remove=self._nodes_to_remove,
-                                                                 skip_this_node=skip_this_node)
-
-        self._nodes_to_add = set()
-        self._nodes_to_remove = set()
-        self._current_state = new_state
-
-        # TODO: set a limit on the number of archived states?
-        # Two ways to collect archived states:
-        # 1. (current) add a state to the archive every time it changes
-        # 2. (possible) keep a dictionary of known states
-        #    and bump the timestamp of a previously encountered one
-        if not diff.empty():
-            archived_state = new_state.archived()
-            self._archived_states.append(archived_state)
+        with self._lock:
+            new_state, diff = self._current_state.with_updated_nodes(nodes_to_add=self._nodes_to_add,
+                                                                     nodes_to_remove=self._nodes_to_remove,
+                                                                     skip_this_node=skip_this_node)
+
+            self._nodes_to_add = set()
+            self._nodes_to_remove = set()
+            self._current_state = new_state
+
+            # TODO: set a limit on the number of archived states?
+            # Two ways to collect archived states:
+            # 1. (current) add a state to the archive every time it changes
+            # 2. (possible) keep a dictionary of known states
+            #    and bump the timestamp of a previously encountered one
+            if not diff.empty():
+                archived_state = new_state.archived(nodes_updated=diff.nodes_updated)
+                self._archived_states.append(archived_state)
+                self._metadata_responses = {}
+            self.nodes_forgotten += len(diff.nodes_removed)
+
+            return diff
+
+    def cached_metadata_response(self, variant: Hashable, make_response: Callable[[], bytes]) -> bytes:
+        """
+        Returns the signed metadata response of the given variant for the current fleet state,
+        making it with ``make_response()`` only if it has not been made since the fleet state last changed.
 
-        return diff
+        The variants must come from a bounded set, since the responses are kept until the fleet state changes.
+        """
+        metadata_responses = self._metadata_responses
+        key = (bytes(self.checksum), variant)
+        try:
+            return metadata_responses[key]
+        except KeyError:
+            response = make_response()
+            if response is None:
+                raise ValueError(f"No metadata response was made for {variant}")
+            metadata_responses[key] = response
+            return response
+
+    def nodes_updated_since(self, checksum: bytes) -> Optional[List['Ursula']]:
+        """
+        Returns the currently known nodes that were added or updated after the archived state
+        with the given checksum, or ``None`` if that state is not in the archive (anymore).
+        """
+        # Take snapshots, since the fleet state can be recorded concurrently.
+        current_state = self._current_state
+        archived_states = list(self._archived_states)
+
+        updated_addresses = set()
+        for archived_state in reversed(archived_states):
+            if bytes(archived_state.checksum) == checksum:
+                return [current_state[checksum_address] for checksum_address in updated_addresses
+                        if checksum_address in current_state]
+            updated_addresses.update(archived_state.nodes_updated)
+        return None
 
     def shuffled(self):
         return self._current_state.shuffled()
 
     def mark_as(self, label: Exception, node: 'Ursula'):
         # TODO: for now we're not using `label` in any way, so we're just ignoring it
-        self._nodes_to_remove.add(node.checksum_address)
+        with self._lock:
+            self._nodes_to_remove.add(node.checksum_address)
 
     def record_remote_fleet_state(self,
                                   checksum_address: ChecksumAddress,
                                   state_checksum: FleetStateChecksum,
                                   timestamp: maya.MayaDT,
-                                  population: int):
+                                  population: Optional[int]):
 
         if checksum_address not in self._current_state:
             raise KeyError(f"A node {checksum_address} is not present in the current fleet state")
@@ -19,9 +19,8 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 import os
 import random
 import sys
-from bisect import bisect_right
-from itertools import accumulate
-from typing import Dict, Iterable, List, Tuple, Type, Any, Optional, cast, NamedTuple
+import time
+from typing import Dict, Iterable, List, Tuple, Type, Any, Optional, cast, NamedTuple, Sequence
 
 from constant_sorrow.constants import (  # type: ignore
     CONTRACT_CALL,
@@ -45,6 +44,7 @@ from nulink.blockchain.eth.constants import (
 from nulink.blockchain.eth.decorators import contract_api
 from nulink.blockchain.eth.events import ContractEvents
 from nulink.blockchain.eth.interfaces import BlockchainInterfaceFactory
+from nulink.blockchain.eth.multicall import ContractCallBatcher
 from nulink.blockchain.eth.registry import BaseContractRegistry
 from nulink.config.constants import (
     NULINK_ENVVAR_STAKING_PROVIDERS_PAGINATION_SIZE_LIGHT_NODE,
@@ -141,6 +141,14 @@ class EthereumContractAgent:
             return None
         return self.contract.functions.owner().call()
 
+    def batch_call(self, functions: Iterable[ContractFunction], allow_failure: bool = False) -> List[Any]:
+        """
+        Calls many view functions, of this contract or any other, in as few requests as possible,
+        and returns their results in the same order (see `ContractCallBatcher`).
+        """
+        batcher = ContractCallBatcher.for_blockchain(blockchain=self.blockchain)
+        return batcher.call(list(functions), allow_failure=allow_failure)
+
 
 class NulinkTokenAgent(EthereumContractAgent):
 
@@ -380,10 +388,19 @@ class PREApplicationAgent(EthereumContractAgent):
 
     DEFAULT_PROVIDERS_PAGINATION_SIZE_LIGHT_NODE = int(os.environ.get(NULINK_ENVVAR_STAKING_PROVIDERS_PAGINATION_SIZE_LIGHT_NODE, default=30))
     DEFAULT_PROVIDERS_PAGINATION_SIZE = int(os.environ.get(NULINK_ENVVAR_STAKING_PROVIDERS_PAGINATION_SIZE, default=1000))
+    MAX_BATCHED_PAGES = 4  # pages of staking providers per batch of calls, as each page is a heavy call
+    BATCHED_PAGES_RETRY_INTERVAL = 60 * 10  # seconds of paging one by one after batches of pages failed
 
     class NotEnoughStakingProviders(Exception):
         pass
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Staking providers are paged one by one for good where calls cannot be batched,
+        # and for a while after batches of pages failed otherwise (e.g. timed out)
+        self._batched_pages_unsupported = False
+        self._batched_pages_retry_at = 0.0  # monotonic time
+
     class OperatorInfo(NamedTuple):
         address: ChecksumAddress
         confirmed: bool
@@ -444,9 +461,21 @@ class PREApplicationAgent(EthereumContractAgent):
     def get_staking_providers(self) -> List[ChecksumAddress]:
         """Returns a list of staking provider addresses"""
         num_providers: int = self.get_staking_providers_population()
-        providers: List[ChecksumAddress] = [self.contract.functions.stakingProviders(i).call() for i in range(num_providers)]
+        providers: List[ChecksumAddress] = self.batch_call(self.contract.functions.stakingProviders(i) for i in range(num_providers))
         return providers
 
+    @contract_api(CONTRACT_CALL)
+    def get_staking_providers_from_operators(self, operator_addresses: Sequence[ChecksumAddress]) -> Dict[ChecksumAddress, ChecksumAddress]:
+        """Returns the staking provider of each operator (or the null address), in a batch of calls"""
+        functions = (self.contract.functions.stakingProviderFromOperator(operator) for operator in operator_addresses)
+        return dict(zip(operator_addresses, self.batch_call(functions)))
+
+    @contract_api(CONTRACT_CALL)
+    def get_authorized_stakes(self, staking_providers: Sequence[ChecksumAddress]) -> Dict[ChecksumAddress, int]:
+        """Returns the authorized stake of each staking provider, in a batch of calls"""
+        functions = (self.contract.functions.authorizedStake(provider) for provider in staking_providers)
+        return dict(zip(staking_providers, self.batch_call(functions)))
+
     @contract_api(CONTRACT_CALL)
     def get_active_staking_providers(self, start_index: int, max_results: int) -> Iterable:
         result = self.contract.functions.getActiveStakingProviders(start_index, max_results).call()
@@ -454,9 +483,7 @@ class PREApplicationAgent(EthereumContractAgent):
 
     @contract_api(CONTRACT_CALL)
     def swarm(self) -> Iterable[ChecksumAddress]:
-        for index in range(self.get_staking_providers_population()):
-            address: ChecksumAddress = self.contract.functions.stakingProviders(index).call()
-            yield address
+        yield from self.get_staking_providers()
 
     @contract_api(CONTRACT_CALL)
     def get_all_active_staking_providers(self, pagination_size: Optional[int] = None) -> Tuple[NlkUNits, Dict[ChecksumAddress, NlkUNits]]:
@@ -473,6 +500,26 @@ class PREApplicationAgent(EthereumContractAgent):
             n_tokens: int = 0
             staking_providers: Dict[int, int] = dict()
             attempts: int = 0
+
+            # A few pages at a time first, in batches of calls; page by page if that fails
+            if not self._batched_pages_unsupported and time.monotonic() >= self._batched_pages_retry_at:
+                batched_pages = pagination_size * self.MAX_BATCHED_PAGES
+                try:
+                    while start_index < num_providers:
+                        indices = range(start_index, min(start_index + batched_pages, num_providers), pagination_size)
+                        pages = self.batch_call(self.contract.functions.getActiveStakingProviders(index, pagination_size)
+                                                for index in indices)
+                        for temp_authorized_tokens, temp_staking_providers in pages:
+                            n_tokens = n_tokens + temp_authorized_tokens
+                            staking_providers.update({address: authorized_tokens for address, authorized_tokens in temp_staking_providers})
+                        start_index += batched_pages
+                except ContractCallBatcher.BatchingUnsupported as e:
+                    self._batched_pages_unsupported = True
+                    self.log.info(f"Calls cannot be batched, sampling staking providers page by page from now on: {e}")
+                except Exception as e:
+                    self._batched_pages_retry_at = time.monotonic() + self.BATCHED_PAGES_RETRY_INTERVAL
+                    self.log.debug(f"Failed staking providers sampling in batches of calls, falling back to pages: {e}")
+
             while start_index < num_providers:
                 try:
                     attempts += 1
@@ -623,6 +670,9 @@ class ContractAgency:
 class WeightedSampler:
     """
     Samples random elements with probabilities proportional to given weights.
+
+    The cumulative weights are kept in a Fenwick tree, so that drawing an element and removing it
+    both take O(log n) steps.
     """
 
     def __init__(self, weighted_elements: Dict[Any, int]):
@@ -630,9 +680,47 @@ class WeightedSampler:
             elements, weights = zip(*weighted_elements.items())
         else:
             elements, weights = [], []
-        self.totals = list(accumulate(weights))
         self.elements = elements
-        self.__length = len(self.totals)
+        self.__size = len(elements)
+        self.__length = self.__size  # elements left to sample
+
+        # tree[i] holds the sum of the weights of the elements (i - lowbit(i), i], 1-indexed
+        self.__tree = [0, *weights]
+        for i in range(1, self.__size + 1):
+            parent = i + (i & -i)
+            if parent <= self.__size:
+                self.__tree[parent] += self.__tree[i]
+        self.__total = sum(weights)
+        self.__top_bit = 1 << (self.__size.bit_length() - 1) if self.__size else 0
+
+    def __find(self, position: int) -> int:
+        """Returns the index of the element whose cumulative weight range holds ``position``."""
+        index = 0
+        bit = self.__top_bit
+        while bit:
+            next_index = index + bit
+            if next_index <= self.__size and self.__tree[next_index] <= position:
+                index = next_index
+                position -= self.__tree[next_index]
+            bit >>= 1
+        return index
+
+    def __remove(self, index: int, weight: int) -> None:
+        i = index + 1
+        while i <= self.__size:
+            self.__tree[i] -= weight
+            i += i & -i
+        self.__total -= weight
+
+    def __weight(self, index: int) -> int:
+        # The weight of an element is its node, minus the nodes of its children
+        i = index + 1
+        weight = self.__tree[i]
+        child, lowest = i - 1, i - (i & -i)
+        while child > lowest:
+            weight -= self.__tree[child]
+            child -= child & -child
+        return weight
 
     def sample_no_replacement(self, rng, quantity: int) -> list:
         """
@@ -640,8 +728,8 @@ class WeightedSampler:
         The probability of an element to appear is proportional
         to the weight provided to the constructor.
 
-        The elements will not repeat; every time an element is sampled its weight is set to 0.
-        (does not mutate the object and only applies to the current invocation of the method).
+        The elements will not repeat; every time an element is sampled its weight is set to 0,
+        so later invocations of the method do not sample it either.
         """
 
         if quantity == 0:
@@ -653,16 +741,10 @@ class WeightedSampler:
         samples = []
 
         for i in range(quantity):
-            position = rng.randint(0, self.totals[-1] - 1)
-            idx = bisect_right(self.totals, position)
+            position = rng.randint(0, self.__total - 1)
+            idx = self.__find(position)
             samples.append(self.elements[idx])
-
-            # Adjust the totals so that they correspond
-            # to the weight of the element `idx` being set to 0.
-            prev_total = self.totals[idx - 1] if idx > 0 else 0
-            weight = self.totals[idx] - prev_total
-            for j in range(idx, len(self.totals)):
-                self.totals[j] -= weight
+            self.__remove(idx, self.__weight(idx))
 
         self.__length -= quantity
 
@@ -674,9 +756,9 @@ class WeightedSampler:
 
 class StakingProvidersReservoir:
 
-    def __init__(self, staking_provider_map: Dict[ChecksumAddress, int]):
+    def __init__(self, staking_provider_map: Dict[ChecksumAddress, int], rng: Optional[random.Random] = None):
         self._sampler = WeightedSampler(staking_provider_map)
-        self._rng = random.SystemRandom()
+        self._rng = rng or random.SystemRandom()  # seed a `random.Random` for deterministic draws
 
     def __len__(self):
         return len(self._sampler)
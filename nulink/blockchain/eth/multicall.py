@@ -0,0 +1,216 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence
+
+import requests
+from eth_abi import decode_abi
+from eth_typing import ChecksumAddress, HexStr
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+from web3 import HTTPProvider
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.contract import Contract, ContractFunction
+from web3.exceptions import ContractLogicError
+from web3.types import BlockIdentifier
+
+from nulink.config.constants import NULINK_ENVVAR_MULTICALL_BATCH_SIZE
+from nulink.utilities.logging import Logger
+
+# Multicall3 is deployed at the same address on most EVM chains, see https://github.com/mds1/multicall
+MULTICALL3_ADDRESS = ChecksumAddress('0xcA11bde05977b3631167028862bE2a173976CA11')
+
+MULTICALL3_ABI = [
+    {
+        'name': 'aggregate3',
+        'type': 'function',
+        'stateMutability': 'payable',
+        'inputs': [{'name': 'calls',
+                    'type': 'tuple[]',
+                    'components': [{'name': 'target', 'type': 'address'},
+                                   {'name': 'allowFailure', 'type': 'bool'},
+                                   {'name': 'callData', 'type': 'bytes'}]}],
+        'outputs': [{'name': 'returnData',
+                     'type': 'tuple[]',
+                     'components': [{'name': 'success', 'type': 'bool'},
+                                    {'name': 'returnData', 'type': 'bytes'}]}],
+    },
+]
+
+
+class ContractCallBatcher:
+    """
+    Sends many contract view calls in as few requests as possible: aggregated in an ``eth_call`` to a
+    Multicall3 contract where one is deployed, or else in JSON-RPC batch requests (over HTTP only),
+    or else one by one.
+    """
+
+    DEFAULT_BATCH_SIZE = int(os.environ.get(NULINK_ENVVAR_MULTICALL_BATCH_SIZE, default=200))
+
+    class CallFailed(RuntimeError):
+        """Raised when a call of a batch reverts, or fails otherwise."""
+
+    class BatchingUnsupported(CallFailed):
+        """Raised when the calls cannot be batched at all: the multicall contract reverts, or the node rejects batches."""
+
+    __batchers = dict()  # {eth provider URI: ContractCallBatcher}
+    __batchers_lock = Lock()
+
+    @classmethod
+    def for_blockchain(cls, blockchain: 'BlockchainInterface') -> 'ContractCallBatcher':
+        """Returns the batcher shared by all the agents connected to ``blockchain``."""
+        with cls.__batchers_lock:
+            try:
+                return cls.__batchers[blockchain.eth_provider_uri]
+            except KeyError:
+                batcher = cls.__batchers[blockchain.eth_provider_uri] = cls(blockchain=blockchain)
+                return batcher
+
+    def __init__(self,
+                 blockchain: 'BlockchainInterface',
+                 multicall_address: Optional[ChecksumAddress] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError(f"Batches must hold at least one call, got {batch_size}")
+        self.blockchain = blockchain
+        self.batch_size = batch_size
+        self.log = Logger(self.__class__.__name__)
+        self._multicall_address = multicall_address
+        self._multicall = None  # type: Optional[Contract]
+        self._multicall_checked = False
+        self._contracts = dict()  # {address: Contract}, to encode calls with
+
+        # Metrics
+        self.calls = 0
+        self.requests = 0
+
+    @property
+    def multicall(self) -> Optional[Contract]:
+        """The Multicall3 contract to aggregate calls with, or ``None`` if there is none on this chain."""
+        if not self._multicall_checked:
+            address = to_checksum_address(self._multicall_address or MULTICALL3_ADDRESS)
+            if self.blockchain.client.w3.eth.get_code(address):
+                self._multicall = self.blockchain.client.get_contract(address=address, abi=MULTICALL3_ABI)
+            else:
+                self.log.debug(f"No multicall contract at {address}, batching calls in JSON-RPC requests")
+            self._multicall_checked = True
+        return self._multicall
+
+    def call(self,
+             functions: Sequence[ContractFunction],
+             allow_failure: bool = False,
+             block_identifier: BlockIdentifier = 'latest'
+             ) -> List[Any]:
+        """
+        Calls view functions (of any contracts), and returns their results in the same order.
+        The results of the calls that failed are ``None`` if ``allow_failure`` is set;
+        otherwise, ``CallFailed`` is raised.
+        """
+        results = list()
+        for start in range(0, len(functions), self.batch_size):
+            batch = functions[start:start + self.batch_size]
+            if self.multicall is not None:
+                outputs = self._aggregate(batch, block_identifier=block_identifier)
+            elif isinstance(self.blockchain.provider, HTTPProvider):
+                outputs = self._batch_request(batch, block_identifier=block_identifier)
+            else:
+                outputs = self._call_one_by_one(batch, block_identifier=block_identifier)
+            self.calls += len(batch)
+
+            for function, output in zip(batch, outputs):
+                try:
+                    if isinstance(output, Exception):
+                        raise output
+                    result = self._decode(function, output)
+                except Exception as e:
+                    if not allow_failure:
+                        raise self.CallFailed(f"Call to {function.fn_name} of {function.address} failed: {e}") from e
+                    result = None
+                results.append(result)
+        return results
+
+    def _aggregate(self, batch: Sequence[ContractFunction], block_identifier: BlockIdentifier) -> List:
+        calls = [(function.address, True, HexBytes(self._encode(function))) for function in batch]
+        self.requests += 1
+        try:
+            outputs = self.multicall.functions.aggregate3(calls).call(block_identifier=block_identifier)
+        except ContractLogicError as e:
+            raise self.BatchingUnsupported(f"Multicall reverted: {e}") from e
+        return [bytes(data) if success else self.CallFailed(f"reverted: {HexBytes(data).hex()}")
+                for success, data in outputs]
+
+    def _batch_request(self, batch: Sequence[ContractFunction], block_identifier: BlockIdentifier) -> List:
+        if isinstance(block_identifier, int):
+            block_identifier = hex(block_identifier)
+        payload = [dict(jsonrpc='2.0',
+                        id=request_id,
+                        method='eth_call',
+                        params=[dict(to=function.address, data=self._encode(function)), block_identifier])
+                   for request_id, function in enumerate(batch)]
+        provider = self.blockchain.provider
+        self.requests += 1
+        # Posted directly, as HTTPProvider.make_request sends a single JSON-RPC request
+        response = requests.post(provider.endpoint_uri, data=json.dumps(payload).encode(), **provider.get_request_kwargs())
+        response.raise_for_status()
+        responses = response.json()
+        if not isinstance(responses, list):
+            # Some nodes answer a batch they do not support with a single error
+            raise self.BatchingUnsupported(f"Batch request failed: {responses.get('error', responses)}")
+
+        outputs = [self.CallFailed("no response")] * len(batch)
+        for response in responses:
+            if 'error' in response:
+                outputs[response['id']] = self.CallFailed(response['error'].get('message', response['error']))
+            else:
+                outputs[response['id']] = bytes(HexBytes(response['result']))
+        return outputs
+
+    def _call_one_by_one(self, batch: Sequence[ContractFunction], block_identifier: BlockIdentifier) -> List:
+        outputs = list()
+        for function in batch:
+            self.requests += 1
+            try:
+                output = self.blockchain.client.w3.eth.call(dict(to=function.address, data=self._encode(function)),
+                                                            block_identifier)
+            except Exception as e:
+                output = e
+            else:
+                output = bytes(output)
+            outputs.append(output)
+        return outputs
+
+    def _encode(self, function: ContractFunction) -> HexStr:
+        try:
+            contract = self._contracts[function.address]
+        except KeyError:
+            contract = self.blockchain.client.w3.eth.contract(address=function.address, abi=function.contract_abi)
+            self._contracts[function.address] = contract
+        return contract.encodeABI(fn_name=function.fn_name, args=function.args, kwargs=function.kwargs)
+
+    @staticmethod
+    def _decode(function: ContractFunction, output: bytes) -> Any:
+        # Same as web3 does with the results of ContractFunction.call
+        output_types = get_abi_output_types(function.abi)
+        result = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decode_abi(output_types, output))
+        return result[0] if len(result) == 1 else result
+
+    def stats(self) -> Dict[str, float]:
+        return dict(calls=self.calls, requests=self.requests)
@@ -0,0 +1,318 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+from threading import Lock, RLock
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+from eth_typing import ChecksumAddress
+
+from twisted.internet import threads
+from twisted.internet.defer import Deferred
+from twisted.python.failure import Failure
+
+from nulink.blockchain.eth.agents import ContractAgency, PREApplicationAgent, StakingProvidersReservoir
+from nulink.blockchain.eth.constants import NULL_ADDRESS
+from nulink.blockchain.eth.events import ContractEventsThrottler
+from nulink.blockchain.eth.registry import BaseContractRegistry
+from nulink.types import NlkUNits
+from nulink.utilities.logging import Logger
+from nulink.utilities.task import SimpleTask
+
+
+class StakingSnapshot(NamedTuple):
+    block: int
+    total_tokens: NlkUNits
+    staking_providers: Dict[ChecksumAddress, NlkUNits]  # active staking providers, and their authorized tokens
+
+
+class StakingStatusCache:
+    """
+    Process-wide cache of the staking state of the PREApplication contract, so that the operators of many
+    nodes can be validated with a few contract calls.
+
+    The active staking providers are read in bulk, and the other staking statuses one by one; all of them
+    are fresh for ``max_age`` blocks.  Operator bondings are read one by one, and then kept up to date
+    with the ``OperatorBonded`` events of the contract.  A bonding makes the snapshot of active staking
+    providers due; it remains in use, except for the (un)bonded staking providers, until it is read again.
+    """
+
+    DEFAULT_MAX_AGE = 40  # blocks
+    BLOCK_NUMBER_TTL = 5  # seconds between reads of the latest block number
+    MAX_EVENTS_GAP = 10_000  # blocks; beyond this, bondings are read again rather than caught up with
+
+    __caches = dict()  # {registry id: StakingStatusCache}
+    __caches_lock = Lock()
+
+    @classmethod
+    def for_registry(cls,
+                     registry: BaseContractRegistry,
+                     eth_provider_uri: Optional[str] = None
+                     ) -> 'StakingStatusCache':
+        """Returns the cache shared by all the nodes of this process for the contracts of ``registry``."""
+        with cls.__caches_lock:
+            try:
+                return cls.__caches[registry.id]
+            except KeyError:
+                agent = ContractAgency.get_agent(PREApplicationAgent,
+                                                 registry=registry,
+                                                 eth_provider_uri=eth_provider_uri)  # type: PREApplicationAgent
+                cache = cls.__caches[registry.id] = cls(agent=agent)
+                return cache
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls.__caches_lock:
+            cls.__caches.clear()
+
+    def __init__(self,
+                 agent: PREApplicationAgent,
+                 max_age: int = DEFAULT_MAX_AGE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.agent = agent
+        self.max_age = max_age
+        self._clock = clock
+        self.log = Logger(self.__class__.__name__)
+
+        self._lock = RLock()
+        self._snapshot_lock = Lock()  # for bulk reads, which do not hold up the readers of the current snapshot
+        self._events_lock = Lock()  # for event scans, which do not hold up the readers of the current bondings
+        self._latest_block = None
+        self._latest_block_expiration = None
+        self._synced_block = None  # OperatorBonded events were applied up to this block
+        self._snapshot = None  # type: Optional[StakingSnapshot]
+        self._snapshot_stale = False  # operators were (un)bonded since the snapshot was read
+        self._rebonded = set()  # the staking providers (un)bonded since the snapshot was read
+        self._staking = dict()  # {staking provider: (is staking, block)}, for the providers not in the snapshot
+        self._operators = dict()  # {operator: staking provider}
+        self._bonded_operators = dict()  # {staking provider: operator}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.snapshots = 0
+        self.events = 0
+
+    def latest_block(self) -> int:
+        """The latest block number, read at most every ``BLOCK_NUMBER_TTL`` seconds."""
+        now = self._clock()
+        with self._lock:
+            if self._latest_block is not None and now < self._latest_block_expiration:
+                return self._latest_block
+        latest_block = self.agent.blockchain.client.block_number  # not holding up the other readers
+        with self._lock:
+            if self._latest_block is None or latest_block > self._latest_block:
+                self._latest_block = latest_block
+            self._latest_block_expiration = now + self.BLOCK_NUMBER_TTL
+            return self._latest_block
+
+    def snapshot(self) -> StakingSnapshot:
+        """The active staking providers, read in bulk again once older than ``max_age`` blocks."""
+        snapshot = self._snapshot
+        if snapshot is None or self.latest_block() - snapshot.block > self.max_age:
+            snapshot = self.refresh_snapshot()
+        return snapshot
+
+    @property
+    def snapshot_block(self) -> Optional[int]:
+        """The block of the current snapshot, if any."""
+        snapshot = self._snapshot
+        return snapshot.block if snapshot is not None else None
+
+    @property
+    def snapshot_stale(self) -> bool:
+        """Whether operators were (un)bonded since the current snapshot was read."""
+        return self._snapshot_stale
+
+    def refresh_snapshot(self) -> StakingSnapshot:
+        """Reads the active staking providers in bulk; the current snapshot remains in use meanwhile."""
+        with self._snapshot_lock:
+            latest_block = self.latest_block()
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is not None and snapshot.block >= latest_block and not self._snapshot_stale:
+                    return snapshot  # refreshed by another thread meanwhile
+                # Bondings from now on are marked again, as the read may miss them
+                self._snapshot_stale = False
+                rebonded, self._rebonded = self._rebonded, set()
+            try:
+                total_tokens, staking_providers = self.agent.get_all_active_staking_providers()
+            except Exception:
+                with self._lock:
+                    self._snapshot_stale = True
+                    self._rebonded.update(rebonded)
+                raise
+            snapshot = StakingSnapshot(block=latest_block, total_tokens=total_tokens, staking_providers=staking_providers)
+            with self._lock:
+                self._snapshot = snapshot
+                self.snapshots += 1
+            return snapshot
+
+    def get_staking_provider_reservoir(self, without: Iterable[ChecksumAddress] = None) -> StakingProvidersReservoir:
+        """Makes a reservoir of the active staking providers from the snapshot, without reading the contract."""
+        snapshot = self.snapshot()
+        staking_providers = dict(snapshot.staking_providers)
+        for address in without or ():
+            staking_providers.pop(address, None)
+        if not any(staking_providers.values()):
+            raise PREApplicationAgent.NotEnoughStakingProviders(f'There are no locked tokens.')
+        return StakingProvidersReservoir(staking_providers)
+
+    def sync(self) -> None:
+        """Applies the latest OperatorBonded events, waiting for a scan of another thread if there is one."""
+        self._apply_bonding_events(wait=True)
+
+    def get_staking_provider(self, operator_address: ChecksumAddress) -> ChecksumAddress:
+        """Returns the staking provider an operator is bonded to, or ``NULL_ADDRESS``."""
+        self._apply_bonding_events(wait=False)
+        with self._lock:
+            try:
+                staking_provider = self._operators[operator_address]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                return staking_provider
+
+        staking_provider = self.agent.get_staking_provider_from_operator(operator_address=operator_address)
+        with self._lock:
+            if self._synced_block is not None and operator_address not in self._operators:
+                self._operators[operator_address] = staking_provider
+                if staking_provider != NULL_ADDRESS:
+                    self._bonded_operators[staking_provider] = operator_address
+        return staking_provider
+
+    def is_staking(self, staking_provider: ChecksumAddress) -> bool:
+        """Returns whether a staking provider is authorized to stake on the PREApplication contract."""
+        snapshot = self.snapshot()
+        with self._lock:
+            if staking_provider in snapshot.staking_providers and staking_provider not in self._rebonded:
+                self.hits += 1
+                return True
+            try:
+                is_staking, block = self._staking[staking_provider]
+            except KeyError:
+                pass
+            else:
+                if self.latest_block() - block <= self.max_age:
+                    self.hits += 1
+                    return is_staking
+            self.misses += 1
+
+        is_staking = self.agent.is_authorized(staking_provider=staking_provider)
+        with self._lock:
+            self._staking[staking_provider] = (is_staking, self.latest_block())
+        return is_staking
+
+    def stats(self) -> Dict[str, float]:
+        return dict(hits=self.hits,
+                    misses=self.misses,
+                    snapshots=self.snapshots,
+                    events=self.events,
+                    operators=len(self._operators))
+
+    def _apply_bonding_events(self, wait: bool) -> None:
+        # The events are read without holding the lock, so that lookups are not held up by the scan;
+        # without `wait`, the current bondings are used while another thread scans.
+        if not self._events_lock.acquire(blocking=wait):
+            return
+        try:
+            latest_block = self.latest_block()
+            with self._lock:
+                if self._synced_block is not None and latest_block - self._synced_block > self.MAX_EVENTS_GAP:
+                    self._forget_bondings()
+                if self._synced_block is None:
+                    # Bondings read from now on are kept up to date by later events
+                    self._synced_block = latest_block
+                    return
+                synced_block = self._synced_block
+                if latest_block <= synced_block:
+                    return
+
+            try:
+                events = list(ContractEventsThrottler(agent=self.agent,
+                                                      event_name='OperatorBonded',
+                                                      from_block=synced_block + 1,
+                                                      to_block=latest_block))
+            except Exception as e:
+                self.log.warn(f"Failed to read OperatorBonded events, reading bondings again: {e}")
+                with self._lock:
+                    if self._synced_block == synced_block:
+                        self._forget_bondings()
+                return
+
+            with self._lock:
+                if self._synced_block != synced_block:
+                    return  # bondings were forgotten meanwhile
+                for event in events:
+                    self._bond(staking_provider=event.args['stakingProvider'], operator=event.args['operator'])
+                    self.events += 1
+                self._synced_block = latest_block
+        finally:
+            self._events_lock.release()
+
+    def _bond(self, staking_provider: ChecksumAddress, operator: ChecksumAddress) -> None:
+        previous_operator = self._bonded_operators.pop(staking_provider, None)
+        if previous_operator is not None:
+            self._operators[previous_operator] = NULL_ADDRESS
+        if operator != NULL_ADDRESS:
+            self._operators[operator] = staking_provider
+            self._bonded_operators[staking_provider] = operator
+        # (Un)bonding an operator changes whether its staking provider is active;
+        # the snapshot stays in use meanwhile, rather than being read again by the next sampling
+        self._staking.pop(staking_provider, None)
+        self._rebonded.add(staking_provider)
+        self._snapshot_stale = True
+
+    def _forget_bondings(self) -> None:
+        self._operators.clear()
+        self._bonded_operators.clear()
+        self._synced_block = None
+
+
+class StakingSnapshotTracker(SimpleTask):
+    """
+    Keeps the snapshot of the active staking providers of a `StakingStatusCache` fresh, on a thread of the
+    reactor's pool, so that sampling staking providers does not wait for contract reads.  The snapshot is
+    read again when half its ``max_age`` has passed, or as soon as an operator is (un)bonded.
+    """
+
+    INTERVAL = 15  # seconds
+
+    def __init__(self, staking_statuses: StakingStatusCache, interval: float = INTERVAL):
+        self._staking_statuses = staking_statuses
+        self.INTERVAL = interval
+        super().__init__()
+
+    def run(self) -> Deferred:
+        return threads.deferToThread(self.refresh)
+
+    def refresh(self) -> bool:
+        """Reads the snapshot again if it is due, and returns whether it was."""
+        staking_statuses = self._staking_statuses
+        staking_statuses.sync()  # marks the snapshot as stale on bonding events
+        snapshot_block = staking_statuses.snapshot_block
+        if (snapshot_block is not None and not staking_statuses.snapshot_stale
+                and staking_statuses.latest_block() - snapshot_block < staking_statuses.max_age // 2):
+            return False
+        staking_statuses.refresh_snapshot()
+        return True
+
+    def handle_errors(self, failure: Failure) -> None:
+        cleaned_traceback = self.clean_traceback(failure)
+        self.log.warn(f"Unhandled error while refreshing the staking providers snapshot: {cleaned_traceback}")
+        self.start(now=False)  # keep tracking; sampling falls back to reading the contract meanwhile
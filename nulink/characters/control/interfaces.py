@@ -24,6 +24,7 @@ from nucypher_core.umbral import PublicKey
 
 from nulink.characters.base import Character
 from nulink.characters.control.specifications import alice, bob, enrico
+from nulink.characters.requesters import RequesterIdentity
 from nulink.control.interfaces import attach_schema, ControlInterface
 from nulink.crypto.powers import DecryptingPower, SigningPower
 from nulink.network.middleware import RestMiddleware
@@ -48,9 +49,8 @@ class AliceInterface(CharacterPublicInterface):
                       value: int = None
                       ) -> dict:
 
-        from nulink.characters.lawful import Bob
-        bob = Bob.from_public_keys(encrypting_key=bob_encrypting_key,
-                                   verifying_key=bob_verifying_key)
+        bob = RequesterIdentity.from_public_keys(encrypting_key=bob_encrypting_key,
+                                                 verifying_key=bob_verifying_key)
 
         new_policy = self.implementer.create_policy(
             bob=bob,
@@ -81,9 +81,8 @@ class AliceInterface(CharacterPublicInterface):
               rate: int = None,
               ) -> dict:
 
-        from nulink.characters.lawful import Bob
-        bob = Bob.from_public_keys(encrypting_key=bob_encrypting_key,
-                                   verifying_key=bob_verifying_key)
+        bob = RequesterIdentity.from_public_keys(encrypting_key=bob_encrypting_key,
+                                                 verifying_key=bob_verifying_key)
 
         new_policy = self.implementer.grant(bob=bob,
                                             label=label,
@@ -16,8 +16,10 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import contextlib
+import hashlib
 import json
 import time
+import weakref
 from base64 import b64encode
 from http import HTTPStatus
 from json.decoder import JSONDecodeError
@@ -50,7 +52,7 @@ from nucypher_core import (
     HRAC,
 )
 from nucypher_core.umbral import (
-    PublicKey, VerifiedKeyFrag, reencrypt,
+    PublicKey, VerifiedKeyFrag,
 
 )
 from twisted.internet import reactor, stdio
@@ -82,6 +84,10 @@ from nulink.crypto.powers import (
     TransactingPower,
     TLSHostingPower,
 )
+from nulink.crypto.reencryption import ReencryptionEngine
+from nulink.datastore.models import ReencryptionRequest as ReencryptionRequestModel
+from nulink.datastore.sweeper import DatastoreSweeper
+from nulink.datastore.writer import BufferedRecordWriter
 from nulink.network.exceptions import NodeSeemsToBeDown
 from nulink.network.middleware import RestMiddleware
 from nulink.network.nodes import NodeSprout, TEACHER_NODES, Teacher
@@ -90,8 +96,9 @@ from nulink.network.retrieval import RetrievalClient
 from nulink.network.server import ProxyRESTServer, make_rest_app
 from nulink.network.trackers import AvailabilityTracker, OperatorBondedTracker
 from nulink.policy.kits import PolicyMessageKit
-from nulink.policy.payment import PaymentMethod, FreeReencryptions
+from nulink.policy.payment import PaymentMethod, FreeReencryptions, SubscriptionManagerPayment
 from nulink.policy.policies import Policy, BlockchainPolicy, FederatedPolicy
+from nulink.utilities.cache import TTLCache
 from nulink.utilities.logging import Logger
 from nulink.utilities.networking import validate_operator_ip
 
@@ -683,6 +690,10 @@ class Ursula(Teacher, Character, Operator):
         # TLSHostingPower  # Still considered a default for Ursula, but needs the host context
     ]
 
+    # Decrypted and verified kfrags, for repeated reencryption requests of the same policy
+    KFRAG_CACHE_SIZE = 1000
+    KFRAG_CACHE_TTL = 60 * 60  # seconds
+
     class NotEnoughUrsulas(Learner.NotEnoughTeachers):
         """
         All Characters depend on knowing about enough Ursulas to perform their role.
@@ -706,6 +717,11 @@ class Ursula(Teacher, Character, Operator):
                  db_filepath: Optional[Path] = None,
                  availability_check: bool = False,  # TODO: Remove from init
                  metadata: Optional[NodeMetadata] = None,
+                 reencryption_mode: str = ReencryptionEngine.SERIAL,
+                 reencryption_workers: Optional[int] = None,
+                 audit_durability: str = BufferedRecordWriter.SYNC,
+                 audit_retention_days: Optional[int] = None,
+                 audit_retention_count: Optional[int] = None,
 
                  # Blockchain
                  checksum_address: ChecksumAddress = None,
@@ -798,7 +814,17 @@ class Ursula(Teacher, Character, Operator):
             # Server
             self.rest_server = self._make_local_server(host=rest_host,
                                                        port=rest_port,
-                                                       db_filepath=db_filepath)
+                                                       db_filepath=db_filepath,
+                                                       audit_durability=audit_durability)
+
+            # Datastore Retention
+            retention = ReencryptionRequestModel._retention
+            if audit_retention_days is not None:
+                retention = retention._replace(max_age=audit_retention_days * 24 * 60 * 60 or None)
+            if audit_retention_count is not None:
+                retention = retention._replace(max_count=audit_retention_count or None)
+            self.datastore_sweeper = DatastoreSweeper(datastore=weakref.proxy(self.datastore),
+                                                      retention={ReencryptionRequestModel: retention})
 
             # Self-signed TLS certificate of self for Teacher.__init__
             certificate_filepath = self._crypto_power.power_ups(TLSHostingPower).keypair.certificate_filepath
@@ -806,6 +832,8 @@ class Ursula(Teacher, Character, Operator):
 
             # Only *YOU* can prevent forest fires
             self.revoked_policies: Set[bytes] = set()
+            self.kfrag_cache = TTLCache(max_entries=self.KFRAG_CACHE_SIZE, ttl=self.KFRAG_CACHE_TTL)
+            self.reencryption_engine = ReencryptionEngine(mode=reencryption_mode, workers=reencryption_workers)
 
             # Care to introduce yourself?
             message = "THIS IS YOU: {}: {}".format(self.__class__.__name__, self)
@@ -840,11 +868,12 @@ class Ursula(Teacher, Character, Operator):
             self._crypto_power.consume_power_up(tls_hosting_power)  # Consume!
         return tls_hosting_power
 
-    def _make_local_server(self, host, port, db_filepath) -> ProxyRESTServer:
+    def _make_local_server(self, host, port, db_filepath, audit_durability: str = BufferedRecordWriter.SYNC) -> ProxyRESTServer:
         rest_app, datastore = make_rest_app(
             this_node=self,
             db_filepath=db_filepath,
-            lmdb_map_size=10_000_000_000
+            lmdb_map_size=10_000_000_000,
+            audit_durability=audit_durability
         )
         rest_server = ProxyRESTServer(rest_host=host,
                                       rest_port=port,
@@ -965,6 +994,15 @@ class Ursula(Teacher, Character, Operator):
             if emitter:
                 emitter.message(f"✓ Start Operator Bonded Tracker", color='green')
 
+        if isinstance(self.payment_method, SubscriptionManagerPayment):
+            self.payment_method.policy_tracker.start(now=eager)
+            if emitter:
+                emitter.message(f"✓ Policy Payment Tracker", color='green')
+
+        self.datastore_sweeper.start(now=eager)
+        if emitter:
+            emitter.message(f"✓ Datastore Retention", color='green')
+
         if prometheus_config:
             # Locally scoped to prevent import without prometheus explicitly installed
             from nulink.utilities.prometheus.metrics import start_prometheus_exporter
@@ -1015,6 +1053,12 @@ class Ursula(Teacher, Character, Operator):
                 self.work_tracker.stop()
                 if halt_operator_bonded_tracker:
                     self._operator_bonded_tracker.stop()
+            if isinstance(self.payment_method, SubscriptionManagerPayment):
+                self.payment_method.policy_tracker.stop()
+            self.reencryption_engine.shutdown()
+            self.audit_log.flush()
+            self.datastore_sweeper.stop()
+            self.node_verifier.stop()
         if halt_reactor:
             reactor.stop()
 
@@ -1223,6 +1267,14 @@ class Ursula(Teacher, Character, Operator):
         except AttributeError:
             raise AttributeError("No rest server attached")
 
+    @property
+    def audit_log(self) -> BufferedRecordWriter:
+        """Records the reencryption requests served by this node in the datastore."""
+        try:
+            return self.rest_server.rest_app.extensions['audit_log']
+        except AttributeError:
+            raise AttributeError("No rest server attached")
+
     @property
     def rest_url(self):
         try:
@@ -1250,15 +1302,22 @@ class Ursula(Teacher, Character, Operator):
 
     def _decrypt_kfrag(self, encrypted_kfrag: EncryptedKeyFrag, hrac: HRAC, # hrac => treasure_map.hrac => HRAC
                        publisher_verifying_key: PublicKey) -> VerifiedKeyFrag:
-        decrypting_power = self._crypto_power.power_ups(DecryptingPower)
-        return decrypting_power.decrypt_kfrag(encrypted_kfrag, hrac, publisher_verifying_key)
+        cache_key = (hashlib.sha256(bytes(encrypted_kfrag)).digest(), bytes(hrac), bytes(publisher_verifying_key))
+        verified_kfrag = self.kfrag_cache.get(cache_key)
+        if verified_kfrag is None:
+            decrypting_power = self._crypto_power.power_ups(DecryptingPower)
+            verified_kfrag = decrypting_power.decrypt_kfrag(encrypted_kfrag, hrac, publisher_verifying_key)
+            self.kfrag_cache.put(cache_key, verified_kfrag)
+        return verified_kfrag
+
+    def revoke_policy(self, hrac: HRAC) -> None:
+        """Rejects any further reencryption requests for a policy, and forgets its cached kfrags."""
+        self.revoked_policies.add(hrac)
+        self.kfrag_cache.purge(lambda cache_key: cache_key[1] == bytes(hrac))
 
     def _reencrypt(self, kfrag: VerifiedKeyFrag, capsules) -> ReencryptionResponse:
-        cfrags = []
-        for capsule in capsules:
-            cfrag = reencrypt(capsule, kfrag)
-            cfrags.append(cfrag)
-            self.log.info(f"Re-encrypted capsule {capsule} -> made {cfrag}.")
+        cfrags = self.reencryption_engine.reencrypt(kfrag=kfrag, capsules=capsules)
+        self.log.debug(f"Re-encrypted {len(cfrags)} capsules.")
 
         return ReencryptionResponse(signer=self.stamp.as_umbral_signer(),
                                     capsules=capsules,
@@ -0,0 +1,76 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import ClassVar, Optional
+
+from nucypher_core.umbral import PublicKey
+
+from nulink.crypto.powers import DecryptingPower, SigningPower
+from nulink.crypto.signing import StrangerStamp
+from nulink.utilities.cache import TTLCache
+
+
+class RequesterIdentity:
+    """
+    The public keys of a (usually remote) Bob, for the code paths that only need to know who is asking -
+    to check signatures, make an HRAC or generate kfrags for him.
+
+    Much cheaper than ``Bob.from_public_keys``, which builds a whole ``Character`` (a learner, node storage,
+    crypto powers, etc.) only to read its keys.  Use ``RequesterIdentity.from_public_keys``,
+    which reuses the identities of recent requesters.
+    """
+
+    __slots__ = ('verifying_key', 'encrypting_key', 'stamp')
+
+    # Recently seen requesters: {(verifying key bytes, encrypting key bytes): RequesterIdentity}
+    _recent = TTLCache(max_entries=10_000, ttl=60 * 60)
+
+    def __init__(self, verifying_key: PublicKey, encrypting_key: Optional[PublicKey] = None):
+        self.verifying_key = verifying_key
+        self.encrypting_key = encrypting_key
+        self.stamp = StrangerStamp(verifying_key=verifying_key)
+
+    @classmethod
+    def from_public_keys(cls,
+                         verifying_key: PublicKey,
+                         encrypting_key: Optional[PublicKey] = None
+                         ) -> 'RequesterIdentity':
+        key = (bytes(verifying_key), bytes(encrypting_key) if encrypting_key is not None else None)
+        requester = cls._recent.get(key)
+        if requester is None:
+            requester = cls(verifying_key=verifying_key, encrypting_key=encrypting_key)
+            cls._recent.put(key, requester)
+        return requester
+
+    def public_keys(self, power_up_class: ClassVar) -> PublicKey:
+        """Same as ``Character.public_keys``, for the powers whose public keys are known."""
+        if power_up_class is SigningPower:
+            return self.verifying_key
+        if power_up_class is DecryptingPower and self.encrypting_key is not None:
+            return self.encrypting_key
+        raise power_up_class.not_found_error
+
+    def __eq__(self, other):
+        if not isinstance(other, RequesterIdentity):
+            return NotImplemented
+        return bytes(self.stamp) == bytes(other.stamp) and self.encrypting_key == other.encrypting_key
+
+    def __hash__(self):
+        return hash(bytes(self.stamp))
+
+    def __repr__(self):
+        return f"Bob({bytes(self.stamp).hex()[:10]})"
@@ -35,6 +35,7 @@ from nulink.cli.config import group_general_config
 from nulink.cli.literature import (
     DEVELOPMENT_MODE_WARNING,
     FORCE_MODE_WARNING,
+    SUCCESSFUL_DATASTORE_COMPACTION,
     SUCCESSFUL_MANUALLY_SAVE_METADATA
 )
 from nulink.cli.options import (
@@ -71,6 +72,9 @@ from nulink.config.constants import (
     TEMPORARY_DOMAIN
 )
 from nulink.crypto.keystore import Keystore
+from nulink.crypto.reencryption import ReencryptionEngine
+from nulink.datastore.datastore import Datastore
+from nulink.datastore.writer import BufferedRecordWriter
 
 
 class UrsulaConfigOptions:
@@ -93,6 +97,12 @@ class UrsulaConfigOptions:
                  max_gas_price: int,  # gwei
                  signer_uri: str,
                  availability_check: bool,
+                 reencryption_mode: str,
+                 reencryption_workers: int,
+                 audit_durability: str,
+                 audit_retention_days: int,
+                 audit_retention_count: int,
+                 lazy_verification: bool,
                  lonely: bool,
                  payment_method: str,
                  payment_provider: str,
@@ -120,6 +130,12 @@ class UrsulaConfigOptions:
         self.gas_strategy = gas_strategy
         self.max_gas_price = max_gas_price
         self.availability_check = availability_check
+        self.reencryption_mode = reencryption_mode
+        self.reencryption_workers = reencryption_workers
+        self.audit_durability = audit_durability
+        self.audit_retention_days = audit_retention_days
+        self.audit_retention_count = audit_retention_count
+        self.lazy_verification = lazy_verification
         self.lonely = lonely
         self.payment_method = payment_method
         self.payment_provider = payment_provider
@@ -145,6 +161,12 @@ class UrsulaConfigOptions:
                 rest_port=self.rest_port,
                 db_filepath=self.db_filepath,
                 availability_check=self.availability_check,
+                reencryption_mode=self.reencryption_mode,
+                reencryption_workers=self.reencryption_workers,
+                audit_durability=self.audit_durability,
+                audit_retention_days=self.audit_retention_days,
+                audit_retention_count=self.audit_retention_count,
+                lazy_verification=self.lazy_verification,
                 payment_method=self.payment_method,
                 payment_provider=self.payment_provider,
                 payment_network=self.payment_network
@@ -172,6 +194,12 @@ class UrsulaConfigOptions:
                     light=self.light,
                     federated_only=self.federated_only,
                     availability_check=self.availability_check,
+                    reencryption_mode=self.reencryption_mode,
+                    reencryption_workers=self.reencryption_workers,
+                    audit_durability=self.audit_durability,
+                    audit_retention_days=self.audit_retention_days,
+                    audit_retention_count=self.audit_retention_count,
+                    lazy_verification=self.lazy_verification,
                     payment_method=self.payment_method,
                     payment_provider=self.payment_provider,
                     payment_network=self.payment_network
@@ -217,6 +245,12 @@ class UrsulaConfigOptions:
                                             poa=self.poa,
                                             light=self.light,
                                             availability_check=self.availability_check,
+                                            reencryption_mode=self.reencryption_mode,
+                                            reencryption_workers=self.reencryption_workers,
+                                            audit_durability=self.audit_durability,
+                                            audit_retention_days=self.audit_retention_days,
+                                            audit_retention_count=self.audit_retention_count,
+                                            lazy_verification=self.lazy_verification,
                                             payment_method=self.payment_method,
                                             payment_provider=self.payment_provider,
                                             payment_network=self.payment_network
@@ -238,6 +272,12 @@ class UrsulaConfigOptions:
                        poa=self.poa,
                        light=self.light,
                        availability_check=self.availability_check,
+                       reencryption_mode=self.reencryption_mode,
+                       reencryption_workers=self.reencryption_workers,
+                       audit_durability=self.audit_durability,
+                       audit_retention_days=self.audit_retention_days,
+                       audit_retention_count=self.audit_retention_count,
+                       lazy_verification=self.lazy_verification,
                        payment_method=self.payment_method,
                        payment_provider=self.payment_provider,
                        payment_network=self.payment_network
@@ -266,6 +306,12 @@ group_config_options = group_options(
     light=option_light,
     dev=option_dev,
     availability_check=click.option('--availability-check/--disable-availability-check', help="Enable or disable self-health checks while running", is_flag=True, default=None),
+    reencryption_mode=click.option('--reencryption-mode', help="Re-encrypt large requests inline, in a thread pool or in a process pool", type=click.Choice(ReencryptionEngine.MODES)),
+    reencryption_workers=click.option('--reencryption-workers', help="Size of the re-encryption pool (default: number of CPUs)", type=click.IntRange(min=1)),
+    audit_durability=click.option('--audit-durability', help="Whether requests wait for their audit record to be written to disk ('sync'), or not ('async', or 'best-effort' to drop records under load)", type=click.Choice(BufferedRecordWriter.DURABILITY_MODES)),
+    audit_retention_days=click.option('--audit-retention-days', help="Delete reencryption request records older than this many days (0 for no limit, the default)", type=click.IntRange(min=0)),
+    audit_retention_count=click.option('--audit-retention-count', help="Keep at most this many reencryption request records (0 for no limit, the default)", type=click.IntRange(min=0)),
+    lazy_verification=click.option('--lazy-verification/--eager-verification', help="Verify known nodes in the background after startup, or before", is_flag=True, default=None),
     lonely=option_lonely,
     payment_provider=option_payment_provider,
     payment_network=option_payment_network,
@@ -388,6 +434,23 @@ def forget(general_config, config_options, config_file):
     forget_nodes(emitter, configuration=ursula_config)
 
 
+@ursula.command(name='compact-db')
+@group_config_options
+@option_config_file
+@group_general_config
+@click.option('--output', help="Directory to write the compacted datastore to", type=click.Path(path_type=Path))
+def compact_db(general_config, config_options, config_file, output):
+    """Write a compacted copy of the Ursula node's datastore."""
+    emitter = setup_emitter(general_config, config_options.operator_address)
+    _pre_launch_warnings(emitter, dev=config_options.dev, force=None)
+    ursula_config = config_options.create_config(emitter, config_file)
+    db_filepath = Path(ursula_config.db_filepath)
+    destination = output or db_filepath.with_name(f'{db_filepath.name}.compact')
+    Datastore(db_filepath).compact(destination)
+    emitter.message(SUCCESSFUL_DATASTORE_COMPACTION.format(destination=destination, db_filepath=db_filepath),
+                    color='green')
+
+
 # @ursula_run_origin_params_save
 @ursula.command()
 @group_character_options
@@ -325,6 +325,11 @@ SUCCESSFUL_CONFIRM_ACTIVITY = '\nCommitment was made to period #{committed_perio
 
 SUCCESSFUL_MANUALLY_SAVE_METADATA = "Successfully saved node metadata to {metadata_path}."
 
+SUCCESSFUL_DATASTORE_COMPACTION = '''
+Wrote a compacted copy of the datastore to {destination}.
+To use it, stop the node and replace {db_filepath} with the compacted copy.
+'''
+
 
 #
 # Porter
@@ -17,7 +17,7 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 import maya
 
 from nulink.config.constants import SEEDNODES
-from nulink.datastore.queries import get_reencryption_requests
+from nulink.datastore.queries import count_reencryption_requests
 
 
 def build_fleet_state_status(ursula) -> str:
@@ -41,8 +41,7 @@ def paint_node_status(emitter, ursula, start_time):
     # Build FleetState status line
     fleet_state = build_fleet_state_status(ursula=ursula)
 
-    reenc_requests = get_reencryption_requests(ursula.datastore)
-    num_reenc_requests = len(reenc_requests)
+    num_reenc_requests = count_reencryption_requests(ursula.datastore)
 
     stats = ['⇀URSULA {}↽'.format(ursula.nickname.icon),
              '{}'.format(ursula),
@@ -45,6 +45,7 @@ from nulink.blockchain.eth.signers import Signer
 from nulink.characters.lawful import Ursula
 from nulink.config import constants
 from nulink.config.storages import (
+    EmbeddedNodeStorage,
     ForgetfulNodeStorage,
     LocalFileBasedNodeStorage,
     NodeStorage
@@ -639,6 +640,11 @@ class CharacterConfiguration(BaseConfiguration):
         return self.__dev_mode
 
     def _setup_node_storage(self, node_storage=None) -> None:
+        if isinstance(node_storage, EmbeddedNodeStorage):
+            # Explicitly configured single-file storage; its metadata is meant to persist.
+            self.node_storage = node_storage
+            return
+
         # TODO: Disables node metadata persistence..
         # if self.dev_mode:
         #     node_storage = ForgetfulNodeStorage(registry=self.registry, federated_only=self.federated_only)
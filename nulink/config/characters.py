@@ -30,6 +30,8 @@ from nulink.config.constants import (
     NULINK_ENVVAR_ALICE_ETH_PASSWORD,
     NULINK_ENVVAR_BOB_ETH_PASSWORD
 )
+from nulink.crypto.reencryption import ReencryptionEngine
+from nulink.datastore.writer import BufferedRecordWriter
 from nulink.utilities.networking import LOOPBACK_ADDRESS
 
 
@@ -43,6 +45,9 @@ class UrsulaConfiguration(CharacterConfiguration):
     DEFAULT_DEVELOPMENT_REST_PORT = 10151
     DEFAULT_DB_NAME = f'{NAME}.db'
     DEFAULT_AVAILABILITY_CHECKS = False
+    DEFAULT_REENCRYPTION_MODE = ReencryptionEngine.SERIAL
+    DEFAULT_AUDIT_DURABILITY = BufferedRecordWriter.SYNC
+    DEFAULT_LAZY_VERIFICATION = False
     LOCAL_SIGNERS_ALLOWED = True
     SIGNER_ENVVAR = NULINK_ENVVAR_OPERATOR_ETH_PASSWORD
     MNEMONIC_KEYSTORE = True
@@ -56,6 +61,12 @@ class UrsulaConfiguration(CharacterConfiguration):
                  rest_port: int = None,
                  certificate: Certificate = None,
                  availability_check: bool = None,
+                 reencryption_mode: str = None,
+                 reencryption_workers: int = None,
+                 audit_durability: str = None,
+                 audit_retention_days: int = None,
+                 audit_retention_count: int = None,
+                 lazy_verification: bool = None,
                  *args, **kwargs) -> None:
 
         if dev_mode:
@@ -74,6 +85,12 @@ class UrsulaConfiguration(CharacterConfiguration):
         self.db_filepath = db_filepath or UNINITIALIZED_CONFIGURATION
         self.operator_address = operator_address
         self.availability_check = availability_check if availability_check is not None else self.DEFAULT_AVAILABILITY_CHECKS
+        self.reencryption_mode = reencryption_mode or self.DEFAULT_REENCRYPTION_MODE
+        self.reencryption_workers = reencryption_workers
+        self.audit_durability = audit_durability or self.DEFAULT_AUDIT_DURABILITY
+        self.audit_retention_days = audit_retention_days
+        self.audit_retention_count = audit_retention_count
+        self.lazy_verification = lazy_verification if lazy_verification is not None else self.DEFAULT_LAZY_VERIFICATION
         super().__init__(dev_mode=dev_mode, keystore_path=keystore_path, *args, **kwargs)
 
     @classmethod
@@ -116,6 +133,12 @@ class UrsulaConfiguration(CharacterConfiguration):
             rest_port=self.rest_port,
             db_filepath=self.db_filepath,
             availability_check=self.availability_check,
+            reencryption_mode=self.reencryption_mode,
+            reencryption_workers=self.reencryption_workers,
+            audit_durability=self.audit_durability,
+            audit_retention_days=self.audit_retention_days,
+            audit_retention_count=self.audit_retention_count,
+            lazy_verification=self.lazy_verification,
 
             # TODO: Resolve variable prefixing below (uses nested configuration fields?)
             payment_method=self.payment_method,
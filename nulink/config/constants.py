@@ -37,6 +37,8 @@ NULINK_ENVVAR_ETH_PROVIDER_URI = "NULINK_ETH_PROVIDER_URI"
 
 NULINK_ENVVAR_STAKING_PROVIDERS_PAGINATION_SIZE_LIGHT_NODE = "NULINK_STAKING_PROVIDERS_PAGINATION_SIZE_LIGHT_NODE"
 NULINK_ENVVAR_STAKING_PROVIDERS_PAGINATION_SIZE = "NULINK_STAKING_PROVIDERS_PAGINATION_SIZE"
+NULINK_ENVVAR_MULTICALL_BATCH_SIZE = "NULINK_MULTICALL_BATCH_SIZE"
+NULINK_ENVVAR_WORKER_THREADS = "NULINK_WORKER_THREADS"
 
 # Base Filepaths
 NULINK_PACKAGE = Path(nulink.__file__).parent.resolve()
@@ -65,6 +67,11 @@ NULINK_SENTRY_ENDPOINT = f"https://{NULINK_SENTRY_PUBLIC_KEY}@sentry.io/{NULINK_
 CLI_ROOT = NULINK_PACKAGE / 'network' / 'templates'
 TEMPLATES_DIR = CLI_ROOT / 'templates'
 MAX_UPLOAD_CONTENT_LENGTH = 1024 * 50
+MAX_REENCRYPTION_BATCH_SIZE = 64  # reencryption requests in a single /reencrypt_batch request
+
+# Fleet state based node metadata exchange
+FLEET_STATE_HEADER = 'X-Fleet-State'  # the checksum of the fleet state a teacher's response is based on
+FLEET_STATE_SINCE_PARAM = 'since'  # the checksum of the teacher's fleet state a learner has already learned
 
 
 # Dev Mode
@@ -16,10 +16,13 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import binascii
+import sqlite3
 import tempfile
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Optional, Set, Union
+from threading import Lock
+from typing import Any, Iterable, Iterator, Optional, Set, Union
 
 import OpenSSL
 from cryptography import x509
@@ -117,11 +120,31 @@ class NodeStorage(ABC):
     def store_node_certificate(self, certificate: Certificate, port: int) -> Path:
         raise NotImplementedError
 
+    def load_node_certificate(self, host: str, port: int) -> Optional[Certificate]:
+        """
+        Returns the stored TLS certificate of the node at ``host:port``, or ``None`` if there is none.
+        Raises ``ValueError`` if the stored certificate cannot be parsed.
+        """
+        certificate_filepath = self.generate_certificate_filepath(host=host, port=port)
+        try:
+            certificate_bytes = Path(certificate_filepath).read_bytes()
+        except FileNotFoundError:
+            return None
+        return x509.load_pem_x509_certificate(certificate_bytes, backend=default_backend())
+
     @abstractmethod
     def store_node_metadata(self, node, filepath: Optional[Path] = None) -> Path:
         """Save a single node's metadata and tls certificate"""
         raise NotImplementedError
 
+    def store_nodes_metadata(self, nodes: Iterable) -> int:
+        """Save the metadata of many nodes, and return how many were saved"""
+        stored = 0
+        for node in nodes:
+            self.store_node_metadata(node=node)
+            stored += 1
+        return stored
+
     @abstractmethod
     def generate_certificate_filepath(self, host: str, port: int) -> Path:
         raise NotImplementedError
@@ -492,3 +515,222 @@ class TemporaryFileBasedNodeStorage(LocalFileBasedNodeStorage):
         # Certificates
         self.__temp_certificates_dir = Path(self.__temp_root_dir) / "certs"
         self.certificates_dir = self.__temp_certificates_dir
+
+
+class EmbeddedNodeStorage(NodeStorage):
+    """
+    Stores the metadata and certificates of all the known nodes in a single SQLite database,
+    indexed by checksum address and host, instead of a file per node and per certificate.
+
+    Nodes are restored with a single sequential read (see `all`), and saved in bulk
+    in a single transaction (see `store_nodes_metadata`).  Certificates are read back
+    from the database too (see `load_node_certificate`); no file is written per node.
+    """
+
+    _name = 'embedded'
+    DEFAULT_DB_NAME = 'known_nodes.sqlite'
+
+    class InvalidNodeMetadata(NodeStorage.NodeStorageError):
+        """Node metadata is corrupt or not possible to parse"""
+
+    __SCHEMA = """
+        CREATE TABLE IF NOT EXISTS nodes (
+            stamp BLOB PRIMARY KEY,
+            checksum_address TEXT NOT NULL,
+            host TEXT NOT NULL,
+            port INTEGER NOT NULL,
+            timestamp INTEGER NOT NULL,
+            metadata BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS nodes_by_checksum_address ON nodes (checksum_address);
+        CREATE INDEX IF NOT EXISTS nodes_by_host ON nodes (host, port);
+        CREATE TABLE IF NOT EXISTS certificates (
+            host TEXT NOT NULL,
+            port INTEGER NOT NULL,
+            certificate BLOB NOT NULL,
+            PRIMARY KEY (host, port)
+        );
+    """
+
+    def __init__(self,
+                 config_root: Optional[Path] = None,
+                 storage_root: Optional[Path] = None,
+                 db_filepath: Optional[Path] = None,
+                 certificates_dir: Optional[Path] = None,
+                 *args, **kwargs
+                 ) -> None:
+        super().__init__(*args, **kwargs)
+        self.root_dir = storage_root or ((config_root or DEFAULT_CONFIG_ROOT) / 'known_nodes')
+        self.db_filepath = db_filepath or self.root_dir / self.DEFAULT_DB_NAME
+        self.certificates_dir = certificates_dir or self.root_dir / 'certificates'
+
+        self.__connection = None  # opened on first use
+        self.__lock = Lock()
+
+    @property
+    def source(self) -> Path:
+        """Human readable source string"""
+        return self.db_filepath
+
+    @contextmanager
+    def __transaction(self) -> Iterator[sqlite3.Connection]:
+        # The connection is shared by the learning loop and the reactor threads, one at a time.
+        with self.__lock:
+            if self.__connection is None:
+                self.db_filepath.parent.mkdir(parents=True, exist_ok=True)
+                self.__connection = sqlite3.connect(str(self.db_filepath), check_same_thread=False)
+                self.__connection.execute('PRAGMA journal_mode=WAL')
+                self.__connection.executescript(self.__SCHEMA)
+            with self.__connection as connection:  # commits, or rolls back on error
+                yield connection
+
+    #
+    # Certificates
+    #
+
+    def generate_certificate_filepath(self, host: str, port: int) -> Path:
+        return self.certificates_dir / f'{host}_{port}.{Encoding.PEM.name.lower()}'
+
+    def store_node_certificate(self, certificate: Certificate, port: int, force: bool = True) -> Path:
+        host = self._read_common_name(certificate)
+        verb = 'INSERT OR REPLACE' if force else 'INSERT'
+        try:
+            with self.__transaction() as connection:
+                connection.execute(f'{verb} INTO certificates (host, port, certificate) VALUES (?, ?, ?)',
+                                   (host, port, certificate.public_bytes(self.TLS_CERTIFICATE_ENCODING)))
+        except sqlite3.IntegrityError:
+            raise FileExistsError(f'A TLS certificate for {host}:{port} already exists in {self.db_filepath}.')
+        return self.db_filepath
+
+    def load_node_certificate(self, host: str, port: int) -> Optional[Certificate]:
+        with self.__transaction() as connection:
+            row = connection.execute('SELECT certificate FROM certificates WHERE host = ? AND port = ?',
+                                     (host, int(port))).fetchone()
+        if row is None:
+            return None
+        return self.__load_certificate(row[0])
+
+    @staticmethod
+    def __load_certificate(certificate_bytes: bytes) -> Certificate:
+        return x509.load_pem_x509_certificate(certificate_bytes, backend=default_backend())
+
+    #
+    # Metadata
+    #
+
+    @staticmethod
+    def __node_row(node) -> tuple:
+        return (bytes(node.stamp),
+                node.checksum_address,
+                node.rest_interface.host,
+                node.rest_interface.port,
+                node.timestamp.epoch,
+                bytes(node.metadata()))
+
+    def __read_metadata(self, metadata: bytes):
+        try:
+            return self.character_class.from_metadata_bytes(metadata)
+        except Exception as e:
+            raise self.InvalidNodeMetadata from e
+
+    def store_node_metadata(self, node, filepath: Optional[Path] = None) -> Path:
+        self.store_nodes_metadata([node])
+        return self.db_filepath
+
+    def store_nodes_metadata(self, nodes: Iterable) -> int:
+        rows = [self.__node_row(node) for node in nodes]
+        with self.__transaction() as connection:
+            connection.executemany('INSERT OR REPLACE INTO nodes '
+                                   '(stamp, checksum_address, host, port, timestamp, metadata) '
+                                   'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self.log.debug(f"Wrote metadata of {len(rows)} nodes to {self.db_filepath}")
+        return len(rows)
+
+    #
+    # API
+    #
+
+    def all(self, federated_only: bool, certificates_only: bool = False) -> Set[Union[Any, Certificate]]:
+        table, column = ('certificates', 'certificate') if certificates_only else ('nodes', 'metadata')
+        with self.__transaction() as connection:
+            rows = connection.execute(f'SELECT {column} FROM {table}').fetchall()
+        self.log.info(f"Found {len(rows)} known node {table} in {self.db_filepath}")
+
+        if certificates_only:
+            return {self.__load_certificate(certificate) for certificate, in rows}
+
+        known_nodes = set()
+        invalid_metadata = 0
+        for metadata, in rows:
+            try:
+                known_nodes.add(self.__read_metadata(metadata))
+            except self.NodeStorageError:
+                invalid_metadata += 1
+        if invalid_metadata:
+            self.log.warn(f"Couldn't read the metadata of {invalid_metadata} nodes in {self.db_filepath}")
+        return known_nodes
+
+    def get(self,
+            federated_only: bool,
+            stamp: Optional[Union[SignatureStamp, bytes, str]] = None,
+            checksum_address: Optional[str] = None,
+            host: Optional[str] = None,
+            certificate_only: bool = False):
+        """Retrieve a stored node (or its certificate) by its stamp, checksum address or host."""
+        if sum(key is not None for key in (stamp, checksum_address, host)) != 1:
+            raise ValueError("Pass exactly one of stamp, checksum_address or host.")
+        if stamp is not None:
+            where, value = 'nodes.stamp = ?', bytes.fromhex(stamp) if isinstance(stamp, str) else bytes(stamp)
+        elif checksum_address is not None:
+            where, value = 'nodes.checksum_address = ?', checksum_address
+        else:
+            where, value = 'host = ?', host
+
+        if not certificate_only:
+            query = f'SELECT metadata FROM nodes WHERE {where}'
+        elif host is not None:
+            query = f'SELECT certificate FROM certificates WHERE {where}'
+        else:
+            query = f'SELECT certificate FROM certificates JOIN nodes USING (host, port) WHERE {where}'
+        with self.__transaction() as connection:
+            row = connection.execute(query, (value, )).fetchone()
+
+        if row is None:
+            raise self.UnknownNode
+        return self.__load_certificate(row[0]) if certificate_only else self.__read_metadata(row[0])
+
+    def clear(self, metadata: bool = True, certificates: bool = True) -> None:
+        """Forget all stored nodes and certificates"""
+        with self.__transaction() as connection:
+            if metadata is True:
+                connection.execute('DELETE FROM nodes')
+            if certificates is True:
+                connection.execute('DELETE FROM certificates')
+
+    def payload(self) -> dict:
+        payload = {
+            'storage_type': self._name,
+            'storage_root': str(self.root_dir.absolute()),
+            'db_filepath': str(self.db_filepath.absolute()),
+            'certificates_dir': str(self.certificates_dir.absolute())
+        }
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: dict, *args, **kwargs) -> 'EmbeddedNodeStorage':
+        storage_type = payload[cls._TYPE_LABEL]
+        if not storage_type == cls._name:
+            raise cls.NodeStorageError("Wrong storage type. got {}".format(storage_type))
+        del payload['storage_type']
+
+        payload = cast_paths_from(cls, payload)
+
+        return cls(*args, **payload, **kwargs)
+
+    def initialize(self):
+        try:
+            self.db_filepath.parent.mkdir(mode=0o755, parents=True, exist_ok=True)
+        except OSError as e:
+            raise self.NodeStorageError(f"Cannot create the node storage at {self.root_dir}: {e}")
+        with self.__transaction():
+            pass  # creates the database
@@ -0,0 +1,122 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from nucypher_core.umbral import Capsule, VerifiedCapsuleFrag, VerifiedKeyFrag, reencrypt
+
+
+def _reencrypt_chunk(kfrag: VerifiedKeyFrag, capsules: Sequence[Capsule]) -> List[VerifiedCapsuleFrag]:
+    return [reencrypt(capsule, kfrag) for capsule in capsules]
+
+
+def _reencrypt_serialized_chunk(kfrag_bytes: bytes, capsules_bytes: Sequence[bytes]) -> List[bytes]:
+    # Umbral objects cannot be pickled, so they cross the process boundary as bytes.
+    # The kfrag was verified by the parent process before it was handed over.
+    kfrag = VerifiedKeyFrag.from_verified_bytes(kfrag_bytes)
+    capsules = [Capsule.from_bytes(capsule_bytes) for capsule_bytes in capsules_bytes]
+    return [bytes(cfrag) for cfrag in _reencrypt_chunk(kfrag, capsules)]
+
+
+class ReencryptionEngine:
+    """
+    Re-encrypts the capsules of a reencryption request, either inline or split in chunks across a pool of
+    threads or processes.  Whatever the mode, the cfrags are returned in the order of the capsules.
+
+    Requests with fewer than ``inline_threshold`` capsules are always re-encrypted inline,
+    as dispatching them to a pool would cost more than it saves.
+    """
+
+    SERIAL = 'serial'
+    THREADS = 'threads'
+    PROCESSES = 'processes'
+    MODES = (SERIAL, THREADS, PROCESSES)
+
+    DEFAULT_CHUNK_SIZE = 16
+    DEFAULT_INLINE_THRESHOLD = 32
+
+    def __init__(self,
+                 mode: str = SERIAL,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 inline_threshold: int = DEFAULT_INLINE_THRESHOLD):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown reencryption mode '{mode}'; expected one of {', '.join(self.MODES)}")
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, got {chunk_size}")
+
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.inline_threshold = inline_threshold
+
+        self._executor = None  # created on first use
+        self._lock = Lock()
+
+        # Metrics
+        self.capsules = 0
+        self.inline_requests = 0
+        self.pooled_requests = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == self.THREADS:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='reencryption')
+                else:
+                    # Ursula runs threads of her own (the reactor, learning loop, etc.), which do not survive a fork
+                    context = multiprocessing.get_context('spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def reencrypt(self, kfrag: VerifiedKeyFrag, capsules: Iterable[Capsule]) -> List[VerifiedCapsuleFrag]:
+        capsules = list(capsules)
+        self.capsules += len(capsules)
+
+        if self.mode == self.SERIAL or len(capsules) < self.inline_threshold:
+            self.inline_requests += 1
+            return _reencrypt_chunk(kfrag, capsules)
+
+        self.pooled_requests += 1
+        chunks = [capsules[i:i + self.chunk_size] for i in range(0, len(capsules), self.chunk_size)]
+        executor = self._get_executor()
+
+        if self.mode == self.THREADS:
+            results = executor.map(_reencrypt_chunk, repeat(kfrag), chunks)
+            return [cfrag for chunk in results for cfrag in chunk]
+
+        serialized_chunks = [[bytes(capsule) for capsule in chunk] for chunk in chunks]
+        results = executor.map(_reencrypt_serialized_chunk, repeat(bytes(kfrag)), serialized_chunks)
+        return [VerifiedCapsuleFrag.from_verified_bytes(cfrag) for chunk in results for cfrag in chunk]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, float]:
+        return dict(workers=self.workers if self.mode != self.SERIAL else 0,
+                    capsules=self.capsules,
+                    inline_requests=self.inline_requests,
+                    pooled_requests=self.pooled_requests)
@@ -15,7 +15,7 @@ You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 import msgpack
-from typing import Any, Callable, Iterable, NamedTuple, Union
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
 
 
 class DBWriteError(Exception):
@@ -51,7 +51,62 @@ class RecordField(NamedTuple):
     decode: Callable[[bytes], Any] = lambda field: field
 
 
+class RetentionPolicy(NamedTuple):
+    """
+    A `RetentionPolicy` says how long the records of a type are kept in the datastore.
+
+    Records older than `max_age` seconds, and the oldest records beyond the
+    first `max_count`, are expired; either limit is optional. The age of records
+    is read from `index`, the name of an index of the record type whose first
+    field is the time (as an epoch) at which each record was written. Records
+    missing from that index are never expired.
+    """
+    index: str
+    max_age: Optional[int] = None
+    max_count: Optional[int] = None
+
+
+def encode_index_key(values: Iterable[Any]) -> bytes:
+    """
+    Encodes a sequence of (`RecordField.encode`d) field values to an index key.
+    Index keys sort in the same order as the values they encode, compared
+    component by component, so that index ranges can be read with a cursor.
+    The key of a prefix of the values is a prefix of the key of the values.
+    """
+    key = b''
+    for value in values:
+        if isinstance(value, str):
+            value = value.encode()
+        if isinstance(value, bytes):
+            # Escaping NUL bytes lets the terminator sort before any continuation of the value
+            key += value.replace(b'\x00', b'\x00\xff') + b'\x00\x00'
+        elif isinstance(value, int):
+            key += (value + 2**63).to_bytes(8, 'big')
+        else:
+            raise TypeError(f"Cannot index values of type {type(value)}")
+    return key
+
+
 class DatastoreRecord:
+    """
+    A record in the datastore, with its fields declared as `RecordField` class attributes.
+
+    Secondary indexes are declared in `_indexes`, which maps index names to
+    the fields (in order) that each index is sorted by, for instance:
+
+        _indexes = {'bob': ('bob_verifying_key', 'timestamp')}
+
+    Only records with a value for all the fields of an index are indexed.
+    Indexes are kept in their own LMDB databases, and are updated in the same
+    transaction as the records.  See `Datastore.query_by` to query them.
+
+    The default `RetentionPolicy` of the records is declared in `_retention`;
+    records are kept forever if it is `None`.
+    """
+
+    _indexes: Dict[str, Tuple[str, ...]] = {}
+    _retention: Optional[RetentionPolicy] = None
+
     def __new__(cls, *args, **kwargs):
         # Set default class attributes for the new instance
         cls.__writeable = None
@@ -61,9 +116,11 @@ class DatastoreRecord:
     def __init__(self,
                  db_transaction: 'lmdb.Transaction',
                  record_id: Union[int, str],
-                 writeable: bool = False) -> None:
+                 writeable: bool = False,
+                 index_dbs: Optional[Dict[str, Any]] = None) -> None:
         self._record_id = record_id
         self.__db_transaction = db_transaction
+        self.__index_dbs = index_dbs
         self.__writeable = writeable
 
     def __setattr__(self, attr: str, value: Any) -> None:
@@ -99,15 +156,18 @@ class DatastoreRecord:
         # A datastore record is only mutated iff writeable is True.
         elif self.__writeable is True:
             record_field = self.__get_record_field(attr)
+            stale_index_keys = self.__index_keys(attr)
 
             # We delete records by setting the record to `None`.
             if value is None:
-                return self.__delete_record(attr)
+                self.__delete_record(attr)
+            else:
+                if not type(value) == record_field.field_type:
+                    raise TypeError(f'Given record is type {type(value)}; expected {record_field.field_type}')
+                field_value = msgpack.packb(record_field.encode(value))
+                self.__write_raw_record(attr, field_value)
 
-            if not type(value) == record_field.field_type:
-                raise TypeError(f'Given record is type {type(value)}; expected {record_field.field_type}')
-            field_value = msgpack.packb(record_field.encode(value))
-            self.__write_raw_record(attr, field_value)
+            self.__update_indexes(attr, stale_index_keys)
 
     def __getattr__(self, attr: str) -> Any:
         """
@@ -162,6 +222,49 @@ class DatastoreRecord:
             # We do this check to ensure that the key was actually deleted.
             raise DBWriteError(f"Couldn't delete the record (key: {key}) from the database.")
 
+    def __index_keys(self, record_field: str) -> Dict[str, Optional[bytes]]:
+        """
+        Returns the current keys of this record in the indexes that include `record_field`
+        (`None` for the indexes this record is not in).
+        """
+        index_keys = dict()
+        for index_name, fields in self._indexes.items():
+            if record_field not in fields:
+                continue
+            values = []
+            for field in fields:
+                key = self.__storagekey.format(record_field=field, record_id=self._record_id).encode()
+                field_value = self.__db_transaction.get(key, default=None)
+                if field_value is None:
+                    break
+                values.append(msgpack.unpackb(field_value))
+            else:
+                index_keys[index_name] = encode_index_key(values) + msgpack.packb(self._record_id)
+                continue
+            index_keys[index_name] = None
+        return index_keys
+
+    def __update_indexes(self, record_field: str, stale_index_keys: Dict[str, Optional[bytes]]) -> None:
+        """
+        Moves this record in the indexes that include `record_field`, after it was written or deleted.
+        If the indexes are unable to be written, this method raises a `DBWriteError`.
+        """
+        if not stale_index_keys:
+            return
+        if self.__index_dbs is None:
+            raise DBWriteError(f"{self.__class__.__name__} records are indexed, and must be written through a Datastore.")
+
+        for index_name, index_key in self.__index_keys(record_field).items():
+            stale_index_key = stale_index_keys[index_name]
+            if index_key == stale_index_key:
+                continue
+            index_db = self.__index_dbs[index_name]
+            if stale_index_key is not None:
+                self.__db_transaction.delete(stale_index_key, db=index_db)
+            if index_key is not None:
+                if not self.__db_transaction.put(index_key, msgpack.packb(self._record_id), overwrite=True, db=index_db):
+                    raise DBWriteError(f"Couldn't write the {index_name} index of the record (ID: {self._record_id}).")
+
     def __get_record_field(self, attr: str) -> 'RecordField':
         """
         Uses `getattr` to return the `RecordField` object for a given
@@ -198,6 +301,19 @@ class DatastoreRecord:
         """
         return hash(self._record_id)
 
+    def reindex(self, index_names: Iterable[str]) -> None:
+        """
+        Writes the entries of this record in the given indexes, regardless of their current entries:
+        used to index the records written before their indexes existed.
+        """
+        for index_name in index_names:
+            index_key = self.__index_keys(self._indexes[index_name][0])[index_name]
+            if index_key is None:
+                continue
+            index_db = self.__index_dbs[index_name]
+            if not self.__db_transaction.put(index_key, msgpack.packb(self._record_id), overwrite=True, db=index_db):
+                raise DBWriteError(f"Couldn't write the {index_name} index of the record (ID: {self._record_id}).")
+
     def delete(self):
         """
         Deletes the entire record.
@@ -14,14 +14,17 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
+import time
 from pathlib import Path
 
 import lmdb
+import msgpack
 from contextlib import contextmanager, suppress
 from functools import partial
-from typing import Any, Callable, Generator, List, NamedTuple, Optional, Type, Union
+from threading import Lock
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
 
-from nulink.datastore.base import DatastoreRecord, DBWriteError
+from nulink.datastore.base import DatastoreRecord, DBWriteError, RecordField, RetentionPolicy, encode_index_key
 from .util import get_free_space_mb
 
 DatastoreQueryResult = Generator[List[Type['DatastoreRecord']], None, None]
@@ -87,6 +90,12 @@ class Datastore:
     # We can set this arbitrarily high (50GB) to prevent any run-time crashes.
     LMDB_MAP_SIZE = 50_000_000_000
 
+    # Each secondary index of a record type is a named LMDB database.
+    LMDB_MAX_DBS = 64
+
+    # Records read by `query_iter` in each read transaction
+    DEFAULT_PAGE_SIZE = 100
+
     def __init__(self, db_path: Path, map_size=None) -> None:
         """
         Initializes a Datastore object by path.
@@ -103,7 +112,42 @@ class Datastore:
         if map_size < 10_000_000_000:
             raise Exception(f"the disk {db_path.anchor} available space must greater than 20 G")
 
-        self.__db_env = lmdb.open(str(db_path), map_size=map_size)
+        self.__db_env = lmdb.open(str(db_path), map_size=map_size, max_dbs=self.LMDB_MAX_DBS)
+        self.__index_dbs = dict()
+        self.__index_dbs_lock = Lock()
+
+    def __get_index_dbs(self, record_type: Type['DatastoreRecord']) -> Dict[str, Any]:
+        """
+        Returns the LMDB databases of the indexes of `record_type`, by index name, creating them if needed.
+        Must not be called while this thread has a write transaction open.
+        """
+        with self.__index_dbs_lock:
+            index_dbs = self.__index_dbs.get(record_type)
+            if index_dbs is None:
+                # Named databases are listed in the main database, after the records (see `query_by`).
+                index_dbs = {index_name: self.__db_env.open_db(f'~index:{record_type.__name__}:{index_name}'.encode())
+                             for index_name in record_type._indexes}
+                self.__backfill_indexes(record_type, index_dbs)
+                self.__index_dbs[record_type] = index_dbs
+            return index_dbs
+
+    def __backfill_indexes(self, record_type: Type['DatastoreRecord'], index_dbs: Dict[str, Any]) -> int:
+        """
+        Indexes are only written along with the records, so the records written before an index was declared
+        are missing from it: fills the empty indexes of `record_type` with the existing records.
+        Returns how many records were indexed.
+        """
+        with self.__db_env.begin(write=True) as datastore_tx:
+            empty_indexes = [index_name for index_name, index_db in index_dbs.items()
+                             if datastore_tx.stat(index_db)['entries'] == 0]
+            if not empty_indexes:
+                return 0
+            indexed = 0
+            for _, record_id in self.__scan_keys(datastore_tx, record_type, filter_field=''):
+                record = record_type(datastore_tx, record_id, writeable=True, index_dbs=index_dbs)
+                record.reindex(empty_indexes)
+                indexed += 1
+        return indexed
 
     @contextmanager
     def describe(self,
@@ -128,22 +172,132 @@ class Datastore:
         If the record is used outside the scope of the context manager, any
         writes or reads will error.
         """
-        with suppress(ValueError):
-            # If the ID can be converted to an int, we do it.
-            record_id = int(record_id)
+        with self.describe_many(record_type, [record_id], writeable=writeable) as (record, ):
+            yield record
+
+    @contextmanager
+    def describe_many(self,
+                      record_type: Type['DatastoreRecord'],
+                      record_ids: Iterable[Union[int, str]],
+                      writeable: bool = False) -> DatastoreQueryResult:
+        """
+        Like `describe`, but returns the records of `record_type` identified
+        by each of the `record_ids`, in the same order, all in a single transaction.
 
+        When `writeable` is `True`, the writes to all the records are committed
+        together at the end of the context manager; if an error occurs, none of
+        them is written and a `DatastoreTransactionError` is raised.
+        """
+        ids = []
+        for record_id in record_ids:
+            with suppress(ValueError):
+                # If the ID can be converted to an int, we do it.
+                record_id = int(record_id)
+            ids.append(record_id)
+
+        index_dbs = self.__get_index_dbs(record_type)
         with self.__db_env.begin(write=writeable) as datastore_tx:
-            record = record_type(datastore_tx, record_id, writeable=writeable)
+            records = [record_type(datastore_tx, record_id, writeable=writeable, index_dbs=index_dbs)
+                       for record_id in ids]
             try:
-                yield record
+                yield records
             except (AttributeError, TypeError, DBWriteError) as tx_err:
                 # Handle `RecordNotFound` cases when `writeable` is `False`.
                 if not writeable and isinstance(tx_err, AttributeError):
                     raise RecordNotFound(tx_err)
                 raise DatastoreTransactionError(f'An error was encountered during the transaction (no data was written): {tx_err}')
             finally:
-                # Now we ensure that the record is not writeable
-                record.__dict__['_DatastoreRecord__writeable'] = False
+                # Now we ensure that the records are not writeable
+                for record in records:
+                    record.__dict__['_DatastoreRecord__writeable'] = False
+
+    def write_records(self,
+                      records: Iterable[Tuple[Type['DatastoreRecord'], Union[int, str], Dict[str, Any]]]
+                      ) -> int:
+        """
+        Writes many records in a single transaction, and returns how many were written.
+        Each record is given as a `(record_type, record_id, fields)` tuple, where
+        `fields` maps field names to their values.
+
+        Either all the records are written or, if an error occurs, none of them are,
+        and a `DatastoreTransactionError` is raised.
+        """
+        records = list(records)
+        index_dbs = {record_type: self.__get_index_dbs(record_type) for record_type, _, _ in records}
+
+        written = 0
+        try:
+            with self.__db_env.begin(write=True) as datastore_tx:
+                for record_type, record_id, fields in records:
+                    with suppress(ValueError):
+                        record_id = int(record_id)
+                    record = record_type(datastore_tx, record_id, writeable=True, index_dbs=index_dbs[record_type])
+                    for field, value in fields.items():
+                        setattr(record, field, value)
+                    record.__dict__['_DatastoreRecord__writeable'] = False
+                    written += 1
+        except (AttributeError, TypeError, DBWriteError) as tx_err:
+            raise DatastoreTransactionError(f'An error was encountered during the transaction (no data was written): {tx_err}')
+        return written
+
+    def expire(self,
+               record_type: Type['DatastoreRecord'],
+               retention: Optional[RetentionPolicy] = None,
+               now: Optional[float] = None,
+               max_records: int = 1000
+               ) -> int:
+        """
+        Deletes the records of `record_type` that are past their `retention`
+        (by default, the `RetentionPolicy` of the record type), oldest first,
+        and returns how many were deleted.
+
+        At most `max_records` records are deleted, in a single transaction, so
+        that other writers are not locked out for long: call this method again
+        until it returns less than `max_records` to delete all the expired records.
+        """
+        retention = retention or record_type._retention
+        if retention is None or (retention.max_age is None and retention.max_count is None):
+            return 0
+
+        index_dbs = self.__get_index_dbs(record_type)
+        try:
+            index_db = index_dbs[retention.index]
+        except KeyError:
+            raise ValueError(f"{record_type.__name__} has no index '{retention.index}'")
+
+        with self.__db_env.begin(write=True) as datastore_tx:
+            excess = 0
+            if retention.max_count is not None:
+                excess = max(0, datastore_tx.stat(index_db)['entries'] - retention.max_count)
+            cutoff_key = None
+            if retention.max_age is not None:
+                cutoff = int((now if now is not None else time.time()) - retention.max_age)
+                cutoff_key = encode_index_key((cutoff,))
+
+            # Records are sorted by age in the index, so expired records are the first ones
+            expired_records = []
+            for index_key, record_id in self.__scan_index(datastore_tx, index_db):
+                if len(expired_records) >= max_records:
+                    break
+                if len(expired_records) >= excess and (cutoff_key is None or index_key >= cutoff_key):
+                    break
+                expired_records.append(record_id)
+
+            try:
+                for record_id in expired_records:
+                    record_type(datastore_tx, record_id, writeable=True, index_dbs=index_dbs).delete()
+            except (AttributeError, TypeError, DBWriteError) as tx_err:
+                raise DatastoreTransactionError(f'An error was encountered during the transaction (no data was written): {tx_err}')
+
+        return len(expired_records)
+
+    def compact(self, destination: Path) -> None:
+        """
+        Writes a compacted copy of the datastore, without its free pages, to the
+        (new or empty) `destination` directory. The datastore can be used meanwhile.
+        """
+        destination.mkdir(parents=True, exist_ok=True)
+        self.__db_env.copy(str(destination), compact=True)
 
     @contextmanager
     def query_by(self,
@@ -151,6 +305,10 @@ class Datastore:
                  filter_func: Optional[Callable[[Union[Any, Type['DatastoreRecord']]], bool]] = None,
                  filter_field: str = "",
                  writeable: bool = False,
+                 index: Optional[str] = None,
+                 start: Optional[Sequence[Any]] = None,
+                 end: Optional[Sequence[Any]] = None,
+                 limit: Optional[int] = None,
                  ) -> DatastoreQueryResult:
         """
         Performs a query on the datastore for the record by `record_type`.
@@ -167,66 +325,44 @@ class Datastore:
         Additionally, providing a `filter_field` will limit the query to
         iterating over only the subset of records specific to that field.
 
+        An optional `index` can be provided to read the records from one of the
+        secondary indexes of the `record_type` (see `DatastoreRecord`), in the
+        order of the index. The optional `start` and `end` args restrict the
+        query to a range of the index; each is a sequence of (`RecordField.encode`d)
+        values for the first fields of the index. `start` is inclusive, and so
+        is `end`, for all the records matching its values. For instance, with an
+        index on `('bob_verifying_key', 'timestamp')`, the records of a Bob since
+        a given time are queried with `start=(key, since), end=(key,)`.
+        The `filter_func` is still applied to the records of the range.
+
+        An optional `limit` caps the number of records returned.
+
         If records can't be found, this method will raise `RecordNotFound`.
         """
-        valid_records = set()
-        with self.__db_env.begin(write=writeable) as datastore_tx:
-            db_cursor = datastore_tx.cursor()
-
-            # Set the cursor to the closest key (if it exists) by the query params.
-            #
-            # By providing a `filter_field`, the query will immediately be
-            # limited to the subset of keys for the `filter_field`.
-            query_key = f'{record_type.__name__}:{filter_field}'.encode()
-            if not db_cursor.set_range(query_key):
-                # The cursor couldn't identify any records by the key
-                raise RecordNotFound(f"No records exist for the key from the specified query parameters: '{query_key}'")
+        if index is None and (start is not None or end is not None):
+            raise ValueError("A range can only be queried on an index.")
 
-            # Check if the record at the cursor is valid for the query
-            curr_key = DatastoreKey.from_bytestring(db_cursor.key())
-            if not curr_key.compare_key(query_key):
-                raise RecordNotFound(f"No records exist for the key from the specified query parameters: '{query_key}'")
+        index_dbs = self.__get_index_dbs(record_type)
+        if index is not None and index not in index_dbs:
+            raise ValueError(f"{record_type.__name__} has no index '{index}'")
 
-            # Everything checks out, let's begin iterating!
-            # We begin by comparing the current key to the query key.
-            # If the key doesn't match the query key, we know that there are
-            # no records for the query because lmdb orders the keys lexicographically.
-            # Ergo, if the current key doesn't match the query key, we know
-            # we have gone beyond the relevant keys and can `break` the loop.
-            # Additionally, if the record is already in the `valid_records`
-            # set (identified by the `record_id`, we call `continue`.
-            for db_key in db_cursor.iternext(keys=True, values=False):
-                curr_key = DatastoreKey.from_bytestring(db_key)
-                if not curr_key.compare_key(query_key):
-                    break
-                elif curr_key.record_id in valid_records:
+        is_valid = self.__record_filter(filter_func, filter_field)
+        with self.__db_env.begin(write=writeable) as datastore_tx:
+            if index is not None:
+                record_ids = self.__scan_index(datastore_tx, index_dbs[index], start=start, end=end)
+                query_key = f'{record_type.__name__}:{index}'
+            else:
+                record_ids = self.__scan_keys(datastore_tx, record_type, filter_field)
+                query_key = f'{record_type.__name__}:{filter_field}'
+
+            valid_records = []
+            for _, record_id in record_ids:
+                record = partial(record_type, datastore_tx, record_id, index_dbs=index_dbs)
+                if not is_valid(record):
                     continue
-
-                record = partial(record_type, datastore_tx, curr_key.record_id)
-
-                # We pass the field to the filter_func if `filter_field` and
-                # `filter_func` are both provided. In the event that the
-                # given `filter_field` doesn't exist for the record or the
-                # `filter_func` returns `False`, we call `continue`.
-                if filter_field and filter_func:
-                    try:
-                        field = getattr(record(writeable=False), filter_field)
-                    except (TypeError, AttributeError):
-                        continue
-                    else:
-                        if not filter_func(field):
-                            continue
-
-                # If only a filter_func is given, we pass a readonly record to it.
-                # Likewise to the above, if `filter_func` returns `False`, we
-                # call `continue`.
-                elif filter_func:
-                    if not filter_func(record(writeable=False)):
-                        continue
-
-                # Finally, having a record that satisfies the above conditional
-                # constraints, we can add the record to the set
-                valid_records.add(record(writeable=writeable))
+                valid_records.append(record(writeable=writeable))
+                if limit and len(valid_records) >= limit:
+                    break
 
             # If after the iteration we have no records, we raise `RecordNotFound`
             if len(valid_records) == 0:
@@ -243,3 +379,152 @@ class Datastore:
             finally:
                 for record in valid_records:
                     record.__dict__['_DatastoreRecord__writeable'] = False
+
+    def query_iter(self,
+                   record_type: Type['DatastoreRecord'],
+                   filter_func: Optional[Callable[[Union[Any, Type['DatastoreRecord']]], bool]] = None,
+                   filter_field: str = "",
+                   index: Optional[str] = None,
+                   start: Optional[Sequence[Any]] = None,
+                   end: Optional[Sequence[Any]] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE,
+                   ) -> Iterator['DatastoreRecord']:
+        """
+        Iterates over the records of `record_type` matching a query (see `query_by`
+        for the args), reading them in pages of `page_size` records, each page in
+        its own read transaction.
+
+        Unlike `query_by`, which reads all the matching records in one transaction,
+        memory use is bounded by the page size, and the read snapshot is released
+        between pages, which lets LMDB reuse the pages freed by writers meanwhile.
+        As a consequence, the iteration is not a consistent snapshot: records
+        written or deleted during the iteration may or may not be returned.
+
+        The records are readonly, and can only be read until the iteration moves
+        on to the next page. No error is raised if there are no records.
+        """
+        if index is None and (start is not None or end is not None):
+            raise ValueError("A range can only be queried on an index.")
+        if page_size < 1:
+            raise ValueError(f"Page size must be positive, got {page_size}")
+
+        index_dbs = self.__get_index_dbs(record_type)
+        if index is not None and index not in index_dbs:
+            raise ValueError(f"{record_type.__name__} has no index '{index}'")
+
+        is_valid = self.__record_filter(filter_func, filter_field)
+        position = None  # The key of the last record read
+        while True:
+            with self.__db_env.begin() as datastore_tx:
+                if index is not None:
+                    record_ids = self.__scan_index(datastore_tx, index_dbs[index], start=start, end=end, after=position)
+                else:
+                    record_ids = self.__scan_keys(datastore_tx, record_type, filter_field, after=position)
+
+                # Filtered out records count towards the page size too, so that
+                # selective queries do not hold a transaction for long either.
+                page, scanned = [], 0
+                for position, record_id in record_ids:
+                    record = partial(record_type, datastore_tx, record_id, index_dbs=index_dbs)
+                    if is_valid(record):
+                        page.append(record(writeable=False))
+                    scanned += 1
+                    if scanned >= page_size:
+                        break
+                else:
+                    # There are no more records
+                    yield from page
+                    return
+
+                yield from page
+
+    @staticmethod
+    def __record_filter(filter_func: Optional[Callable[[Union[Any, Type['DatastoreRecord']]], bool]],
+                        filter_field: str
+                        ) -> Callable[[Callable[..., 'DatastoreRecord']], bool]:
+        """Returns the function that checks whether a record matches a query, for `query_by` and `query_iter`."""
+        def is_valid(record: Callable[..., 'DatastoreRecord']) -> bool:
+            # We pass the field to the filter_func if `filter_field` and
+            # `filter_func` are both provided. In the event that the
+            # given `filter_field` doesn't exist for the record or the
+            # `filter_func` returns `False`, the record is not valid.
+            if filter_field and filter_func:
+                try:
+                    field = getattr(record(writeable=False), filter_field)
+                except (TypeError, AttributeError):
+                    return False
+                return filter_func(field)
+
+            # If only a filter_func is given, we pass a readonly record to it.
+            elif filter_func:
+                return filter_func(record(writeable=False))
+            return True
+
+        return is_valid
+
+    @staticmethod
+    def __scan_keys(datastore_tx: 'lmdb.Transaction',
+                    record_type: Type['DatastoreRecord'],
+                    filter_field: str,
+                    after: Optional[bytes] = None
+                    ) -> Iterator[Tuple[bytes, Union[int, str]]]:
+        """
+        Scans the records of `record_type` (or only those with a `filter_field`),
+        yielding the key and ID of each record once, starting after the key `after`.
+        """
+        db_cursor = datastore_tx.cursor()
+
+        # Set the cursor to the closest key (if it exists) by the query params.
+        #
+        # By providing a `filter_field`, the query will immediately be
+        # limited to the subset of keys for the `filter_field`.
+        query_key = f'{record_type.__name__}:{filter_field}'.encode()
+        if not db_cursor.set_range(after or query_key):
+            # The cursor couldn't identify any records by the key
+            return
+
+        # Without a `filter_field`, there is a key for each field of a record;
+        # a record is only yielded for the first of its fields in the key order.
+        fields = [] if filter_field else [class_var[1:] for class_var in record_type.__dict__
+                                          if type(record_type.__dict__[class_var]) == RecordField]
+
+        # We begin by comparing the current key to the query key.
+        # If the key doesn't match the query key, we know that there are
+        # no records for the query because lmdb orders the keys lexicographically.
+        # Ergo, if the current key doesn't match the query key, we know
+        # we have gone beyond the relevant keys and can stop.
+        for db_key in db_cursor.iternext(keys=True, values=False):
+            if db_key == after:
+                continue
+            curr_key = DatastoreKey.from_bytestring(db_key)
+            if not curr_key.compare_key(query_key):
+                break
+
+            earlier_keys = (f'{record_type.__name__}:{field}:{curr_key.record_id}'.encode() for field in fields)
+            if any(key < db_key and datastore_tx.get(key) is not None for key in earlier_keys):
+                continue
+            yield db_key, curr_key.record_id
+
+    @staticmethod
+    def __scan_index(datastore_tx: 'lmdb.Transaction',
+                     index_db: Any,
+                     start: Optional[Sequence[Any]] = None,
+                     end: Optional[Sequence[Any]] = None,
+                     after: Optional[bytes] = None
+                     ) -> Iterator[Tuple[bytes, Union[int, str]]]:
+        """
+        Scans a range of an index (see `query_by`) in order, yielding the
+        index key and ID of each record, starting after the index key `after`.
+        """
+        db_cursor = datastore_tx.cursor(db=index_db)
+        if not db_cursor.set_range(after or encode_index_key(start or ())):
+            return
+
+        # All the keys of the records matching `end` start with its encoding
+        end_key = encode_index_key(end) if end is not None else None
+        for index_key, record_id in db_cursor.iternext(keys=True, values=True):
+            if index_key == after:
+                continue
+            if end_key is not None and index_key > end_key and not index_key.startswith(end_key):
+                break
+            yield index_key, msgpack.unpackb(record_id)
@@ -15,9 +15,11 @@ You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import maya
+from maya import MayaDT
 from nucypher_core.umbral import PublicKey
 
-from nulink.datastore.base import DatastoreRecord, RecordField
+from nulink.datastore.base import DatastoreRecord, RecordField, RetentionPolicy
 
 
 class ReencryptionRequest(DatastoreRecord):
@@ -25,3 +27,12 @@ class ReencryptionRequest(DatastoreRecord):
             PublicKey,
             encode=bytes,
             decode=PublicKey.from_bytes)
+    _timestamp = RecordField(
+            MayaDT,
+            encode=lambda maya_date: maya_date.epoch,
+            decode=maya.MayaDT)
+
+    _indexes = {'bob': ('bob_verifying_key', 'timestamp'),
+                'timestamp': ('timestamp',)}
+    # Audit records: kept until the operator sets a limit (see Ursula's `audit_retention_*` options)
+    _retention = RetentionPolicy(index='timestamp')
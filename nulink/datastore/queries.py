@@ -16,7 +16,10 @@
 """
 
 import functools
-from typing import Callable, List, Type
+from typing import Callable, List, Optional, Type
+
+from maya import MayaDT
+from nucypher_core.umbral import PublicKey
 
 from nulink.datastore.base import DatastoreRecord
 from nulink.datastore.datastore import Datastore, DatastoreQueryResult, RecordNotFound
@@ -47,3 +50,19 @@ def unwrap_records(func: Callable[..., DatastoreQueryResult]) -> Callable[..., L
 @unwrap_records
 def get_reencryption_requests(ds: Datastore) -> List[ReencryptionRequest]:
     return ds.query_by(ReencryptionRequest)
+
+
+def count_reencryption_requests(ds: Datastore) -> int:
+    """Counts the reencryption requests, without reading them all in memory or in a single transaction."""
+    return sum(1 for _ in ds.query_iter(ReencryptionRequest))
+
+
+@unwrap_records
+def get_reencryption_requests_from(ds: Datastore,
+                                   bob_verifying_key: PublicKey,
+                                   since: Optional[MayaDT] = None,
+                                   limit: Optional[int] = None
+                                   ) -> List[ReencryptionRequest]:
+    """Returns the reencryption requests of a Bob (since a given time), oldest first."""
+    start = (bytes(bob_verifying_key), since.epoch) if since else (bytes(bob_verifying_key),)
+    return ds.query_by(ReencryptionRequest, index='bob', start=start, end=(bytes(bob_verifying_key),), limit=limit)
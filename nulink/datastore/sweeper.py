@@ -0,0 +1,82 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+from typing import Dict, Type
+
+from twisted.internet import threads
+from twisted.internet.defer import Deferred
+from twisted.python.failure import Failure
+
+from nulink.datastore.base import DatastoreRecord, RetentionPolicy
+from nulink.datastore.datastore import Datastore
+from nulink.utilities.task import SimpleTask
+
+
+class DatastoreSweeper(SimpleTask):
+    """
+    Periodically deletes the records that are past their retention from a datastore,
+    in bounded transactions, on a thread of the reactor's pool.
+    """
+
+    INTERVAL = 60 * 60  # seconds
+    MAX_RECORDS_PER_TRANSACTION = 1000
+
+    def __init__(self, datastore: Datastore, retention: Dict[Type[DatastoreRecord], RetentionPolicy]):
+        self._datastore = datastore  # usually a weak proxy: the sweeper does not keep the datastore open
+        self.retention = retention
+
+        # Metrics
+        self.swept = 0
+        self.sweeps = 0
+        self.last_sweep_duration = 0.0
+        super().__init__()
+
+    def run(self) -> Deferred:
+        return threads.deferToThread(self.sweep)
+
+    def sweep(self) -> int:
+        """Deletes all the expired records, and returns how many were deleted."""
+        started = time.monotonic()
+        swept = 0
+        try:
+            for record_type, retention in self.retention.items():
+                while True:
+                    deleted = self._datastore.expire(record_type,
+                                                     retention=retention,
+                                                     max_records=self.MAX_RECORDS_PER_TRANSACTION)
+                    swept += deleted
+                    if deleted < self.MAX_RECORDS_PER_TRANSACTION:
+                        break
+        except ReferenceError:
+            # The datastore was closed
+            return swept
+        finally:
+            self.swept += swept
+            self.sweeps += 1
+            self.last_sweep_duration = time.monotonic() - started
+        if swept:
+            self.log.info(f"Deleted {swept} expired records from the datastore")
+        return swept
+
+    def handle_errors(self, failure: Failure) -> None:
+        cleaned_traceback = self.clean_traceback(failure)
+        self.log.warn(f"Unhandled error while sweeping the datastore: {cleaned_traceback}")
+        self.start(now=False)
+
+    def stats(self) -> Dict[str, float]:
+        return dict(swept=self.swept, sweeps=self.sweeps, last_sweep_duration=self.last_sweep_duration)
@@ -0,0 +1,221 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import weakref
+from concurrent.futures import Future
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from typing import Any, Dict, Optional, Type, Union
+
+from nulink.datastore.base import DatastoreRecord
+from nulink.datastore.datastore import Datastore, DatastoreTransactionError
+from nulink.utilities.logging import Logger
+
+
+class BufferedRecordWriter:
+    """
+    Writes records to a `Datastore` from a background thread, committing many of them
+    in each transaction instead of one transaction (and one disk sync) per record.
+
+    The durability modes trade the guarantees given to the caller of `write` for latency:
+
+    - `sync`: `write` returns once the record is committed, like `Datastore.describe`.
+      Concurrent writes are still committed together.
+    - `async`: `write` returns once the record is queued; it is committed within
+      `flush_interval` seconds.  When the queue is full, `write` blocks until there is room.
+    - `best-effort`: like `async`, but records are dropped instead of blocking when the queue is full.
+
+    Only a weak reference to the datastore is kept; the writer stops once the datastore is gone.
+    """
+
+    SYNC = 'sync'
+    ASYNC = 'async'
+    BEST_EFFORT = 'best-effort'
+    DURABILITY_MODES = (SYNC, ASYNC, BEST_EFFORT)
+
+    DEFAULT_MAX_QUEUE_SIZE = 10_000
+    DEFAULT_MAX_BATCH_SIZE = 500
+    DEFAULT_FLUSH_INTERVAL = 0.5  # seconds
+
+    class WriterClosed(RuntimeError):
+        """Raised when writing to a closed writer."""
+
+    def __init__(self,
+                 datastore: Datastore,
+                 durability: str = SYNC,
+                 max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        if durability not in self.DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{durability}'; "
+                             f"expected one of {', '.join(self.DURABILITY_MODES)}")
+        self.durability = durability
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.log = Logger(self.__class__.__name__)
+
+        self._datastore = weakref.ref(datastore)
+        self._queue = Queue(maxsize=max_queue_size)
+        self._thread = None  # started on the first write
+        self._lock = Lock()
+        self._closed = False
+
+        # Metrics
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.last_commit_duration = 0.0
+
+    def write(self, record_type: Type[DatastoreRecord], record_id: Union[int, str], **fields: Any) -> None:
+        """
+        Writes a record with the given field values (see `Datastore.write_records`).
+        In `sync` mode, raises `DatastoreTransactionError` if the record could not be written.
+        """
+        committed = Future() if self.durability == self.SYNC else None
+        if not self._enqueue((record_type, record_id, fields, committed)):
+            return
+        if committed is not None:
+            committed.result()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Waits until all the records written so far are committed."""
+        if self._thread is None or self._closed:
+            return
+        flushed = Future()
+        self._enqueue((None, None, None, flushed), force=True)
+        flushed.result(timeout=timeout)
+
+    def close(self) -> None:
+        """Commits the queued records and stops the writer thread."""
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)  # wakes up the writer thread
+            thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        return dict(queue_depth=self._queue.qsize(),
+                    max_queue_depth=self.max_queue_depth,
+                    written=self.written,
+                    failed=self.failed,
+                    dropped=self.dropped,
+                    blocked=self.blocked,
+                    batches=self.batches,
+                    last_commit_duration=self.last_commit_duration)
+
+    def _enqueue(self, item: tuple, force: bool = False) -> bool:
+        if self._closed:
+            raise self.WriterClosed("Cannot write records after the writer was closed.")
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+        except Full:
+            if self.durability == self.BEST_EFFORT and not force:
+                self.dropped += 1
+                return False
+            self.blocked += 1
+            self._queue.put(item)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name=self.__class__.__name__, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        # In sync mode writers are waiting, so commit whatever is queued at once.
+        linger = 0 if self.durability == self.SYNC else self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                if self._datastore() is None:
+                    return
+                continue
+            stopping = item is None
+            batch = [] if stopping else [item]
+
+            deadline = time.monotonic() + linger
+            while not stopping and len(batch) < self.max_batch_size:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if stopping:
+                # Drain what is left before leaving
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except Empty:
+                        break
+                    if item is not None:
+                        batch.append(item)
+
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: list) -> None:
+        items = [item for item in batch if item[0] is not None]  # without the flush markers
+        errors = dict()  # {index in items: exception}
+        if items:
+            datastore = self._datastore()
+            started = time.monotonic()
+            try:
+                if datastore is None:
+                    raise DatastoreTransactionError("The datastore was closed (no data was written)")
+                self.written += datastore.write_records(item[:3] for item in items)
+            except Exception as e:
+                if datastore is None or len(items) == 1:
+                    errors = dict.fromkeys(range(len(items)), e)
+                else:
+                    # A single bad record fails the whole transaction: write them one by one, so that only it fails
+                    self.log.debug(f"Failed to write {len(items)} records at once, writing them one by one: {e}")
+                    for index, item in enumerate(items):
+                        try:
+                            self.written += datastore.write_records([item[:3]])
+                        except Exception as record_error:
+                            errors[index] = record_error
+                if errors:
+                    self.failed += len(errors)
+                    self.log.warn(f"Failed to write {len(errors)} records: {next(iter(errors.values()))}")
+            finally:
+                self.batches += 1
+                self.last_commit_duration = time.monotonic() - started
+
+        for index, (_, _, _, future) in enumerate(items):
+            if future is None:
+                continue
+            try:
+                future.set_exception(errors[index])
+            except KeyError:
+                future.set_result(None)
+        for record_type, _, _, future in batch:
+            if record_type is None and future is not None:
+                future.set_result(None)  # flushed
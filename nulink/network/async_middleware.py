@@ -0,0 +1,318 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+from io import BytesIO
+from typing import Optional, Sequence
+from urllib.parse import urlencode
+from weakref import WeakKeyDictionary
+
+from constant_sorrow.constants import EXEMPT_FROM_VERIFICATION
+from cryptography.hazmat.primitives.serialization import Encoding
+from nucypher_core import FleetStateChecksum, MetadataRequest, NodeMetadata
+from OpenSSL import SSL
+from requests.structures import CaseInsensitiveDict
+from twisted.internet import defer, error, reactor as global_reactor, threads
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.ssl import Certificate as TLSCertificate, optionsForClientTLS, trustRootFromCertificates
+from twisted.web.client import (
+    Agent,
+    FileBodyProducer,
+    HTTPConnectionPool,
+    ResponseFailed,
+    ResponseNeverReceived,
+    readBody
+)
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import IPolicyForHTTPS
+from zope.interface import implementer
+
+from nulink import __version__
+from nulink.config.constants import FLEET_STATE_SINCE_PARAM
+from nulink.network.certificates import CertificateCache, PinnedCertificate
+from nulink.network.exceptions import NodeSeemsToBeDown
+from nulink.network.middleware import (
+    NulinkMiddlewareClient,
+    RestMiddleware,
+    RestResponse,
+    SSL_LOGGER,
+    strip_version_suffix
+)
+from nulink.network.protocols import pack_batch, unpack_batch_results
+from nulink.utilities.logging import Logger
+from nulink.utilities.version import VersionMismatchError, check_version, check_version_pickle_symbol
+
+
+@implementer(IPolicyForHTTPS)
+class PinnedCertificatePolicy:
+    """Only trusts the pinned certificate of each peer, as ``NulinkMiddlewareClient`` does."""
+
+    def __init__(self, certificates: CertificateCache):
+        self.certificates = certificates
+        self._connection_creators = WeakKeyDictionary()  # {PinnedCertificate: IOpenSSLClientConnectionCreator}
+
+    def connection_creator(self, pinned_certificate: PinnedCertificate):
+        try:
+            return self._connection_creators[pinned_certificate]
+        except KeyError:
+            pem = pinned_certificate.certificate.public_bytes(Encoding.PEM)
+            trust_root = trustRootFromCertificates([TLSCertificate.loadPEM(pem)])
+            creator = optionsForClientTLS(hostname=pinned_certificate.host, trustRoot=trust_root)
+            self._connection_creators[pinned_certificate] = creator
+            return creator
+
+    def creatorForNetloc(self, hostname: bytes, port: int):
+        # Called in the reactor thread: the certificate was loaded in memory before the request was sent
+        host = hostname.decode()
+        pinned_certificate = self.certificates.get(host=host, port=port, load=False)
+        if pinned_certificate is None:
+            raise RestMiddleware.Unreachable(message=f"There is no pinned certificate for {host}:{port}")
+        return self.connection_creator(pinned_certificate)
+
+
+def _tls_failed(failure_reason: Exception) -> bool:
+    reasons = getattr(failure_reason, 'reasons', [])
+    return isinstance(failure_reason, SSL.Error) or any(reason.check(SSL.Error) for reason in reasons)
+
+
+class NulinkAsyncMiddlewareClient:
+    """
+    Sends requests to other nodes with Twisted's HTTP client; every request returns a ``Deferred``.
+
+    Shares the certificates of a (synchronous) ``NulinkMiddlewareClient``, which is also used for
+    the rare blocking steps - fetching a certificate the first time a peer is contacted,
+    and verifying a node that hasn't been verified yet - in the reactor's thread pool.
+    """
+
+    timeout = NulinkMiddlewareClient.timeout
+
+    def __init__(self,
+                 client: Optional[NulinkMiddlewareClient] = None,
+                 reactor=None,
+                 persistent: bool = True,
+                 connections_per_peer: int = 10):
+        self.client = client or NulinkMiddlewareClient()
+        self.reactor = reactor or global_reactor
+        self.certificates = self.client.certificates
+
+        pool = HTTPConnectionPool(self.reactor, persistent=persistent)
+        pool.maxPersistentPerHost = connections_per_peer
+        self.policy = PinnedCertificatePolicy(certificates=self.certificates)
+        self.agent = Agent(self.reactor, contextFactory=self.policy, pool=pool)
+        self.pool = pool
+
+    def _defer_to_thread(self, f, *args, **kwargs) -> defer.Deferred:
+        return threads.deferToThreadPool(self.reactor, self.reactor.getThreadPool(), f, *args, **kwargs)
+
+    @inlineCallbacks
+    def _parse_node_or_host_and_port(self, node_or_sprout, host, port):
+        if node_or_sprout:  # EXEMPT_FROM_VERIFICATION is falsy; it's only passed with a host and port
+            if any((host, port)):
+                raise ValueError("Don't pass host and port if you are passing the node.")
+            node = node_or_sprout.mature()  # Morph into a node.
+            if not node.verified_node:
+                yield self._defer_to_thread(node.verify_node,
+                                            network_middleware_client=self.client,
+                                            registry=self.client.registry,
+                                            eth_provider_uri=self.client.eth_provider_uri)
+            host, port = node.rest_interface.host, node.rest_interface.port
+        elif not (host and port):
+            raise ValueError("You need to pass either the node or a host and port.")
+        return host, port
+
+    @inlineCallbacks
+    def _send(self, method: str, url: str, data: Optional[bytes], timeout: Optional[float]):
+        body = FileBodyProducer(BytesIO(data)) if data is not None else None
+        d = self.agent.request(method.upper().encode(), url.encode(), Headers(), body)
+        d.addCallback(lambda response: readBody(response).addCallback(lambda content: (response, content)))
+        if timeout:
+            d.addTimeout(timeout, self.reactor)
+        response, content = yield d
+        headers = CaseInsensitiveDict({name.decode(): b', '.join(values).decode()
+                                       for name, values in response.headers.getAllRawHeaders()})
+        return RestResponse(status_code=response.code, headers=headers, content=content)
+
+    @inlineCallbacks
+    def request(self,
+                method: str,
+                path: str,
+                node_or_sprout=None,
+                host: Optional[str] = None,
+                port: Optional[int] = None,
+                data: Optional[bytes] = None,
+                params: Optional[dict] = None,
+                timeout: Optional[float] = None):
+        host, port = yield self._parse_node_or_host_and_port(node_or_sprout, host, port)
+        url = f"https://{host}:{port}/{path}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        timeout = timeout or self.timeout
+
+        # Use the pinned SSL certificate of the peer, or fetch a fresh copy and retry
+        pinned_certificate = self.certificates.get(host=host, port=port, load=False)
+        if pinned_certificate is None:
+            # Not in memory: load it from storage, without blocking the reactor
+            pinned_certificate = yield self._defer_to_thread(self.certificates.get, host=host, port=port)
+        try:
+            if pinned_certificate:
+                try:
+                    response = yield self._send(method, url, data=data, timeout=timeout)
+                except (ResponseFailed, ResponseNeverReceived, SSL.Error) as e:
+                    if not _tls_failed(e):
+                        raise
+                    SSL_LOGGER.debug(f"Cached cert for {host}:{port} is invalid {e}")
+                else:
+                    RestMiddleware.raise_for_status(response, request=f"{method} {path}")
+                    return response
+
+            # Fetch fresh copy of SSL certificate
+            try:
+                yield self._defer_to_thread(self.certificates.refresh, host=host, port=port, stale=pinned_certificate)
+            except NodeSeemsToBeDown as e:
+                raise RestMiddleware.Unreachable(message=f'Node {node_or_sprout} {host}:{port} is unreachable: {e}')
+
+            response = yield self._send(method, url, data=data, timeout=timeout)
+
+        except (error.ConnectError, defer.TimeoutError, ResponseNeverReceived, SSL.Error) as e:
+            raise RestMiddleware.Unreachable(message=f'Node {node_or_sprout} {host}:{port} is unreachable: {e}')
+
+        RestMiddleware.raise_for_status(response, request=f"{method} {path}")
+        return response
+
+    def get(self, path: str, **kwargs) -> defer.Deferred:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> defer.Deferred:
+        return self.request('POST', path, **kwargs)
+
+    @inlineCallbacks
+    def node_information(self, host: str, port: int):
+        # The only time a node is exempt from verification - when we are first getting its info.
+        response = yield self.get(node_or_sprout=EXEMPT_FROM_VERIFICATION,
+                                  host=host, port=port,
+                                  path="public_information",
+                                  timeout=20)
+        return strip_version_suffix(response.content, peer=f'{host}:{port}')
+
+    def close(self) -> defer.Deferred:
+        return self.pool.closeCachedConnections()
+
+
+class AsyncRestMiddleware:
+    """
+    A twin of ``RestMiddleware`` whose methods return ``Deferred``s instead of blocking on the response,
+    so that many requests can be in flight on the reactor without a thread for each of them.
+    Raises the same exceptions as ``RestMiddleware``.
+    """
+
+    log = Logger()
+
+    _client_class = NulinkAsyncMiddlewareClient
+
+    Unreachable = RestMiddleware.Unreachable
+    UnexpectedResponse = RestMiddleware.UnexpectedResponse
+    NotFound = RestMiddleware.NotFound
+    BadRequest = RestMiddleware.BadRequest
+    PaymentRequired = RestMiddleware.PaymentRequired
+    Unauthorized = RestMiddleware.Unauthorized
+
+    def __init__(self, middleware: Optional[RestMiddleware] = None, reactor=None):
+        middleware = middleware or RestMiddleware()
+        self.client = self._client_class(client=middleware.client, reactor=reactor)
+
+    def request_revocation(self, ursula, revocation) -> defer.Deferred:
+        # TODO: Implement offchain revocation #2787
+        return self.client.post(node_or_sprout=ursula,
+                                path=f"revoke",
+                                data=bytes(revocation))
+
+    def reencrypt(self, ursula: 'Ursula', reencryption_request_bytes: bytes, timeout=2) -> defer.Deferred:
+        return self.client.post(node_or_sprout=ursula,
+                                path=f"reencrypt",
+                                data=reencryption_request_bytes,
+                                timeout=timeout)
+
+    @inlineCallbacks
+    def reencrypt_batch(self, ursula: 'Ursula', reencryption_requests_bytes: Sequence[bytes], timeout=2):
+        """See ``RestMiddleware.reencrypt_batch``; the batches are sent concurrently."""
+        batches = RestMiddleware.split_reencryption_batch(reencryption_requests_bytes)
+        requests = [self.client.post(node_or_sprout=ursula,
+                                     path=f"reencrypt_batch",
+                                     data=pack_batch(batch),
+                                     timeout=timeout)
+                    for batch in batches]
+        try:
+            responses = yield defer.gatherResults(requests, consumeErrors=True)
+        except defer.FirstError as e:
+            e.subFailure.raiseException()
+        results = list()
+        for batch, response in zip(batches, responses):
+            batch_results = unpack_batch_results(response.content)
+            if len(batch_results) != len(batch):
+                raise self.UnexpectedResponse(f"Expected {len(batch)} reencryption results, got {len(batch_results)}",
+                                              status=response.status_code)
+            results.extend(RestResponse(status_code=status, content=content) for status, content in batch_results)
+        return results
+
+    def check_availability(self, initiator, responder) -> defer.Deferred:
+        return self.client.post(node_or_sprout=responder,
+                                data=bytes(initiator.metadata()),
+                                path="check_availability",
+                                timeout=15)  # Two round trips are expected
+
+    @inlineCallbacks
+    def ping(self, node):
+        response = yield self.client.get(node_or_sprout=node, path="ping", timeout=15)
+        try:
+            ping_response = response.json()
+        except json.JSONDecodeError:
+            # old version content-type is text/html
+            raise VersionMismatchError(f"the teacher {node.rest_interface.uri}'s version 0.1.0 is too low, you can't connect to it")
+
+        ver = ping_response.get('version')
+        if not check_version(ver):
+            # major version
+            raise VersionMismatchError(
+                f"the teacher {ping_response.get('requester_ip')}'s version {ver} do not match with the local node's version {__version__}, please upgrade the node or connect to the node of the latest version")
+        return response
+
+    def node_information(self, host: str, port: int) -> defer.Deferred:
+        return self.client.node_information(host=host, port=port)
+
+    @inlineCallbacks
+    def get_nodes_via_rest(self,
+                           node,
+                           fleet_state_checksum: FleetStateChecksum,
+                           announce_nodes: Sequence[NodeMetadata],
+                           since_fleet_state: Optional[bytes] = None):
+        """See ``RestMiddleware.get_nodes_via_rest``; fires with the response, with the version suffix removed."""
+        request = MetadataRequest(fleet_state_checksum=fleet_state_checksum,
+                                  announce_nodes=announce_nodes)
+
+        # add version info to the request
+        split_symbol = bytes(check_version_pickle_symbol, 'utf-8')
+
+        params = {FLEET_STATE_SINCE_PARAM: since_fleet_state.hex()} if since_fleet_state else {}
+        response = yield self.client.post(node_or_sprout=node,
+                                          path="node_metadata",
+                                          timeout=15,
+                                          params=params,
+                                          data=bytes(request) + split_symbol + bytes(__version__, 'utf-8'))
+
+        # check whether the version needs to be upgraded
+        response.content = strip_version_suffix(response.content, peer=node.rest_url())
+        return response
@@ -0,0 +1,174 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ssl
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Callable, Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.serialization import Encoding
+from cryptography.x509 import Certificate
+from urllib3.util.ssl_ import create_urllib3_context
+
+from nulink.utilities.logging import Logger
+
+
+class PinnedCertificate:
+    """
+    The TLS certificate of a peer, together with an SSL context that trusts only that certificate.
+    The context is built once and shared by all the connections to the peer.
+    """
+
+    def __init__(self, host: str, port: int, certificate: Certificate, filepath: Optional[Path] = None):
+        self.host = host
+        self.port = int(port)
+        self.certificate = certificate
+        self.filepath = filepath
+        self.fingerprint = certificate.fingerprint(hashes.SHA256())
+
+        # Hostnames are matched by urllib3, as they are when verifying against a certificate file.
+        self.ssl_context = create_urllib3_context(cert_reqs=ssl.CERT_REQUIRED)
+        self.ssl_context.load_verify_locations(cadata=certificate.public_bytes(Encoding.PEM).decode())
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.host}:{self.port}, {self.fingerprint.hex()[:16]})"
+
+
+class CertificateCache:
+    """
+    In-memory cache of peer certificates, on top of the certificates kept in ``NodeStorage``.
+
+    A peer's certificate is read from storage (and parsed) at most once, and then served from memory;
+    the least recently used certificates are dropped when the cache is full.
+    When a certificate turns out to be stale, a fresh copy is fetched from the peer in the background
+    (see ``refresh``); concurrent requests to the same peer share that fetch.
+    """
+
+    DEFAULT_MAX_CERTIFICATES = 1000
+
+    def __init__(self,
+                 storage: 'NodeStorage',
+                 fetch: Callable[..., Tuple[Certificate, Path]],
+                 max_certificates: int = DEFAULT_MAX_CERTIFICATES):
+        if max_certificates < 1:
+            raise ValueError(f"The certificate cache must hold at least one certificate, got {max_certificates}")
+        self.storage = storage
+        self.fetch = fetch  # fetches, stores and returns the certificate of a peer, given its host and port
+        self.max_certificates = max_certificates
+        self.log = Logger(self.__class__.__name__)
+
+        self._certificates = OrderedDict()  # {(host, port): PinnedCertificate}, least recently used first
+        self._refreshing = dict()  # {(host, port): Future}
+        self._lock = Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def __len__(self):
+        return len(self._certificates)
+
+    def _remember(self, pinned_certificate: PinnedCertificate) -> None:
+        key = (pinned_certificate.host, pinned_certificate.port)
+        with self._lock:
+            self._certificates[key] = pinned_certificate
+            self._certificates.move_to_end(key)
+            while len(self._certificates) > self.max_certificates:
+                self._certificates.popitem(last=False)
+
+    def _load(self, host: str, port: int) -> Optional[PinnedCertificate]:
+        try:
+            certificate = self.storage.load_node_certificate(host=host, port=port)
+        except ValueError:
+            self.log.debug(f"Ignoring unreadable TLS certificate for {host}:{port} in {self.storage.source}")
+            return None
+        if certificate is None:
+            return None
+        return PinnedCertificate(host=host, port=port, certificate=certificate)
+
+    def get(self, host: str, port: int, load: bool = True) -> Optional[PinnedCertificate]:
+        """
+        Returns the known certificate of a peer, or ``None`` if there isn't one in memory or in storage.
+        With ``load=False``, only looks in memory, without blocking on the storage (e.g. in the reactor thread).
+        """
+        key = (host, int(port))
+        with self._lock:
+            try:
+                pinned_certificate = self._certificates[key]
+            except KeyError:
+                if not load:
+                    return None
+                self.misses += 1
+            else:
+                self._certificates.move_to_end(key)
+                self.hits += 1
+                return pinned_certificate
+
+        pinned_certificate = self._load(host=host, port=port)
+        if pinned_certificate:
+            self._remember(pinned_certificate)
+        return pinned_certificate
+
+    def refresh(self, host: str, port: int, stale: Optional[PinnedCertificate] = None) -> PinnedCertificate:
+        """
+        Fetches a fresh copy of a peer's certificate, replacing ``stale``, and waits for it.
+        If the certificate has already been replaced since ``stale`` was obtained, the replacement is returned;
+        if a fetch is already in progress, its result is returned. Raises the errors of the fetch.
+        """
+        key = (host, int(port))
+        with self._lock:
+            current = self._certificates.get(key)
+            if current is not None and current is not stale:
+                return current
+            future = self._refreshing.get(key)
+            start = future is None
+            if start:
+                future = self._refreshing[key] = Future()
+                self.refreshes += 1
+
+        if start:
+            Thread(target=self._refresh, args=(key, future), daemon=True).start()
+        return future.result()
+
+    def _refresh(self, key: Tuple[str, int], future: Future) -> None:
+        host, port = key
+        try:
+            certificate, filepath = self.fetch(host=host, port=port)
+            pinned_certificate = PinnedCertificate(host=host, port=port, certificate=certificate, filepath=filepath)
+        except BaseException as e:
+            with self._lock:
+                del self._refreshing[key]
+            future.set_exception(e)
+        else:
+            self._remember(pinned_certificate)
+            with self._lock:
+                del self._refreshing[key]
+            future.set_result(pinned_certificate)
+
+    def forget(self, host: str, port: int) -> None:
+        with self._lock:
+            self._certificates.pop((host, int(port)), None)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(certificates=len(self._certificates),
+                    hits=self.hits,
+                    misses=self.misses,
+                    refreshes=self.refreshes)
@@ -15,12 +15,12 @@ You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import json
 import socket
 import ssl
 import time
 from http import HTTPStatus
-from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from typing import Sequence
 
 import requests
@@ -30,10 +30,15 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.x509 import Certificate
 from nucypher_core import MetadataRequest, FleetStateChecksum, NodeMetadata
 from requests.exceptions import SSLError, JSONDecodeError
+from requests.structures import CaseInsensitiveDict
 
 from nulink.blockchain.eth.registry import BaseContractRegistry
+from nulink.config.constants import FLEET_STATE_SINCE_PARAM, MAX_REENCRYPTION_BATCH_SIZE, MAX_UPLOAD_CONTENT_LENGTH
 from nulink.config.storages import ForgetfulNodeStorage
+from nulink.network.certificates import CertificateCache
 from nulink.network.exceptions import NodeSeemsToBeDown
+from nulink.network.protocols import pack_batch, unpack_batch_results
+from nulink.network.sessions import PeerSessionPool
 from nulink.utilities.logging import Logger
 from nulink.utilities.version import check_version_pickle_symbol, check_version, VersionMismatchError
 from nulink import __version__
@@ -42,6 +47,42 @@ SSL_LOGGER = Logger('ssl-middleware')
 EXEMPT_FROM_VERIFICATION.bool_value(False)
 
 
+def strip_version_suffix(response_data: bytes, peer: str) -> bytes:
+    """
+    Splits the version of the peer off the end of a response, and returns the rest of it.
+    Raises ``VersionMismatchError`` if the peer runs an incompatible version.
+    """
+    bytes_list = response_data.split(bytes(check_version_pickle_symbol, 'utf-8'))
+    len_bytes_list = len(bytes_list)
+    if len_bytes_list == 1:
+        # The peer end is an older version
+        raise VersionMismatchError(f"the teacher {peer}'s version 0.1.0 is too low, you can't connect to it")
+
+    # current len_bytes_list must be 2
+    assert len_bytes_list == 2
+    payload_bytes, version_bytes = bytes_list
+    version_str = version_bytes.decode('utf-8')
+
+    if not check_version(version_str):
+        # major version
+        raise VersionMismatchError(
+            f"the teacher {peer}'s version {version_str} do not match with the local node's version {__version__}, please upgrade the node or connect to the node of the latest version")
+
+    return payload_bytes
+
+
+class RestResponse:
+    """The parts of a ``requests.Response`` that the callers of ``RestMiddleware`` use."""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[CaseInsensitiveDict] = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers if headers is not None else CaseInsensitiveDict()
+
+    def json(self):
+        return json.loads(self.content)
+
+
 class NulinkMiddlewareClient:
     library = requests
     timeout = 5
@@ -50,11 +91,14 @@ class NulinkMiddlewareClient:
                  registry: Optional['BaseContractRegistry'] = None,
                  eth_provider_uri: Optional[str] = None,
                  storage: Optional['NodeStorage'] = None,
+                 session_pool: Optional[PeerSessionPool] = None,
                  *args, **kwargs):
 
         self.registry = registry
         self.eth_provider_uri = eth_provider_uri
         self.storage = storage or ForgetfulNodeStorage()  # for certificate storage
+        self.session_pool = session_pool or PeerSessionPool()  # keep-alive connections to peers
+        self.certificates = CertificateCache(storage=self.storage, fetch=self.get_certificate)
 
     def get_certificate(self,
                         host,
@@ -111,7 +155,7 @@ class NulinkMiddlewareClient:
             host, port = node.rest_interface.host, node.rest_interface.port
         elif not (host and port):
             raise ValueError("You need to pass either the node or a host and port.")
-        return host, port, self.library
+        return host, port, self.session_pool
 
     def invoke_method(self, method, url, *args, **kwargs):
         self.clean_params(kwargs)
@@ -136,26 +180,8 @@ class NulinkMiddlewareClient:
         if not str(response.status_code).startswith('2'):
             return response.content
 
-        response_data = response.content
-
         # check whether the version needs to be upgraded
-        bytes_list = response_data.split(bytes(check_version_pickle_symbol, 'utf-8'))
-        len_bytes_list = len(bytes_list)
-        if len_bytes_list == 1:
-            # old version
-            raise VersionMismatchError(f"the teacher {host}:{port}'s version 0.1.0 is too low, you can't connect to it")
-        else:
-            # current len_bytes_list must be 2
-            assert len_bytes_list == 2
-            node_metadata_bytes, version_bytes = bytes_list
-            version_str = version_bytes.decode('utf-8')
-
-            if not check_version(version_str):
-                # major version
-                raise VersionMismatchError(
-                    f"the teacher {host}:{port}'s version {version_str} do not match with the local node's version {__version__}, please upgrade the node or connect to the node of the latest version")
-
-            return node_metadata_bytes
+        return strip_version_suffix(response.content, peer=f'{host}:{port}')
 
     def __getattr__(self, method_name):
         # Quick sanity check.
@@ -182,26 +208,7 @@ class NulinkMiddlewareClient:
                                             **kwargs)
             # Handle response
             cleaned_response = self.response_cleaner(response)
-            if cleaned_response.status_code >= 300:
-
-                if cleaned_response.status_code == HTTPStatus.BAD_REQUEST:
-                    raise RestMiddleware.BadRequest(reason=cleaned_response.json)
-
-                elif cleaned_response.status_code == HTTPStatus.NOT_FOUND:
-                    m = f"While trying to {method_name} {args} ({kwargs}), server 404'd.  Response: {cleaned_response.content}"
-                    raise RestMiddleware.NotFound(m)
-
-                elif cleaned_response.status_code == HTTPStatus.PAYMENT_REQUIRED:
-                    # TODO: Use this as a hook to prompt Bob's payment for policy sponsorship
-                    # https://getyarn.io/yarn-clip/ce0d37ba-4984-4210-9a40-c9c9859a3164
-                    raise RestMiddleware.PaymentRequired(cleaned_response.content)
-
-                elif cleaned_response.status_code == HTTPStatus.FORBIDDEN:
-                    raise RestMiddleware.Unauthorized(cleaned_response.content)
-
-                else:
-                    raise RestMiddleware.UnexpectedResponse(cleaned_response.content, status=cleaned_response.status_code)
-
+            RestMiddleware.raise_for_status(cleaned_response, request=f"{method_name} {args} ({kwargs})")
             return cleaned_response
 
         return method_wrapper
@@ -213,14 +220,12 @@ class NulinkMiddlewareClient:
                         method,
                         endpoint,
                         *args, **kwargs):
-        # Use existing cached SSL certificate or fetch fresh copy and retry
-        cached_cert_filepath = Path(self.storage.generate_certificate_filepath(host=host, port=port))
-        if cached_cert_filepath.exists():
-            # already cached try it
+        # Use the pinned SSL certificate of the peer, or fetch a fresh copy and retry
+        pinned_certificate = self.certificates.get(host=host, port=port)
+        if pinned_certificate:
             try:
-                # ignore ssl error
                 # Send request
-                response = self.invoke_method(method, endpoint, verify=cached_cert_filepath,
+                response = self.invoke_method(method, endpoint, verify=pinned_certificate,
                                               *args, **kwargs)
 
                 # successful use of cached certificate
@@ -228,21 +233,22 @@ class NulinkMiddlewareClient:
             except SSLError as e:
                 # ignore this exception - probably means that our cached cert may not be up-to-date.
                 SSL_LOGGER.debug(f"Cached cert for {host}:{port} is invalid {e}")
+                self.session_pool.discard(host=host, port=port)
 
         # Fetch fresh copy of SSL certificate
         try:
-            certificate, filepath = self.get_certificate(host=host, port=port)
+            pinned_certificate = self.certificates.refresh(host=host, port=port, stale=pinned_certificate)
         except NodeSeemsToBeDown as e:
             raise RestMiddleware.Unreachable(
                 message=f'Node {node_or_sprout} {host}:{port} is unreachable: {e}')
 
         # Send request
-        response = self.invoke_method(method, endpoint, verify=filepath,
+        response = self.invoke_method(method, endpoint, verify=pinned_certificate,
                                       *args, **kwargs)
         return response
 
     def node_selector(self, node):
-        return node.rest_url(), self.library
+        return node.rest_url(), self.session_pool
 
     def __len__(self):
         return 0  # Workaround so debuggers can represent objects of this class despite the unusual __getattr__.
@@ -286,6 +292,30 @@ class RestMiddleware:
     def __init__(self, registry=None, eth_provider_uri: str = None):
         self.client = self._client_class(registry=registry, eth_provider_uri=eth_provider_uri)
 
+    @classmethod
+    def raise_for_status(cls, response, request: str) -> None:
+        """Raises the exception matching an unsuccessful response; ``request`` describes the request, for the logs."""
+        if response.status_code < 300:
+            return
+
+        if response.status_code == HTTPStatus.BAD_REQUEST:
+            raise cls.BadRequest(reason=response.json)
+
+        elif response.status_code == HTTPStatus.NOT_FOUND:
+            m = f"While trying to {request}, server 404'd.  Response: {response.content}"
+            raise cls.NotFound(m)
+
+        elif response.status_code == HTTPStatus.PAYMENT_REQUIRED:
+            # TODO: Use this as a hook to prompt Bob's payment for policy sponsorship
+            # https://getyarn.io/yarn-clip/ce0d37ba-4984-4210-9a40-c9c9859a3164
+            raise cls.PaymentRequired(response.content)
+
+        elif response.status_code == HTTPStatus.FORBIDDEN:
+            raise cls.Unauthorized(response.content)
+
+        else:
+            raise cls.UnexpectedResponse(response.content, status=response.status_code)
+
     def request_revocation(self, ursula, revocation):
         # TODO: Implement offchain revocation #2787
         response = self.client.post(
@@ -304,6 +334,47 @@ class RestMiddleware:
         )
         return response
 
+    @staticmethod
+    def split_reencryption_batch(reencryption_requests: Sequence[bytes],
+                                 max_batch_size: int = MAX_REENCRYPTION_BATCH_SIZE,
+                                 max_batch_length: int = MAX_UPLOAD_CONTENT_LENGTH) -> List[List[bytes]]:
+        """Splits reencryption requests into batches that an Ursula accepts in a single request."""
+        batches, batch, batch_length = list(), list(), 0
+        for reencryption_request in reencryption_requests:
+            length = len(pack_batch([reencryption_request]))
+            if batch and (len(batch) == max_batch_size or batch_length + length > max_batch_length):
+                batches.append(batch)
+                batch, batch_length = list(), 0
+            batch.append(reencryption_request)
+            batch_length += length
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def reencrypt_batch(self,
+                        ursula: 'Ursula',
+                        reencryption_requests_bytes: Sequence[bytes],
+                        timeout=2) -> List[RestResponse]:
+        """
+        Sends several reencryption requests to one Ursula, in as few HTTP requests as possible.
+        Returns the result of each reencryption request, in order, as a response with the status and content
+        that ``reencrypt`` would have received; use ``raise_for_status`` to raise its error, if any.
+        """
+        results = list()
+        for batch in self.split_reencryption_batch(reencryption_requests_bytes):
+            response = self.client.post(
+                node_or_sprout=ursula,
+                path=f"reencrypt_batch",
+                data=pack_batch(batch),
+                timeout=timeout
+            )
+            batch_results = unpack_batch_results(response.content)
+            if len(batch_results) != len(batch):
+                raise self.UnexpectedResponse(f"Expected {len(batch)} reencryption results, got {len(batch_results)}",
+                                              status=response.status_code)
+            results.extend(RestResponse(status_code=status, content=content) for status, content in batch_results)
+        return results
+
     def check_availability(self, initiator, responder):
         response = self.client.post(node_or_sprout=responder,
                                     data=bytes(initiator.metatada()),
@@ -335,7 +406,12 @@ class RestMiddleware:
     def get_nodes_via_rest(self,
                            node,
                            fleet_state_checksum: FleetStateChecksum,
-                           announce_nodes: Sequence[NodeMetadata]):
+                           announce_nodes: Sequence[NodeMetadata],
+                           since_fleet_state: Optional[bytes] = None):
+        """
+        Exchanges node metadata with a teacher.  If ``since_fleet_state`` (the checksum of the teacher's fleet state
+        received in a previous exchange) is given, the teacher may only announce the nodes added or updated since then.
+        """
 
         request = MetadataRequest(fleet_state_checksum=fleet_state_checksum,
                                   announce_nodes=announce_nodes)
@@ -343,35 +419,21 @@ class RestMiddleware:
         # add version info to the request
         split_symbol = bytes(check_version_pickle_symbol, 'utf-8')
 
+        params = {FLEET_STATE_SINCE_PARAM: since_fleet_state.hex()} if since_fleet_state else {}
         response = self.client.post(node_or_sprout=node,
                                     path="node_metadata",
                                     timeout=15,
+                                    params=params,
                                     data=bytes(request) + split_symbol + bytes(__version__, 'utf-8'),
                                     )
 
         if not str(response.status_code).startswith('2'):
             return response
 
-        response_data = response.content
-
         # check whether the version needs to be upgraded
-        bytes_list = response_data.split(bytes(check_version_pickle_symbol, 'utf-8'))
-        len_bytes_list = len(bytes_list)
-        if len_bytes_list == 1:
-            # The peer end is an older version
-            raise VersionMismatchError(f"the teacher {node.rest_url()}'s version 0.1.0 is too low, you can't connect to it")
-        else:
-            # current len_bytes_list must be 2
-            assert len_bytes_list == 2
-            node_metadata_bytes, version_bytes = bytes_list
-            version_str = version_bytes.decode('utf-8')
+        node_metadata_bytes = strip_version_suffix(response.content, peer=node.rest_url())
 
-            if not check_version(version_str):
-                # major version
-                raise VersionMismatchError(
-                    f"the teacher {node.rest_url()}'s version {version_str} do not match with the local node's version {__version__}, please upgrade the node or connect to the node of the latest version")
-
-            # response.content = node_metadata_bytes
-            # to set response.content, we can't change it directly, we can' change it by set response._content
-            response._content = node_metadata_bytes
-            return response
+        # response.content = node_metadata_bytes
+        # to set response.content, we can't change it directly, we can' change it by set response._content
+        response._content = node_metadata_bytes
+        return response
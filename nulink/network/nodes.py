@@ -17,10 +17,11 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 
 import time
 from collections import defaultdict, deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import suppress
 from pathlib import Path
 from queue import Queue
-from typing import Callable, List, Optional, Set, Tuple, Union
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
 import maya
 import requests
@@ -33,6 +34,7 @@ from constant_sorrow.constants import (
 )
 from cryptography.hazmat.backends import default_backend
 from cryptography.x509 import Certificate, load_der_x509_certificate
+from eth_typing import ChecksumAddress
 from eth_utils import to_checksum_address
 from nucypher_core import MetadataResponse, MetadataResponsePayload, NodeMetadata
 from nucypher_core.umbral import Signature
@@ -43,11 +45,11 @@ from twisted.internet.defer import Deferred
 import nulink
 from nulink.acumen.nicknames import Nickname
 from nulink.acumen.perception import FleetSensor
-from nulink.blockchain.eth.agents import ContractAgency, PREApplicationAgent
 from nulink.blockchain.eth.constants import NULL_ADDRESS
 from nulink.blockchain.eth.networks import NetworksInventory
 from nulink.blockchain.eth.registry import BaseContractRegistry
-from nulink.config.constants import SeednodeMetadata
+from nulink.blockchain.eth.staking import StakingStatusCache
+from nulink.config.constants import FLEET_STATE_HEADER, SeednodeMetadata
 from nulink.config.storages import ForgetfulNodeStorage
 from nulink.crypto.powers import (
     CryptoPower,
@@ -59,6 +61,9 @@ from nulink.crypto.signing import InvalidSignature, SignatureStamp
 from nulink.network.exceptions import NodeSeemsToBeDown
 from nulink.network.middleware import RestMiddleware
 from nulink.network.protocols import InterfaceInfo, SuspiciousActivity
+from nulink.network.performance import NodePerformanceTracker
+from nulink.network.verification import NodeVerifier
+from nulink.utilities.concurrency import AllAtOnceFactory, WorkerPool
 from nulink.utilities.logging import Logger
 from nulink.utilities.version import VersionMismatchError
 
@@ -282,6 +287,9 @@ class Learner:
                  lonely: bool = False,
                  verify_node_bonding: bool = True,
                  include_self_in_the_state: bool = False,
+                 learning_fanout: int = 1,
+                 lazy_verification: bool = False,
+                 verification_workers: int = NodeVerifier.DEFAULT_WORKERS,
                  ) -> None:
 
         self.log = Logger("learning-loop")  # type: Logger
@@ -297,11 +305,24 @@ class Learner:
         self.start_learning_now = start_learning_now
         self.learn_on_same_thread = learn_on_same_thread
 
+        # How many teachers are contacted concurrently in each learning round.
+        if learning_fanout < 1:
+            raise ValueError(f"Learning fanout must be a positive integer, got {learning_fanout}")
+        self.learning_fanout = learning_fanout
+
         self._abort_on_learning_error = abort_on_learning_error
 
         self.__known_nodes = self.tracker_class(domain=domain, this_node=self if include_self_in_the_state else None)
         self._verify_node_bonding = verify_node_bonding
 
+        # With lazy verification, known, seed and stored nodes are admitted at once,
+        # and verified in the background (the ones about to be used first).
+        self.lazy_verification = lazy_verification
+        self.node_verifier = NodeVerifier(verify=self._verify_provisional_node, workers=verification_workers)
+
+        # Latency and errors of the requests made to other nodes, to contact the best ones first.
+        self.node_performance = NodePerformanceTracker()
+
         self.lonely = lonely
         self.done_seeding = False
         self._learning_deferred = None
@@ -321,6 +342,9 @@ class Learner:
         known_nodes = known_nodes or tuple()
         self.unresponsive_startup_nodes = list()  # TODO: Buckets - Attempt to use these again later  #567
         for node in known_nodes:
+            if self.lazy_verification:
+                self.remember_provisional_node(node)
+                continue
             try:
                 self.remember_node(node, eager=True, record_fleet_state=False)
             except self.UnresponsiveTeacher:
@@ -331,6 +355,8 @@ class Learner:
 
         self.teacher_nodes = deque()
         self._current_teacher_node = None  # type: Union[Teacher, None]
+        self._teacher_fleet_states = dict()  # The last fleet state checksums learned from teachers
+        self._nodes_forgotten = 0  # `known_nodes.nodes_forgotten` when those were learned
         self._learning_task = task.LoopingCall(self.keep_learning_about_nodes)
 
         if self._DEBUG_MODE:
@@ -389,7 +415,7 @@ class Learner:
                     # TODO: log traceback here?
                     self.log.warn(f"Failed to instantiate a node at {uri}: {e}")
                 else:
-                    new_node = self.remember_node(maybe_sage_node, record_fleet_state=False)
+                    new_node = self.remember_provisional_node(maybe_sage_node)
                     discovered.append(new_node)
 
         self.log.info(f"=============> self._seed_nodes <================ {len(self._seed_nodes)}")
@@ -411,7 +437,7 @@ class Learner:
                 # TODO: distinguish between versioning errors and other errors?
                 self.log.warn(f"Failed to instantiate a node {node_tag}: {e}")
             else:
-                new_node = self.remember_node(seed_node, record_fleet_state=False)
+                new_node = self.remember_provisional_node(seed_node)
                 discovered.append(new_node)
 
         self.log.info("Finished learning about all seednodes.")
@@ -436,7 +462,7 @@ class Learner:
             if node.domain != self.domain:
                 invalid_nodes[node.domain].append(node)
                 continue
-            restored_node = self.remember_node(node, record_fleet_state=False)  # TODO: Validity status 1866
+            restored_node = self.remember_provisional_node(node, store=False)  # TODO: Validity status 1866
             restored_from_disk.append(restored_node)
 
         if invalid_nodes:
@@ -449,7 +475,8 @@ class Learner:
                       node,
                       force_verification_recheck=False,
                       record_fleet_state=True,
-                      eager: bool = False):
+                      eager: bool = False,
+                      store: bool = True):
 
         # UNPARSED
         # PARSED
@@ -470,7 +497,7 @@ class Learner:
 
         self.known_nodes.record_node(node)  # FIXME - dont always remember nodes, bucket them.
 
-        if self.save_metadata:
+        if self.save_metadata and store:
             self.node_storage.store_node_metadata(node=node)
 
         if eager:
@@ -520,6 +547,46 @@ class Learner:
 
         return node
 
+    def remember_provisional_node(self, node, store: bool = True):
+        """
+        Remembers a node from storage, a seed node, etc. without verifying it first;
+        with lazy verification, it is then verified in the background.
+        """
+        remembered = self.remember_node(node, record_fleet_state=False, store=store)
+        if remembered and self.lazy_verification:
+            self.node_verifier.submit(remembered)
+        return remembered
+
+    def _verify_provisional_node(self, node) -> bool:
+        """Verifies a provisionally known node, and forgets it if it is not valid."""
+        node = node.mature()
+        registry = self.registry if self._verify_node_bonding else None
+        try:
+            node.verify_node(network_middleware_client=self.network_middleware.client, registry=registry)
+        except (SSLError, RestMiddleware.Unreachable, NodeSeemsToBeDown, SuspiciousActivity) as e:
+            self.log.info(f"Verification of provisionally known node {node} failed, forgetting it: {e}")
+            self.known_nodes.mark_as(e, node)
+            return False
+        except Exception as e:
+            # e.g. WrongMode, VersionMismatchError, or metadata that cannot be read
+            self.log.warn(f"Unexpected error while verifying provisionally known node {node}, forgetting it: {e}")
+            self.known_nodes.mark_as(e, node)
+            return False
+        return True
+
+    def verify_sampled_node(self, node, timeout: Optional[float] = None) -> None:
+        """
+        Called before using a node: if the node is still waiting for its verification in the background,
+        verifies it first.  Raises `Teacher.InvalidNode` if it turns out not to be valid, or
+        `Teacher.VerificationTimedOut` if its verification takes longer than ``timeout`` seconds.
+        """
+        try:
+            valid = self.node_verifier.wait_for(node, timeout=timeout)
+        except FutureTimeoutError:
+            raise node.VerificationTimedOut(f"Verification of {node} did not complete in {timeout}s")
+        if valid is False:
+            raise node.InvalidNode(f"{node} failed verification")
+
     def start_learning_loop(self, now=False):
         if self._learning_task.running:
             return False
@@ -635,7 +702,10 @@ class Learner:
 
         def _discover_or_abort(_first_result):
             # self.log.debug(f"{self} learning at {datetime.datetime.now()}")   # 1712
-            result = self.learn_from_teacher_node(eager=False, canceller=self._discovery_canceller)
+            if self.learning_fanout > 1:
+                result = self.learn_from_teacher_nodes(eager=False, canceller=self._discovery_canceller)
+            else:
+                result = self.learn_from_teacher_node(eager=False, canceller=self._discovery_canceller)
             # self.log.debug(f"{self} finished learning at {datetime.datetime.now()}")  # 1712
             return result
 
@@ -789,62 +859,51 @@ class Learner:
             except (TypeError, AttributeError):
                 raise InvalidSignature(f"Unable to verify message from stranger: {stranger}")
 
-    def learn_from_teacher_node(self, eager=False, canceller=None):
-        """
-        Sends a request to node_url to find out about known nodes.
-
-        TODO: Does this (and related methods) belong on FleetSensor for portability?
-
-        TODO: A lot of other code can be simplified if this is converted to async def.  That's a project, though.
-        """
-        remembered = []
-
-        if not self.done_seeding:
-            try:
-                remembered_seednodes = self.load_seednodes(record_fleet_state=True)
-            except Exception as e:
-                # Even if we aren't aborting on learning errors, we want this to crash the process pronto.
-                e.crash_right_now = True
-                raise
-            else:
-                remembered.extend(remembered_seednodes)
-
-        self._learning_round += 1
-
-        current_teacher = self.current_teacher_node()  # Will raise if there's no available teacher.
+    def _load_seednodes_for_learning(self) -> List:
+        if self.done_seeding:
+            return []
+        try:
+            return self.load_seednodes(record_fleet_state=True)
+        except Exception as e:
+            # Even if we aren't aborting on learning errors, we want this to crash the process pronto.
+            e.crash_right_now = True
+            raise
 
+    def _announce_nodes(self) -> List[NodeMetadata]:
         if isinstance(self, Teacher):
-            announce_nodes = [self.metadata()]  # Ursula class is the subclass of Teacher class
+            return [self.metadata()]  # Ursula class is the subclass of Teacher class
         else:
-            announce_nodes = []
+            return []
 
-        unresponsive_nodes = set()
-
-        #
-        # Request
-        #
-        if canceller and canceller.stop_now:
-            return RELAX
+    def _fetch_metadata_from_teacher(self,
+                                     teacher: 'Teacher',
+                                     announce_nodes: List[NodeMetadata],
+                                     canceller=None
+                                     ) -> Optional[MetadataResponsePayload]:
+        """
+        Requests the known nodes of a single teacher and verifies the signed response.
 
+        Returns ``None`` if nothing could be learned from this teacher (the reason is logged),
+        or ``RELAX`` if the learning was cancelled in the meantime.
+        """
         try:
             # announce_nodes: teacher node (current Ursula Node ) => class Ursula(Teacher, Character, Operator)
             # post /node_metadata  to teacher node, return the current_teacher's  all known nodes
-            response = self.network_middleware.get_nodes_via_rest(node=current_teacher,
+            response = self.network_middleware.get_nodes_via_rest(node=teacher,
                                                                   announce_nodes=announce_nodes,
-                                                                  fleet_state_checksum=self.known_nodes.checksum)
-        # These except clauses apply to the current_teacher itself, not the learned-about nodes.
+                                                                  fleet_state_checksum=self.known_nodes.checksum,
+                                                                  since_fleet_state=self._teacher_fleet_states.get(teacher.checksum_address))
+        # These except clauses apply to the teacher itself, not the learned-about nodes.
         except NodeSeemsToBeDown as e:
-            unresponsive_nodes.add(current_teacher)
-            self.log.info(f"Teacher {current_teacher.seed_node_metadata(as_teacher_uri=True)} is unreachable: {e}.")
-            return
-        except current_teacher.InvalidNode as e:
+            self.log.info(f"Teacher {teacher.seed_node_metadata(as_teacher_uri=True)} is unreachable: {e}.")
+            return None
+        except teacher.InvalidNode as e:
             # Ugh.  The teacher is invalid.  Rough.
             # TODO: Bucket separately and report.
-            unresponsive_nodes.add(current_teacher)  # This does nothing.
-            self.known_nodes.mark_as(current_teacher.InvalidNode, current_teacher)
-            self.log.warn(f"Teacher {str(current_teacher)} is invalid: {e}.")
+            self.known_nodes.mark_as(teacher.InvalidNode, teacher)
+            self.log.warn(f"Teacher {str(teacher)} is invalid: {e}.")
             # TODO (#567): bucket the node as suspicious
-            return
+            return None
         except RuntimeError as e:
             if canceller and canceller.stop_now:
                 # Race condition that seems limited to tests.
@@ -852,28 +911,25 @@ class Learner:
                 return RELAX
             else:
                 self.log.warn(
-                    f"Unhandled error while learning from {str(current_teacher)} "
-                    f"(hex={bytes(current_teacher.metadata()).hex()}):{e}.")
+                    f"Unhandled error while learning from {str(teacher)} "
+                    f"(hex={bytes(teacher.metadata()).hex()}):{e}.")
                 raise
         except Exception as e:
             self.log.warn(
-                f"Unhandled error while learning from {str(current_teacher)} "
-                f"(hex={bytes(current_teacher.metadata()).hex()}):{e}.")  # To track down 2345 / 1698
+                f"Unhandled error while learning from {str(teacher)} "
+                f"(hex={bytes(teacher.metadata()).hex()}):{e}.")  # To track down 2345 / 1698
             raise
-        finally:
-            # Is cycling happening in the right order?
-            self.cycle_teacher_node()
 
         if response.status_code != 200:
-            self.log.info("Bad response from teacher {}: {} - {}, maybe the version mismatch".format(current_teacher, response, response.content))
-            return
+            self.log.info("Bad response from teacher {}: {} - {}, maybe the version mismatch".format(teacher, response, response.content))
+            return None
 
         # TODO: we really should be checking this *before* we ask it for a node list,
         # but currently we may not know this before the REST request (which may mature the node)
-        if self.domain != current_teacher.domain:
-            self.log.debug(f"{current_teacher} is serving '{current_teacher.domain}', "
+        if self.domain != teacher.domain:
+            self.log.debug(f"{teacher} is serving '{teacher.domain}', "
                            f"ignore since we are learning about '{self.domain}'")
-            return  # This node is not serving our domain.
+            return None  # This node is not serving our domain.
 
         #
         # Deserialize
@@ -881,42 +937,43 @@ class Learner:
         try:
             metadata = MetadataResponse.from_bytes(response.content)
         except Exception as e:
-            self.log.warn(f"Failed to deserialize MetadataResponse from Teacher {current_teacher} ({e}): {response.content}")
-            return
+            self.log.warn(f"Failed to deserialize MetadataResponse from Teacher {teacher} ({e}): {response.content}")
+            return None
 
         try:
             # metadata_payload: MetadataResponsePayload
-            metadata_payload = metadata.verify(current_teacher.stamp.as_umbral_pubkey())
+            metadata_payload = metadata.verify(teacher.stamp.as_umbral_pubkey())
         except Exception as e:
             # TODO (#567): bucket the node as suspicious
             self.log.warn(
-                f"Failed to verify MetadataResponse from Teacher {current_teacher} ({e}): {response.content}")
-            return
-
-        # End edge case handling.
-
-        fleet_state_updated = maya.MayaDT(metadata_payload.timestamp_epoch)
-
-        if not metadata_payload.announce_nodes:
-            # The teacher had the same fleet state
-            self.known_nodes.record_remote_fleet_state(
-                current_teacher.checksum_address,
-                self.known_nodes.checksum,
-                fleet_state_updated,
-                self.known_nodes.population)
+                f"Failed to verify MetadataResponse from Teacher {teacher} ({e}): {response.content}")
+            return None
 
-            return FLEET_STATES_MATCH
+        # Next time, only ask this teacher about the nodes it has learned about since this fleet state.
+        try:
+            teacher_fleet_state = bytes.fromhex(response.headers[FLEET_STATE_HEADER])
+        except (KeyError, ValueError):
+            # An older teacher, or a malformed header; ask for all the known nodes next time.
+            self._teacher_fleet_states.pop(teacher.checksum_address, None)
+        else:
+            self._teacher_fleet_states[teacher.checksum_address] = teacher_fleet_state
 
-        sprouts = [NodeSprout(node) for node in metadata_payload.announce_nodes]
+        return metadata_payload
 
+    def _remember_sprouts(self, sprouts: List[NodeSprout], teacher: 'Teacher', eager: bool = False) -> List:
+        """Remembers the nodes announced by a teacher, without recording a new fleet state."""
+        remembered = []
+        handled = 0
         for sprout in sprouts:
             try:
                 node_or_false = self.remember_node(sprout,
                                                    record_fleet_state=False,
                                                    # Do we want both of these to be decided by `eager`?
-                                                   eager=eager)
+                                                   eager=eager,
+                                                   store=False)  # stored all at once below
                 if node_or_false is not False:
                     remembered.append(node_or_false)
+                handled += 1
 
                 #
                 # Report Failure
@@ -954,9 +1011,71 @@ class Learner:
 
             except SuspiciousActivity:
                 message = f"Suspicious Activity: Discovered sprout with bad signature: {sprout}." \
-                          f"Propagated by: {current_teacher}"
+                          f"Propagated by: {teacher}"
                 self.log.warn(message)
 
+        if self.save_metadata and remembered:
+            self.node_storage.store_nodes_metadata(remembered)
+
+        if handled < len(sprouts):
+            # Some of the nodes could not be learned;
+            # next time, ask this teacher about all the nodes it knows.
+            self._teacher_fleet_states.pop(teacher.checksum_address, None)
+
+        return remembered
+
+    def learn_from_teacher_node(self, eager=False, canceller=None):
+        """
+        Sends a request to node_url to find out about known nodes.
+
+        TODO: Does this (and related methods) belong on FleetSensor for portability?
+
+        TODO: A lot of other code can be simplified if this is converted to async def.  That's a project, though.
+        """
+        remembered = self._load_seednodes_for_learning()
+
+        self._learning_round += 1
+        self._check_teacher_fleet_states()
+
+        current_teacher = self.current_teacher_node()  # Will raise if there's no available teacher.
+
+        announce_nodes = self._announce_nodes()
+
+        #
+        # Request
+        #
+        if canceller and canceller.stop_now:
+            return RELAX
+
+        try:
+            metadata_payload = self._fetch_metadata_from_teacher(teacher=current_teacher,
+                                                                 announce_nodes=announce_nodes,
+                                                                 canceller=canceller)
+        finally:
+            # Is cycling happening in the right order?
+            self.cycle_teacher_node()
+
+        if metadata_payload is None or metadata_payload is RELAX:
+            return metadata_payload
+
+        # End edge case handling.
+
+        fleet_state_updated = maya.MayaDT(metadata_payload.timestamp_epoch)
+
+        if not metadata_payload.announce_nodes:
+            # The teacher had the same fleet state
+            self.known_nodes.record_remote_fleet_state(
+                current_teacher.checksum_address,
+                self.known_nodes.checksum,
+                fleet_state_updated,
+                self.known_nodes.population)
+
+            return FLEET_STATES_MATCH
+
+        sprouts = [NodeSprout(node) for node in metadata_payload.announce_nodes]
+
+        remembered.extend(self._remember_sprouts(sprouts, teacher=current_teacher, eager=eager))
+
         ###################
 
         learning_round_log_message = "Learning round {}.  Teacher: {} knew about {} nodes, {} were new."
@@ -979,6 +1098,155 @@ class Learner:
 
         return sprouts
 
+    def _check_teacher_fleet_states(self) -> None:
+        """
+        Teachers only announce the nodes updated since our last exchange, so they would not announce again
+        the nodes we have forgotten since then: after forgetting any, ask every teacher for all its known nodes.
+        """
+        nodes_forgotten = self.known_nodes.nodes_forgotten
+        if nodes_forgotten != self._nodes_forgotten:
+            self._teacher_fleet_states.clear()
+            self._nodes_forgotten = nodes_forgotten
+
+    def _select_round_teachers(self, quantity: int) -> List['Teacher']:
+        """Takes up to ``quantity`` distinct teachers off the teacher queue, cycling through it."""
+        teachers = {}
+        for _ in range(quantity):
+            teacher = self.current_teacher_node()  # Will raise if there's no available teacher.
+            self.cycle_teacher_node()
+            teachers.setdefault(teacher.checksum_address, teacher)
+        return list(teachers.values())
+
+    def learn_from_teacher_nodes(self, eager=False, canceller=None, fanout: Optional[int] = None):
+        """
+        Concurrently requests known nodes from up to ``fanout`` teachers (``learning_fanout`` by default),
+        merges their announcements and records a single fleet state for the round.
+
+        Teachers that haven't responded within ``LEARNING_TIMEOUT`` are left behind,
+        so that one slow teacher does not hold up learning from the others.
+        """
+        remembered = self._load_seednodes_for_learning()
+
+        self._learning_round += 1
+        self._check_teacher_fleet_states()
+
+        teachers = self._select_round_teachers(quantity=fanout or self.learning_fanout)
+        teachers_by_address = {teacher.checksum_address: teacher for teacher in teachers}
+
+        announce_nodes = self._announce_nodes()
+
+        # These teachers will only announce the nodes they learned about since our last exchange.
+        partial_responses = {address for address in teachers_by_address if address in self._teacher_fleet_states}
+
+        #
+        # Request
+        #
+        if canceller and canceller.stop_now:
+            return RELAX
+
+        def worker(teacher_address: ChecksumAddress) -> MetadataResponsePayload:
+            metadata_payload = self._fetch_metadata_from_teacher(teacher=teachers_by_address[teacher_address],
+                                                                 announce_nodes=announce_nodes,
+                                                                 canceller=canceller)
+            if metadata_payload is None or metadata_payload is RELAX:
+                raise self.UnresponsiveTeacher(f"Nothing was learned from teacher {teacher_address}")
+            return metadata_payload
+
+        worker_pool = WorkerPool(worker=worker,
+                                 value_factory=AllAtOnceFactory(list(teachers_by_address)),
+                                 target_successes=len(teachers_by_address),
+                                 timeout=self.LEARNING_TIMEOUT,
+                                 threadpool_size=len(teachers_by_address))
+        worker_pool.start()
+        try:
+            payloads = worker_pool.block_until_target_successes()
+        except (WorkerPool.OutOfValues, WorkerPool.TimedOut):
+            payloads = worker_pool.get_successes()
+        finally:
+            worker_pool.cancel()
+
+        # Nodes learned from the responsive teachers are recorded before
+        # waiting for the stragglers to wind down.
+        try:
+            return self._merge_teacher_responses(teachers_by_address=teachers_by_address,
+                                                 payloads=payloads,
+                                                 partial_responses=partial_responses,
+                                                 remembered=remembered,
+                                                 eager=eager,
+                                                 canceller=canceller)
+        finally:
+            worker_pool.join()
+
+    def _merge_teacher_responses(self,
+                                 teachers_by_address: Dict[ChecksumAddress, 'Teacher'],
+                                 payloads: Dict[ChecksumAddress, MetadataResponsePayload],
+                                 partial_responses: Set[ChecksumAddress],
+                                 remembered: List,
+                                 eager: bool = False,
+                                 canceller=None):
+
+        if not payloads:
+            if canceller and canceller.stop_now:
+                return RELAX
+            self.log.info(f"Learning round {self._learning_round}.  None of {len(teachers_by_address)} teachers responded.")
+            return None
+
+        checksum_before_merge = self.known_nodes.checksum
+        population_before_merge = self.known_nodes.population
+
+        # The same node is usually announced by several teachers; keep its most recent metadata.
+        sprouts, announced_by = {}, {}
+        for teacher_address, metadata_payload in payloads.items():
+            for metadata in metadata_payload.announce_nodes:
+                sprout = NodeSprout(metadata)
+                known_sprout = sprouts.get(sprout.checksum_address)
+                if known_sprout is None or sprout.timestamp > known_sprout.timestamp:
+                    sprouts[sprout.checksum_address] = sprout
+                    announced_by[sprout.checksum_address] = teacher_address
+
+        sprouts_by_teacher = defaultdict(list)
+        for checksum_address, sprout in sprouts.items():
+            sprouts_by_teacher[announced_by[checksum_address]].append(sprout)
+        for teacher_address, teacher_sprouts in sprouts_by_teacher.items():
+            remembered.extend(self._remember_sprouts(teacher_sprouts,
+                                                     teacher=teachers_by_address[teacher_address],
+                                                     eager=eager))
+
+        learning_round_log_message = "Learning round {}.  {} of {} teachers knew about {} nodes, {} were new."
+        self.log.info(learning_round_log_message.format(self._learning_round,
+                                                        len(payloads),
+                                                        len(teachers_by_address),
+                                                        len(sprouts),
+                                                        len(remembered)))
+        if remembered:
+            self.known_nodes.record_fleet_state()
+
+        for teacher_address, metadata_payload in payloads.items():
+            if teacher_address not in self.known_nodes:
+                # The teacher was forgotten during this round.
+                continue
+            if not metadata_payload.announce_nodes:
+                # The teacher had our fleet state (before this round's merge)
+                state_checksum = checksum_before_merge
+                population = population_before_merge
+            else:
+                # Our merged state is not the teacher's; record the one it told us about, if any.
+                state_checksum = self._teacher_fleet_states.get(teacher_address)
+                if state_checksum is None:
+                    continue
+                # A partial response only announces the nodes updated since our last exchange.
+                population = None if teacher_address in partial_responses else len(metadata_payload.announce_nodes)
+            self.known_nodes.record_remote_fleet_state(teacher_address,
+                                                       state_checksum,
+                                                       maya.MayaDT(metadata_payload.timestamp_epoch),
+                                                       population)
+
+        if not sprouts:
+            # All the teachers had the same fleet state
+            return FLEET_STATES_MATCH
+
+        return list(sprouts.values())
+
 
 class Teacher:
     log = Logger("teacher")
@@ -1012,6 +1280,9 @@ class Teacher:
     class InvalidStamp(InvalidNode):
         """Base exception class for invalid character stamps"""
 
+    class VerificationTimedOut(InvalidNode):
+        """Raised when a node is about to be used, but its verification in the background did not complete in time"""
+
     class StampNotSigned(InvalidStamp):
         """Raised when a node does not have a stamp signature when one is required for verification"""
 
@@ -1053,24 +1324,54 @@ class Teacher:
             self.rest_server.rest_interface.port
         )
 
-    def bytestring_of_known_nodes(self):
-        # TODO (#1537): FleetSensor does metadata-to-byte conversion as well,
-        # we may be able to cache the results there.
-        self.log.info(f"bytestring_of_known_nodes known_nodes {len(self.known_nodes)}")
-        announce_nodes = [self.metadata()] + [node.metadata() for node in self.known_nodes]
+    def _sign_metadata_response(self, announce_nodes: List[NodeMetadata]) -> bytes:
         response_payload = MetadataResponsePayload(timestamp_epoch=self.known_nodes.timestamp.epoch,
                                                    announce_nodes=announce_nodes)
         response = MetadataResponse(self.stamp.as_umbral_signer(), response_payload)
         return bytes(response)
 
+    def bytestring_of_known_nodes(self) -> bytes:
+        # The response only depends on the fleet state, so it is signed once per fleet state (#1537).
+        return self.known_nodes.cached_metadata_response(variant='all', make_response=self._bytestring_of_known_nodes)
+
+    def _bytestring_of_known_nodes(self) -> bytes:
+        self.log.info(f"bytestring_of_known_nodes known_nodes {len(self.known_nodes)}")
+        announce_nodes = [self.metadata()] + [node.metadata() for node in self.known_nodes]
+        return self._sign_metadata_response(announce_nodes)
+
+    def bytestring_of_no_known_nodes(self) -> bytes:
+        """The response sent when the learner's fleet state matches ours (or when we can't serve the learner)."""
+        return self.known_nodes.cached_metadata_response(variant='none',
+                                                         make_response=lambda: self._sign_metadata_response([]))
+
+    def bytestring_of_nodes_updated_since(self, fleet_state_checksum: bytes) -> Optional[bytes]:
+        """
+        Like ``bytestring_of_known_nodes()``, but only announces the nodes added or updated after
+        the fleet state with the given checksum.  Returns ``None`` if that state is not archived.
+        """
+        # Only archived states get a cached response: checksums come from the requesters,
+        # and there are at most `FleetSensor._ARCHIVED_STATES_LIMIT` archived ones.
+        updated_nodes = self.known_nodes.nodes_updated_since(fleet_state_checksum)
+        if updated_nodes is None:
+            return None
+
+        def make_response():
+            # This node is always announced, so that the response
+            # cannot be mistaken for the one sent when the fleet states match.
+            announce_nodes = [self.metadata()] + [node.metadata() for node in updated_nodes]
+            return self._sign_metadata_response(announce_nodes)
+
+        return self.known_nodes.cached_metadata_response(variant=('since', bytes(fleet_state_checksum)),
+                                                         make_response=make_response)
+
     def _operator_is_bonded(self, registry: BaseContractRegistry) -> bool:
         """
         This method assumes the stamp's signature is valid and accurate.
         As a follow-up, this checks that the worker is bonded to a staking provider, but it may be
         the case that the "staking provider" isn't "staking" (e.g., all her tokens have been slashed).
         """
-        application_agent = ContractAgency.get_agent(PREApplicationAgent, registry=registry)  # type: PREApplicationAgent
-        staking_provider_address = application_agent.get_staking_provider_from_operator(operator_address=self.operator_address)
+        staking_statuses = StakingStatusCache.for_registry(registry=registry)
+        staking_provider_address = staking_statuses.get_staking_provider(operator_address=self.operator_address)
         if staking_provider_address == NULL_ADDRESS:
             raise self.UnbondedOperator(f"Operator {self.operator_address} is not bonded")
         return staking_provider_address == self.checksum_address
@@ -1080,8 +1381,8 @@ class Teacher:
         This method assumes the stamp's signature is valid and accurate.
         As a follow-up, this checks that the staking provider is, indeed, staking.
         """
-        application_agent = ContractAgency.get_agent(PREApplicationAgent, registry=registry, eth_provider_uri=eth_provider_uri)  # type: PREApplicationAgent
-        is_staking = application_agent.is_authorized(staking_provider=self.checksum_address)  # checksum address here is staking provider
+        staking_statuses = StakingStatusCache.for_registry(registry=registry, eth_provider_uri=eth_provider_uri)
+        is_staking = staking_statuses.is_staking(staking_provider=self.checksum_address)  # checksum address here is staking provider
         return is_staking
 
     def validate_operator(self, registry: BaseContractRegistry = None, eth_provider_uri: Optional[str] = None) -> None:
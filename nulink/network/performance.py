@@ -0,0 +1,136 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from eth_typing import ChecksumAddress
+
+
+class NodePerformance:
+    """The performance of a node in the requests made to it, as exponentially weighted moving averages."""
+
+    __slots__ = ('latency', 'error_rate', 'last_seen', 'last_request', 'requests')
+
+    def __init__(self):
+        self.latency = None  # type: Optional[float]  # seconds, of the successful requests
+        self.error_rate = 0.0
+        self.last_seen = None  # type: Optional[float]  # clock time of the last successful request
+        self.last_request = None  # type: Optional[float]
+        self.requests = 0
+
+
+class NodePerformanceTracker:
+    """
+    Rolling model of the latency and reliability of the nodes a learner makes requests to,
+    used to contact the nodes expected to answer fastest first.
+
+    A node is scored with the expected cost of a request to it: its average latency, plus ``ERROR_PENALTY``
+    seconds weighted by its error rate.  The nodes without requests for ``STALE_AFTER`` seconds,
+    or without requests at all, are scored like an average node, so that they still get a chance.
+    """
+
+    DEFAULT_ALPHA = 0.2  # weight of the latest request in the moving averages
+    ERROR_PENALTY = 5  # seconds
+    STALE_AFTER = 60 * 30  # seconds
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, clock: Callable[[], float] = time.monotonic):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Alpha must be in (0, 1], got {alpha}")
+        self.alpha = alpha
+        self._clock = clock
+        self._nodes = dict()  # type: Dict[ChecksumAddress, NodePerformance]
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __getitem__(self, checksum_address: ChecksumAddress) -> NodePerformance:
+        return self._nodes[checksum_address]
+
+    def record_success(self, checksum_address: ChecksumAddress, latency: float) -> None:
+        with self._lock:
+            performance = self._record(checksum_address, error=False)
+            if performance.latency is None:
+                performance.latency = latency
+            else:
+                performance.latency += self.alpha * (latency - performance.latency)
+            performance.last_seen = self._clock()
+
+    def record_failure(self, checksum_address: ChecksumAddress) -> None:
+        with self._lock:
+            self._record(checksum_address, error=True)
+
+    @contextmanager
+    def measure(self, checksum_address: ChecksumAddress) -> Iterator[None]:
+        """Records the latency of the request made in the block, or its failure if it raises."""
+        start = self._clock()
+        try:
+            yield
+        except BaseException:
+            self.record_failure(checksum_address)
+            raise
+        self.record_success(checksum_address, latency=self._clock() - start)
+
+    def score(self, checksum_address: ChecksumAddress) -> float:
+        """The expected cost of a request to a node, in seconds; lower is better."""
+        with self._lock:
+            return self._scores().get(checksum_address, self._average_score())
+
+    def rank(self, checksum_addresses: Iterable[ChecksumAddress]) -> List[ChecksumAddress]:
+        """Sorts nodes by their score; the nodes with equal scores keep their order."""
+        with self._lock:
+            scores = self._scores()
+            average = self._average_score(scores)
+        return sorted(checksum_addresses, key=lambda address: scores.get(address, average))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            scores = self._scores()
+            return dict(nodes=len(self._nodes),
+                        fresh=len(scores),
+                        requests=sum(performance.requests for performance in self._nodes.values()))
+
+    def _record(self, checksum_address: ChecksumAddress, error: bool) -> NodePerformance:
+        # Called with the lock held
+        try:
+            performance = self._nodes[checksum_address]
+        except KeyError:
+            performance = self._nodes[checksum_address] = NodePerformance()
+            performance.error_rate = float(error)
+        else:
+            performance.error_rate += self.alpha * (float(error) - performance.error_rate)
+        performance.requests += 1
+        performance.last_request = self._clock()
+        return performance
+
+    def _scores(self) -> Dict[ChecksumAddress, float]:
+        # Called with the lock held; only the nodes with fresh records are scored
+        now = self._clock()
+        scores = dict()
+        for checksum_address, performance in self._nodes.items():
+            if now - performance.last_request > self.STALE_AFTER:
+                continue
+            latency = performance.latency if performance.latency is not None else 0
+            scores[checksum_address] = latency + performance.error_rate * self.ERROR_PENALTY
+        return scores
+
+    def _average_score(self, scores: Optional[Dict[ChecksumAddress, float]] = None) -> float:
+        scores = self._scores() if scores is None else scores
+        return sum(scores.values()) / len(scores) if scores else 0
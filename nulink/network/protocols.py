@@ -14,6 +14,9 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
+from http import HTTPStatus
+from typing import List, Sequence, Tuple
+
 from eth_utils import is_checksum_address
 from urllib.parse import urlparse
 
@@ -24,6 +27,48 @@ class SuspiciousActivity(RuntimeError):
     """raised when an action appears to amount to malicious conduct."""
 
 
+#
+# Batch envelopes: several requests (or their results) sent in one HTTP body, each prefixed by its length.
+#
+
+_BATCH_LENGTH_PREFIX = 4
+_BATCH_STATUS_LENGTH = 2
+
+
+def pack_batch(items: Sequence[bytes]) -> bytes:
+    return b''.join(len(item).to_bytes(_BATCH_LENGTH_PREFIX, 'big') + bytes(item) for item in items)
+
+
+def unpack_batch(envelope: bytes) -> List[bytes]:
+    """Raises ``ValueError`` if the envelope is malformed."""
+    items, cursor = list(), 0
+    while cursor < len(envelope):
+        length_end = cursor + _BATCH_LENGTH_PREFIX
+        if length_end > len(envelope):
+            raise ValueError("Malformed batch envelope: truncated length prefix")
+        item_end = length_end + int.from_bytes(envelope[cursor:length_end], 'big')
+        if item_end > len(envelope):
+            raise ValueError("Malformed batch envelope: truncated item")
+        items.append(envelope[length_end:item_end])
+        cursor = item_end
+    return items
+
+
+def pack_batch_results(results: Sequence[Tuple[int, bytes]]) -> bytes:
+    """Packs the (HTTP status, body) result of each request of a batch, in the order of the requests."""
+    return pack_batch([int(status).to_bytes(_BATCH_STATUS_LENGTH, 'big') + body for status, body in results])
+
+
+def unpack_batch_results(envelope: bytes) -> List[Tuple[HTTPStatus, bytes]]:
+    results = list()
+    for result in unpack_batch(envelope):
+        if len(result) < _BATCH_STATUS_LENGTH:
+            raise ValueError("Malformed batch result: no status")
+        status = HTTPStatus(int.from_bytes(result[:_BATCH_STATUS_LENGTH], 'big'))
+        results.append((status, result[_BATCH_STATUS_LENGTH:]))
+    return results
+
+
 def parse_node_uri(uri: str):
     from nulink.config.characters import UrsulaConfiguration
 
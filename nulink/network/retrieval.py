@@ -15,9 +15,11 @@ You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
 import random
-from typing import Dict, Sequence, List, Optional, Tuple
+import time
+from threading import Lock
+from typing import Callable, Dict, Sequence, List, Optional, Tuple
 
 from eth_typing.evm import ChecksumAddress
 from eth_utils import to_checksum_address
@@ -48,7 +50,10 @@ class RetrievalPlan:
     during retrieval.
     """
 
-    def __init__(self, treasure_map: TreasureMap, retrieval_kits: Sequence[RetrievalKit]):
+    def __init__(self,
+                 treasure_map: TreasureMap,
+                 retrieval_kits: Sequence[RetrievalKit],
+                 rank: Optional[Callable[[List[ChecksumAddress]], List[ChecksumAddress]]] = None):
 
         # Record the retrieval kits order
         self._capsules = [retrieval_kit.capsule for retrieval_kit in retrieval_kits]
@@ -77,9 +82,11 @@ class RetrievalPlan:
         for queried_addresses in self._queried_addresses.values():
             ursulas_to_contact_last |= queried_addresses
 
-        # Randomize Ursulas' priorities
+        # Randomize Ursulas' priorities, then put the ones that were fast and reliable so far first
         ursulas_pick_order = list(treasure_map.destinations)  # checksum addresses
         random.shuffle(ursulas_pick_order)  # mutates list in-place
+        if rank is not None:
+            ursulas_pick_order = rank(ursulas_pick_order)
 
         ursulas_pick_order = [ursula for ursula in ursulas_pick_order
                               if ursula not in ursulas_to_contact_last]
@@ -167,13 +174,150 @@ class RetrievalStrategy:
         return batch
 
 
+class LatencyRecord:
+    """
+    A rolling record of the latencies of successful reencryption requests, giving the deadline
+    after which a pending request is hedged: a percentile of the recent latencies.
+    """
+
+    DEFAULT_WINDOW = 200  # latencies
+    DEFAULT_PERCENTILE = 90
+    DEFAULT_DEADLINE = 1  # seconds, until there are enough latencies recorded
+    MIN_SAMPLES = 10
+    MIN_DEADLINE = 0.05  # seconds
+    MAX_DEADLINE = 5  # seconds
+
+    def __init__(self,
+                 window: int = DEFAULT_WINDOW,
+                 percentile: float = DEFAULT_PERCENTILE,
+                 default_deadline: float = DEFAULT_DEADLINE):
+        if not 0 < percentile <= 100:
+            raise ValueError(f"Percentile must be in (0, 100], got {percentile}")
+        self.percentile = percentile
+        self.default_deadline = default_deadline
+        self._latencies = deque(maxlen=window)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def deadline(self) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.MIN_SAMPLES:
+            return self.default_deadline
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return min(max(latencies[index], self.MIN_DEADLINE), self.MAX_DEADLINE)
+
+
+class HedgedRetrievalStrategy:
+    """
+    Value factory for hedged retrieval, drawing Ursulas in the given order.
+    Draws ``threshold + hedge`` Ursulas at first; on every later call,
+    draws more to replace the requests that failed, and one more for each request pending for longer than
+    the deadline of the latencies record.  Returns an empty batch while there is nothing to add,
+    and ``None`` once out of Ursulas.
+
+    At most ``max_hedges`` hedging requests run at once; overdue requests beyond that are hedged
+    as the running hedges finish.  Requests left behind when the retrieval returns cannot be interrupted
+    and hold an executor thread until they time out, so this bounds the threads a slow fleet can tie up.
+
+    The worker reports the start and the outcome of each request with `started()` and `finished()`.
+    Successes are counted here as well, since the worker pool records a success only after the worker returns:
+    until then, a successful request would be neither in flight nor counted, and be replaced needlessly.
+    """
+
+    DEFAULT_MAX_HEDGES = 2  # hedging requests running at once
+
+    def __init__(self,
+                 retrieval_work_order_key_list: List[ChecksumAddress],
+                 threshold: int,
+                 hedge: int,
+                 latencies: LatencyRecord,
+                 max_hedges: int = DEFAULT_MAX_HEDGES,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_hedges < 0:
+            raise ValueError(f"max_hedges must not be negative, got {max_hedges}")
+        self._addresses = list(retrieval_work_order_key_list)  # in the order of preference
+        self._threshold = threshold
+        self._hedge = hedge
+        self._latencies = latencies
+        self._max_hedges = max_hedges
+        self._clock = clock
+        self._lock = Lock()
+        self._in_flight = set()  # {address}, for the running requests
+        self._hedges = set()  # {address}, for the running requests drawn as hedges
+        self._unhedged = dict()  # {address: request start}, for the running requests not hedged yet
+        self._successes = 0
+        self._drawn = False
+
+        # Metrics
+        self.hedged = 0
+
+    def started(self, address: ChecksumAddress) -> None:
+        with self._lock:
+            if address in self._in_flight:
+                self._unhedged[address] = self._clock()
+
+    def finished(self, address: ChecksumAddress, success: bool) -> None:
+        with self._lock:
+            if address in self._in_flight:
+                self._in_flight.remove(address)
+                self._successes += int(success)
+            self._hedges.discard(address)
+            self._unhedged.pop(address, None)
+
+    def __call__(self, successes: int) -> Optional[List[ChecksumAddress]]:
+        with self._lock:
+            if not self._addresses:
+                return None
+
+            overdue = []
+            if self._drawn:
+                now = self._clock()
+                deadline = self._latencies.deadline()
+                overdue = [address for address, start in self._unhedged.items() if now - start >= deadline]
+                overdue = overdue[:max(self._max_hedges - len(self._hedges), 0)]
+                for address in overdue:
+                    del self._unhedged[address]
+            self._drawn = True
+            successes = max(successes, self._successes)
+            missing = self._threshold + self._hedge - successes - len(self._in_flight)
+            quantity = max(missing, 0) + len(overdue)
+
+            batch = self._addresses[:quantity]
+            del self._addresses[:quantity]
+            self._in_flight.update(batch)
+            hedges = batch[len(batch) - min(len(overdue), len(batch)):]
+            self._hedges.update(hedges)
+            self.hedged += len(hedges)
+            return batch
+
+
 class RetrievalClient:
     """
     Capsule frag retrieval machinery shared between Bob and Porter.
+
+    In hedged mode (the default), reencryption requests are sent to ``threshold + hedge`` Ursulas at once,
+    more are sent as requests fail or run late, and the retrieval returns as soon as ``threshold`` of them
+    succeeded, without waiting for the others.
     """
 
-    def __init__(self, learner: Learner):
+    DEFAULT_HEDGE = 1  # requests beyond the threshold
+    HEDGE_CHECK_INTERVAL = 0.1  # seconds
+    HEDGED_RETRIEVAL_TIMEOUT = 15  # seconds
+
+    # Shared by all the clients of the process, so that deadlines are derived from many retrievals
+    _latencies = LatencyRecord()
+
+    def __init__(self, learner: Learner, hedged: bool = True, hedge: int = DEFAULT_HEDGE):
         self._learner = learner
+        self._hedged = hedged
+        self._hedge = hedge
         self.log = Logger(self.__class__.__name__)
 
     def _ensure_ursula_availability(self, treasure_map: TreasureMap, timeout=10):
@@ -277,6 +421,87 @@ class RetrievalClient:
         return {capsule: vcfrag for capsule, vcfrag
                 in zip(reencryption_request.capsules, verified_cfrags)}
 
+    def _retrieve_hedged(self,
+                         worker: Callable[[ChecksumAddress], Dict['Capsule', 'VerifiedCapsuleFrag']],
+                         addresses: List[ChecksumAddress],
+                         threshold: int
+                         ) -> Tuple['WorkerPool', Dict[ChecksumAddress, Dict['Capsule', 'VerifiedCapsuleFrag']]]:
+        from nulink.utilities.concurrency import WorkerPool
+
+        value_factory = HedgedRetrievalStrategy(addresses, threshold=threshold, hedge=self._hedge, latencies=self._latencies)
+
+        def timed_worker(address: ChecksumAddress) -> Dict['Capsule', 'VerifiedCapsuleFrag']:
+            value_factory.started(address)
+            start = time.monotonic()
+            try:
+                cfrags = worker(address)
+            except BaseException:
+                value_factory.finished(address, success=False)
+                raise
+            value_factory.finished(address, success=True)
+            self._latencies.record(time.monotonic() - start)
+            return cfrags
+
+        worker_pool = WorkerPool(
+            worker=timed_worker,
+            value_factory=value_factory,
+            target_successes=threshold,
+            timeout=self.HEDGED_RETRIEVAL_TIMEOUT,
+            stagger_timeout=self.HEDGE_CHECK_INTERVAL,
+            threadpool_size=max(len(addresses), 1)
+        )
+        worker_pool.start()
+        try:
+            successes = worker_pool.block_until_target_successes()
+        except (WorkerPool.OutOfValues, WorkerPool.TimedOut):
+            successes = worker_pool.get_successes()
+        finally:
+            # Outstanding requests are abandoned rather than waited for; their results are ignored.
+            worker_pool.cancel()
+
+        if value_factory.hedged:
+            self.log.debug(f"Hedged {value_factory.hedged} slow reencryption request(s)")
+        return worker_pool, successes
+
+    def _retrieve_staggered(self,
+                            worker: Callable[[ChecksumAddress], Dict['Capsule', 'VerifiedCapsuleFrag']],
+                            addresses: List[ChecksumAddress],
+                            threshold: int
+                            ) -> Tuple['WorkerPool', Dict[ChecksumAddress, Dict['Capsule', 'VerifiedCapsuleFrag']]]:
+        from nulink.utilities.concurrency import WorkerPool
+
+        value_factory = RetrievalStrategy(list(reversed(addresses)), threshold)  # drawn from the end
+
+        def worker_pool_start(target_successes: int, timeout=15) -> Tuple['WorkerPool', Dict[ChecksumAddress, Dict['Capsule', 'VerifiedCapsuleFrag']]]:
+            worker_pool = WorkerPool(
+                worker=worker,
+                value_factory=value_factory,
+                target_successes=target_successes,
+                timeout=timeout,
+                stagger_timeout=1
+            )
+            worker_pool.start()
+            try:
+                worker_pool.block_until_target_successes()
+            except (WorkerPool.OutOfValues, WorkerPool.TimedOut):
+                # run the pragma here, the cfrags maybe not enough cause by last exception: continue -> on line 306, 327
+                # fix for: Reduce the probability of insufficient cfrags
+                # It's possible to raise some other exceptions here but we will use the logic below.
+                pass
+            finally:
+                worker_pool.cancel()
+                worker_pool.join()
+
+            return worker_pool, worker_pool.get_successes()
+
+        worker_pool, successes = worker_pool_start(threshold, timeout=12)
+
+        if len(successes) < threshold:
+            worker_pool, new_successes = worker_pool_start(threshold - len(successes), timeout=15)
+            successes.update(new_successes)
+
+        return worker_pool, successes
+
     def retrieve_cfrags(
             self,
             treasure_map: TreasureMap,
@@ -288,7 +513,10 @@ class RetrievalClient:
 
         self._ensure_ursula_availability(treasure_map)
 
-        retrieval_plan = RetrievalPlan(treasure_map=treasure_map, retrieval_kits=retrieval_kits)
+        node_performance = self._learner.node_performance
+        retrieval_plan = RetrievalPlan(treasure_map=treasure_map,
+                                       retrieval_kits=retrieval_kits,
+                                       rank=node_performance.rank)
         retrieval_worker_orders: Dict[ChecksumAddress, 'RetrievalWorkOrder'] = {}
         while True:
             try:
@@ -297,78 +525,57 @@ class RetrievalClient:
             except RuntimeError:
                 break
 
-        value_factory = RetrievalStrategy(list(retrieval_worker_orders.keys()), treasure_map.threshold)
-
-        def worker_pool_start(target_successes: int, timeout=15) -> Tuple['WorkerPool', Dict[ChecksumAddress, Dict['Capsule', 'VerifiedCapsuleFrag']]]:
-
-            from nulink.utilities.concurrency import WorkerPool
-
-            def worker(address: ChecksumAddress) -> Dict['Capsule', 'VerifiedCapsuleFrag']:
+        def worker(address: ChecksumAddress) -> Dict['Capsule', 'VerifiedCapsuleFrag']:
 
-                print(f"-------------- worker is start -------------- address: {address}")
-                work_order: 'RetrievalWorkOrder' = retrieval_worker_orders.get(address)
-                # TODO (#1995): when that issue is fixed, conversion is no longer needed
+            print(f"-------------- worker is start -------------- address: {address}")
+            work_order: 'RetrievalWorkOrder' = retrieval_worker_orders.get(address)
+            # TODO (#1995): when that issue is fixed, conversion is no longer needed
 
-                if not work_order:
-                    raise Exception(f"not find ursula {address} in retrieval_worker_orders")
+            if not work_order:
+                raise Exception(f"not find ursula {address} in retrieval_worker_orders")
 
-                ursula_checksum_address = to_checksum_address(work_order.ursula_address)
+            ursula_checksum_address = to_checksum_address(work_order.ursula_address)
 
-                if ursula_checksum_address not in self._learner.known_nodes:
-                    raise Exception(f"not find ursula {work_order.ursula_address} in known_nodes")
+            if ursula_checksum_address not in self._learner.known_nodes:
+                raise Exception(f"not find ursula {work_order.ursula_address} in known_nodes")
 
-                ursula = self._learner.known_nodes[ursula_checksum_address]
+            ursula = self._learner.known_nodes[ursula_checksum_address]
 
-                reencryption_request = ReencryptionRequest(
-                    hrac=treasure_map.hrac,
-                    capsules=work_order.capsules,
-                    encrypted_kfrag=treasure_map.destinations[work_order.ursula_address],
-                    bob_verifying_key=bob_verifying_key,
-                    publisher_verifying_key=treasure_map.publisher_verifying_key)
+            reencryption_request = ReencryptionRequest(
+                hrac=treasure_map.hrac,
+                capsules=work_order.capsules,
+                encrypted_kfrag=treasure_map.destinations[work_order.ursula_address],
+                bob_verifying_key=bob_verifying_key,
+                publisher_verifying_key=treasure_map.publisher_verifying_key)
 
-                try:
+            try:
+                with node_performance.measure(ursula_checksum_address):
                     cfrags = self._request_reencryption(ursula=ursula,
                                                         reencryption_request=reencryption_request,
                                                         alice_verifying_key=alice_verifying_key,
                                                         policy_encrypting_key=treasure_map.policy_encrypting_key,
                                                         bob_encrypting_key=bob_encrypting_key)
-                except Exception as e:
-                    # TODO (#2789): at this point we can separate the exceptions to "acceptable"
-                    # (Ursula is not reachable) and "unacceptable" (Ursula provided bad results).
-                    self.log.warn(f"Ursula {ursula} failed to reencrypt: {e}")
-                    print(f"-------------- worker is exception -------------- address: {address}")
-                    raise Exception(f"Ursula {ursula} failed to reencrypt: {e}")
-
-                retrieval_plan.update(work_order, cfrags)
-                print(f"-------------- worker is finish -------------- address: {address}")
-                return cfrags
-
-            worker_pool = WorkerPool(
-                worker=worker,
-                value_factory=value_factory,
-                target_successes=target_successes,
-                timeout=timeout,
-                stagger_timeout=1
-            )
-            worker_pool.start()
-            try:
-                successes = worker_pool.block_until_target_successes()
-            except (WorkerPool.OutOfValues, WorkerPool.TimedOut):
-                # run the pragma here, the cfrags maybe not enough cause by last exception: continue -> on line 306, 327
-                # fix for: Reduce the probability of insufficient cfrags
-                # It's possible to raise some other exceptions here but we will use the logic below.
-                successes = worker_pool.get_successes()
-            finally:
-                worker_pool.cancel()
-                worker_pool.join()
-
-            return worker_pool, successes
-
-        worker_pool, successes = worker_pool_start(treasure_map.threshold, timeout=12)
-
-        if len(successes) < treasure_map.threshold:
-            worker_pool, new_successes = worker_pool_start(treasure_map.threshold - len(successes), timeout=15)
-            successes.update(new_successes)
+            except Exception as e:
+                # TODO (#2789): at this point we can separate the exceptions to "acceptable"
+                # (Ursula is not reachable) and "unacceptable" (Ursula provided bad results).
+                self.log.warn(f"Ursula {ursula} failed to reencrypt: {e}")
+                print(f"-------------- worker is exception -------------- address: {address}")
+                raise Exception(f"Ursula {ursula} failed to reencrypt: {e}")
+
+            print(f"-------------- worker is finish -------------- address: {address}")
+            return cfrags
+
+        if self._hedged:
+            worker_pool, successes = self._retrieve_hedged(worker=worker,
+                                                           addresses=list(retrieval_worker_orders.keys()),
+                                                           threshold=treasure_map.threshold)
+        else:
+            worker_pool, successes = self._retrieve_staggered(worker=worker,
+                                                              addresses=list(retrieval_worker_orders.keys()),
+                                                              threshold=treasure_map.threshold)
+
+        for address, cfrags in successes.items():
+            retrieval_plan.update(retrieval_worker_orders[address], cfrags)
 
         if len(successes) < treasure_map.threshold:
             failures = worker_pool.get_failures()
@@ -26,23 +26,29 @@ from constant_sorrow.constants import RELAX
 from flask import Flask, Response, jsonify, request
 from mako import exceptions as mako_exceptions
 from mako.template import Template
+import maya
 from nucypher_core import (
     ReencryptionRequest,
     RevocationOrder,
     MetadataRequest,
-    MetadataResponse,
-    MetadataResponsePayload,
 )
 from nulink import __version__
-from nulink.config.constants import MAX_UPLOAD_CONTENT_LENGTH
+from nulink.characters.requesters import RequesterIdentity
+from nulink.config.constants import (
+    FLEET_STATE_HEADER,
+    FLEET_STATE_SINCE_PARAM,
+    MAX_REENCRYPTION_BATCH_SIZE,
+    MAX_UPLOAD_CONTENT_LENGTH
+)
 from nulink.control.emitters import StdoutEmitter
 from nulink.crypto.keypairs import DecryptingKeypair
 from nulink.crypto.signing import InvalidSignature
 from nulink.datastore.datastore import Datastore
 from nulink.datastore.models import ReencryptionRequest as ReencryptionRequestModel
+from nulink.datastore.writer import BufferedRecordWriter
 from nulink.network.exceptions import NodeSeemsToBeDown
 from nulink.network.nodes import NodeSprout
-from nulink.network.protocols import InterfaceInfo
+from nulink.network.protocols import InterfaceInfo, pack_batch_results, unpack_batch
 from nulink.utilities.logging import Logger
 from nulink.utilities.version import check_version_pickle_symbol, VersionMismatchError, check_version
 
@@ -81,11 +87,15 @@ def make_rest_app(
         this_node,
         log: Logger = Logger("http-application-layer"),
         lmdb_map_size=None,
+        audit_durability: str = BufferedRecordWriter.SYNC,
 ) -> Tuple[Flask, Datastore]:
     """
     Creates a REST application and an associated ``Datastore`` object.
     Note that the REST app **does not** hold a reference to the datastore;
     it is your responsibility to ensure it lives for as long as the app does.
+
+    Reencryption requests are recorded in the datastore by a ``BufferedRecordWriter``
+    with the given durability mode, available as ``rest_app.extensions['audit_log']``.
     """
 
     # A trampoline function for the real REST app,
@@ -96,12 +106,13 @@ def make_rest_app(
 
     log.info("Starting datastore {}".format(db_filepath))
     datastore = Datastore(db_filepath, map_size=lmdb_map_size)
-    rest_app = _make_rest_app(weakref.proxy(datastore), weakref.proxy(this_node), log)
+    audit_log = BufferedRecordWriter(datastore, durability=audit_durability)
+    rest_app = _make_rest_app(weakref.proxy(datastore), audit_log, weakref.proxy(this_node), log)
 
     return rest_app, datastore
 
 
-def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
+def _make_rest_app(datastore: Datastore, audit_log: BufferedRecordWriter, this_node, log: Logger) -> Flask:
     # TODO: Avoid circular imports :-(
     from nulink.characters.lawful import Alice, Bob, Ursula
 
@@ -111,6 +122,7 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
 
     rest_app = Flask("ursula-service")
     rest_app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_CONTENT_LENGTH
+    rest_app.extensions['audit_log'] = audit_log
 
     @rest_app.route("/public_information")
     def public_information():
@@ -122,9 +134,15 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
         response = Response(response=bytes(this_node.metadata()) + split_symbol + bytes(__version__, 'utf-8'), mimetype='application/octet-stream')
         return response
 
+    def fleet_state_headers():
+        # Must be taken before the announced nodes are collected, so that the learner
+        # never skips nodes recorded concurrently with this response.
+        return {'Content-Type': 'application/octet-stream',
+                FLEET_STATE_HEADER: bytes(this_node.known_nodes.checksum).hex()}
+
     @rest_app.route('/node_metadata', methods=["GET"])
     def all_known_nodes():
-        headers = {'Content-Type': 'application/octet-stream'}
+        headers = fleet_state_headers()
         if this_node._learning_deferred is not RELAX and not this_node._learning_task.running:
             # Learn when learned about
             this_node.start_learning_loop()
@@ -137,19 +155,31 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
 
         return Response(response_bytes + split_symbol + bytes(__version__, 'utf-8'), headers=headers)
 
+    def known_nodes_updated_since(since_fleet_state: str):
+        headers = fleet_state_headers()
+        try:
+            response_bytes = this_node.bytestring_of_nodes_updated_since(bytes.fromhex(since_fleet_state))
+        except ValueError:
+            response_bytes = None
+        if response_bytes is None:
+            # This fleet state is too old (or was never ours), so there are no diffs to send.
+            return all_known_nodes()
+
+        split_symbol = bytes(check_version_pickle_symbol, 'utf-8')
+
+        return Response(response_bytes + split_symbol + bytes(__version__, 'utf-8'), headers=headers)
+
     @rest_app.route('/node_metadata', methods=["POST"])
     def node_metadata_exchange():
 
         log.info(f"known_nodes {len(this_node.known_nodes)}")
 
         def bytestring_of_empty_known_nodes():
-            headers = {'Content-Type': 'application/octet-stream'}
-            response_payload = MetadataResponsePayload(timestamp_epoch=this_node.known_nodes.timestamp.epoch,
-                                                       announce_nodes=[])
-            response = MetadataResponse(this_node.stamp.as_umbral_signer(), response_payload)
+            headers = fleet_state_headers()
+            response_bytes = this_node.bytestring_of_no_known_nodes()
 
             split_symbol = bytes(check_version_pickle_symbol, 'utf-8')
-            return Response(bytes(response) + split_symbol + bytes(__version__, 'utf-8'), headers=headers)
+            return Response(response_bytes + split_symbol + bytes(__version__, 'utf-8'), headers=headers)
 
         try:
             metadata_request = MetadataRequest.from_bytes(request.data)
@@ -199,24 +229,25 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
 
         # TODO: generate a new fleet state here?
 
+        # A learner that has learned from us before only needs the nodes we've learned about since then.
+        since_fleet_state = request.args.get(FLEET_STATE_SINCE_PARAM)
+        if since_fleet_state:
+            return known_nodes_updated_since(since_fleet_state)
+
         # TODO: What's the right status code here?  202?  Different if we already knew about the node(s)?
         return all_known_nodes()
 
-    @rest_app.route('/reencrypt', methods=["POST"])
-    def reencrypt():
-
-        from nulink.characters.lawful import Bob
-
-        # TODO: Cache & Optimize
+    def handle_reencryption_request(reencryption_request_bytes: bytes) -> Tuple[HTTPStatus, bytes]:
+        """Re-encrypts the capsules of a single ``ReencryptionRequest``; returns the status and body of the result."""
 
-        reenc_request = ReencryptionRequest.from_bytes(request.data)
+        reenc_request = ReencryptionRequest.from_bytes(reencryption_request_bytes)
         hrac = reenc_request.hrac # => treasure_map.hrac => HRAC
-        bob = Bob.from_public_keys(verifying_key=reenc_request.bob_verifying_key)
+        bob = RequesterIdentity.from_public_keys(verifying_key=reenc_request.bob_verifying_key)
         log.info(f"Reencryption request from {bob} for policy {hrac}")
 
         # Right off the bat, if this HRAC is already known to be revoked, reject the order.
         if hrac in this_node.revoked_policies:
-            return Response(response=f"Policy with {hrac} has been revoked.", status=HTTPStatus.UNAUTHORIZED)
+            return HTTPStatus.UNAUTHORIZED, f"Policy with {hrac} has been revoked.".encode()
 
         publisher_verifying_key = reenc_request.publisher_verifying_key
 
@@ -230,17 +261,17 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
             verified_kfrag = this_node._decrypt_kfrag(reenc_request.encrypted_kfrag, hrac, publisher_verifying_key)
         except DecryptingKeypair.DecryptionFailed:
             # TODO: don't we want to record suspicious activities here too?
-            return Response(response="EncryptedKeyFrag decryption failed.", status=HTTPStatus.FORBIDDEN)
+            return HTTPStatus.FORBIDDEN, b"EncryptedKeyFrag decryption failed."
         except InvalidSignature as e:
             message = f'{bob_identity_message} Invalid signature for KeyFrag: {e}.'
             log.info(message)
             # TODO (#567): bucket the node as suspicious
-            return Response(message, status=HTTPStatus.UNAUTHORIZED)  # 401 - Unauthorized
+            return HTTPStatus.UNAUTHORIZED, message.encode()  # 401 - Unauthorized
         except Exception as e:
             message = f'{bob_identity_message} Invalid EncryptedKeyFrag: {e}.'
             log.info(message)
             # TODO (#567): bucket the node as suspicious
-            return Response(message, status=HTTPStatus.BAD_REQUEST)
+            return HTTPStatus.BAD_REQUEST, message.encode()
 
         # Enforce Policy Payment
         # TODO: Accept multiple payment methods
@@ -248,7 +279,7 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
         paid = this_node.payment_method.verify(payee=this_node.checksum_address, request=reenc_request)
         if not paid:
             message = f"{bob_identity_message} Policy {bytes(hrac)} is unpaid."
-            return Response(message, status=HTTPStatus.PAYMENT_REQUIRED)
+            return HTTPStatus.PAYMENT_REQUIRED, message.encode()
 
         # Re-encrypt
         # TODO: return a sensible response if it fails (currently results in 500)
@@ -256,11 +287,49 @@ def _make_rest_app(datastore: Datastore, this_node, log: Logger) -> Flask:
 
         # Now, Ursula saves evidence of this workorder to her database...
         # Note: we give the work order a random ID to store it under.
-        with datastore.describe(ReencryptionRequestModel, str(uuid.uuid4()), writeable=True) as new_request:
-            new_request.bob_verifying_key = bob_verifying_key
+        audit_log.write(ReencryptionRequestModel, str(uuid.uuid4()),
+                        bob_verifying_key=bob_verifying_key,
+                        timestamp=maya.now())
+
+        return HTTPStatus.OK, bytes(response)
+
+    @rest_app.route('/reencrypt', methods=["POST"])
+    def reencrypt():
+        status, body = handle_reencryption_request(request.data)
+        if status != HTTPStatus.OK:
+            return Response(response=body, status=status)
+        headers = {'Content-Type': 'application/octet-stream'}
+        return Response(headers=headers, response=body)
+
+    @rest_app.route('/reencrypt_batch', methods=["POST"])
+    def reencrypt_batch():
+        """
+        Handles several reencryption requests (e.g. for different policies) in one HTTP request.
+        The requests and their results are packed in batch envelopes (see ``nulink.network.protocols``);
+        each result carries the status and body that ``/reencrypt`` would have responded with.
+        """
+        try:
+            reencryption_requests = unpack_batch(request.data)
+        except ValueError as e:
+            return Response(str(e), status=HTTPStatus.BAD_REQUEST)
+        if len(reencryption_requests) > MAX_REENCRYPTION_BATCH_SIZE:
+            message = f"Too many reencryption requests: {len(reencryption_requests)} > {MAX_REENCRYPTION_BATCH_SIZE}"
+            return Response(message, status=HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        results = list()
+        for reencryption_request_bytes in reencryption_requests:
+            try:
+                result = handle_reencryption_request(reencryption_request_bytes)
+            except ValueError as e:
+                result = HTTPStatus.BAD_REQUEST, f"Invalid ReencryptionRequest: {e}".encode()
+            except Exception as e:
+                # One bad request doesn't fail the others
+                log.warn(f"Failed to handle a batched reencryption request: {e}")
+                result = HTTPStatus.INTERNAL_SERVER_ERROR, str(e).encode()
+            results.append(result)
 
         headers = {'Content-Type': 'application/octet-stream'}
-        return Response(headers=headers, response=bytes(response))
+        return Response(headers=headers, response=pack_batch_results(results))
 
     @rest_app.route('/revoke', methods=['POST'])
     def revoke():
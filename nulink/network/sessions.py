@@ -0,0 +1,171 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ssl
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nulink.network.certificates import PinnedCertificate
+
+
+class PinnedCertificateAdapter(HTTPAdapter):
+    """Verifies HTTPS connections with the prepared SSL context of a pinned certificate."""
+
+    def __init__(self, ssl_context: ssl.SSLContext, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        # The pinned certificate is already loaded into the SSL context;
+        # don't let requests point the connection at a certificate file or CA bundle instead.
+        conn.cert_reqs = 'CERT_REQUIRED'
+        conn.ca_certs = None
+        conn.ca_cert_dir = None
+
+
+class PeerSessionPool:
+    """
+    A bounded pool of keep-alive HTTPS sessions, one per peer (host, port and pinned certificate).
+
+    Consecutive requests to the same node reuse the connections of its session,
+    instead of paying for a new TCP and TLS handshake every time.
+    When the pool is full, the least recently used session is closed;
+    sessions that have been idle for longer than ``idle_timeout`` seconds are closed as well.
+
+    Exposes the HTTP verbs of the ``requests`` module, so it can be used in its place;
+    ``verify`` (the ``PinnedCertificate`` of the peer) is required for every request.
+    """
+
+    DEFAULT_MAX_SESSIONS = 100
+    DEFAULT_IDLE_TIMEOUT = 60  # seconds
+    DEFAULT_CONNECTIONS_PER_PEER = 10
+
+    def __init__(self,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 connections_per_peer: int = DEFAULT_CONNECTIONS_PER_PEER):
+        if max_sessions < 1:
+            raise ValueError(f"The session pool must hold at least one session, got {max_sessions}")
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.connections_per_peer = connections_per_peer
+
+        self._sessions = OrderedDict()  # {(host, port, certificate): (session, last used)}, least recently used first
+        self._lock = Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _make_session(self, certificate: PinnedCertificate) -> requests.Session:
+        session = requests.Session()
+        adapter = PinnedCertificateAdapter(ssl_context=certificate.ssl_context,
+                                           pool_connections=1,
+                                           pool_maxsize=self.connections_per_peer)
+        session.mount('https://', adapter)
+        return session
+
+    def _pop_idle_sessions(self, now: float) -> List[requests.Session]:
+        idle_sessions = []
+        while self._sessions:
+            key, (session, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_timeout:
+                break
+            del self._sessions[key]
+            idle_sessions.append(session)
+        return idle_sessions
+
+    def session(self, certificate: PinnedCertificate) -> requests.Session:
+        """Returns the session for the peer of the given certificate, creating it if there isn't one in the pool."""
+        key = (certificate.host, certificate.port, certificate.fingerprint)
+        now = time.monotonic()
+        with self._lock:
+            sessions_to_close = self._pop_idle_sessions(now)
+            try:
+                session, _last_used = self._sessions.pop(key)
+                self.hits += 1
+            except KeyError:
+                session = self._make_session(certificate)
+                self.misses += 1
+                while len(self._sessions) >= self.max_sessions:
+                    _key, (evicted_session, _last_used) = self._sessions.popitem(last=False)
+                    sessions_to_close.append(evicted_session)
+            self.evictions += len(sessions_to_close)
+            self._sessions[key] = (session, now)
+
+        # Requests that are still in flight on these sessions are allowed to finish.
+        for evicted_session in sessions_to_close:
+            evicted_session.close()
+
+        return session
+
+    def discard(self, host: str, port: int) -> None:
+        """Closes all the sessions with a peer, e.g. after its certificate has changed."""
+        with self._lock:
+            keys = [key for key in self._sessions if key[:2] == (host, int(port))]
+            sessions_to_close = [self._sessions.pop(key)[0] for key in keys]
+        for session in sessions_to_close:
+            session.close()
+
+    def close(self) -> None:
+        with self._lock:
+            sessions_to_close = [session for session, _last_used in self._sessions.values()]
+            self._sessions.clear()
+        for session in sessions_to_close:
+            session.close()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(sessions=len(self._sessions),
+                    hits=self.hits,
+                    misses=self.misses,
+                    evictions=self.evictions)
+
+    #
+    # requests API
+    #
+
+    def request(self, method: str, url: str, verify: PinnedCertificate, **kwargs) -> requests.Response:
+        session = self.session(certificate=verify)
+        return session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
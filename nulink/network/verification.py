@@ -0,0 +1,189 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import itertools
+from concurrent.futures import Future
+from queue import Empty, PriorityQueue
+from threading import Lock, Thread, current_thread
+from typing import Callable, Dict, Optional, Tuple
+
+from nulink.utilities.logging import Logger
+
+
+class NodeVerifier:
+    """
+    Verifies provisionally known nodes in the background, on a bounded number of threads.
+
+    Nodes are verified in the order they were submitted, except for the nodes that are
+    about to be used (see `prioritize`), which jump the queue.  Each node is verified once,
+    however many times it is submitted while it is waiting or being verified.
+    """
+
+    SAMPLED = 0  # priority of the nodes about to be used
+    PROVISIONAL = 1  # priority of the nodes restored from storage, seed nodes, etc.
+
+    DEFAULT_WORKERS = 8
+    IDLE_TIMEOUT = 5  # seconds before an idle worker thread exits
+
+    def __init__(self, verify: Callable[['Teacher'], bool], workers: int = DEFAULT_WORKERS):
+        if workers < 1:
+            raise ValueError(f"The node verifier needs at least one worker, got {workers}")
+        self.verify = verify  # verifies a node, returning whether it is valid
+        self.workers = workers
+        self.log = Logger(self.__class__.__name__)
+
+        self._queue = PriorityQueue()  # (priority, sequence, checksum address)
+        self._sequence = itertools.count()
+        self._pending = dict()  # {checksum address: (node, priority, Future)}
+        self._running = dict()  # {checksum address: Future}, for the nodes being verified
+        self._threads = []
+        self._lock = Lock()
+        self._stopped = False
+
+        # Metrics
+        self.verified = 0
+        self.failed = 0
+        self.prioritized = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, node: 'Teacher', priority: int = PROVISIONAL) -> Future:
+        """Schedules the verification of a node, and returns a future of its outcome."""
+        with self._lock:
+            return self._submit(node, priority)
+
+    def prioritize(self, node: 'Teacher') -> Optional[Future]:
+        """
+        Moves a node waiting for verification to the front of the queue, and returns a future of
+        its outcome; returns `None` if the node was neither waiting for verification nor being verified.
+        """
+        with self._lock:
+            try:
+                return self._running[node.checksum_address]
+            except KeyError:
+                pass
+            if node.checksum_address not in self._pending:
+                return None
+            self.prioritized += 1
+            return self._submit(node, priority=self.SAMPLED)
+
+    def wait_for(self, node: 'Teacher', timeout: Optional[float] = None) -> Optional[bool]:
+        """
+        Prioritizes the verification of a node and waits for its outcome, if it was waiting for
+        verification or being verified; returns `None` otherwise.
+        """
+        future = self.prioritize(node)
+        return future.result(timeout=timeout) if future is not None else None
+
+    def stop(self) -> None:
+        """
+        Stops verifying nodes; the verifications in progress are completed, and those
+        pending or submitted afterwards are cancelled.
+        """
+        with self._lock:
+            self._stopped = True
+            pending, self._pending = self._pending, dict()
+        for _, _, future in pending.values():
+            future.cancel()
+
+    def stats(self) -> Dict[str, float]:
+        return dict(pending=len(self._pending),
+                    verified=self.verified,
+                    failed=self.failed,
+                    prioritized=self.prioritized)
+
+    def _submit(self, node: 'Teacher', priority: int) -> Future:
+        # Called with the lock held
+        if self._stopped:
+            future = Future()
+            future.cancel()
+            return future
+        try:
+            return self._running[node.checksum_address]
+        except KeyError:
+            pass
+        try:
+            queued_node, queued_priority, future = self._pending[node.checksum_address]
+        except KeyError:
+            future = Future()
+        else:
+            if priority >= queued_priority:
+                return future
+        self._pending[node.checksum_address] = (node, priority, future)
+        self._queue.put((priority, next(self._sequence), node.checksum_address))
+        self._start_workers()
+        return future
+
+    def _start_workers(self) -> None:
+        # Called with the lock held
+        if self._stopped:
+            return
+        while len(self._threads) < min(self.workers, len(self._pending)):
+            thread = Thread(target=self._work, name=self.__class__.__name__, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_node(self) -> Optional[Tuple['Teacher', Future]]:
+        while True:
+            try:
+                priority, _, checksum_address = self._queue.get(timeout=self.IDLE_TIMEOUT)
+            except Empty:
+                with self._lock:
+                    # Submissions are queued with the lock held, so none can be missed here
+                    if self._queue.empty():
+                        self._threads.remove(current_thread())
+                        return None
+                continue
+            with self._lock:
+                if self._stopped:
+                    return None
+                try:
+                    node, pending_priority, future = self._pending[checksum_address]
+                except KeyError:
+                    continue  # already verified, or forgotten
+                if priority != pending_priority:
+                    continue  # superseded by a more urgent submission
+                del self._pending[checksum_address]
+                self._running[checksum_address] = future
+            if future.set_running_or_notify_cancel():
+                return node, future
+            with self._lock:
+                del self._running[checksum_address]
+
+    def _work(self) -> None:
+        while True:
+            next_node = self._next_node()
+            if next_node is None:
+                return
+            node, future = next_node
+            try:
+                valid = self.verify(node)
+            except Exception as e:
+                self.log.warn(f"Unhandled error while verifying {node}: {e}")
+                self.failed += 1
+                future.set_exception(e)
+            else:
+                if valid:
+                    self.verified += 1
+                else:
+                    self.failed += 1
+                future.set_result(valid)
+            finally:
+                # Only once the outcome is set, so that waiting for the node never misses it
+                with self._lock:
+                    del self._running[node.checksum_address]
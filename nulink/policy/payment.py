@@ -16,16 +16,23 @@
 """
 
 
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, NamedTuple, Dict
+from typing import Callable, Optional, NamedTuple, Dict
 
 import maya
 from nucypher_core import ReencryptionRequest
+from twisted.internet import threads
+from twisted.internet.defer import Deferred
+from twisted.python.failure import Failure
 from web3.types import Wei, Timestamp, TxReceipt, ChecksumAddress
 
 from nulink.blockchain.eth.agents import SubscriptionManagerAgent
+from nulink.blockchain.eth.events import ContractEventsThrottler
 from nulink.blockchain.eth.registry import InMemoryContractRegistry, BaseContractRegistry
 from nulink.policy.policies import BlockchainPolicy, Policy
+from nulink.utilities.cache import TTLCache
+from nulink.utilities.task import SimpleTask
 
 
 class ReencryptionPrerequisite(ABC):
@@ -152,15 +159,112 @@ class FreeReencryptions(PaymentMethod):
         return True
 
 
+class PolicyStatusCache:
+    """
+    Remembers whether policies are active, so that reencryption requests for a known policy
+    do not need a contract call.  Active policies are remembered for ``active_ttl`` seconds (or until they
+    expire, if sooner), inactive ones only for ``inactive_ttl`` seconds, since they may be paid for at any time.
+    """
+
+    DEFAULT_MAX_POLICIES = 10_000
+    DEFAULT_ACTIVE_TTL = 10 * 60  # seconds
+    DEFAULT_INACTIVE_TTL = 30  # seconds
+
+    def __init__(self,
+                 max_policies: int = DEFAULT_MAX_POLICIES,
+                 active_ttl: float = DEFAULT_ACTIVE_TTL,
+                 inactive_ttl: float = DEFAULT_INACTIVE_TTL,
+                 clock: Callable[[], float] = time.time):
+        self.active_ttl = active_ttl
+        self.inactive_ttl = inactive_ttl
+        self._clock = clock
+        self._statuses = TTLCache(max_entries=max_policies, ttl=active_ttl, clock=clock)
+
+    def get(self, policy_id: bytes) -> Optional[bool]:
+        """Returns the known status of a policy, or ``None`` if it must be read from the contract."""
+        return self._statuses.get(policy_id)
+
+    def record(self, policy_id: bytes, active: bool, end_timestamp: Optional[int] = None) -> None:
+        if not active:
+            self._statuses.put(policy_id, False, ttl=self.inactive_ttl)
+            return
+        ttl = self.active_ttl
+        if end_timestamp is not None:
+            ttl = min(ttl, end_timestamp - self._clock())
+        if ttl > 0:
+            self._statuses.put(policy_id, True, ttl=ttl)
+        else:
+            self._statuses.pop(policy_id)
+
+    def record_end_timestamp(self, policy_id: bytes, end_timestamp: int) -> bool:
+        """Records the status of a policy from its end timestamp (0 if unknown), and returns whether it is active."""
+        active = end_timestamp > self._clock()
+        self.record(policy_id=policy_id, active=active, end_timestamp=end_timestamp if active else None)
+        return active
+
+    def stats(self) -> Dict[str, float]:
+        return self._statuses.stats()
+
+
+class PolicyCreatedTracker(SimpleTask):
+    """Records the policies created on the SubscriptionManager contract as active, as soon as they are mined."""
+
+    INTERVAL = 15  # seconds
+
+    def __init__(self, payment_method: 'SubscriptionManagerPayment'):
+        self._payment_method = payment_method
+        self._last_block = None
+        super().__init__()
+
+    def run(self) -> Deferred:
+        return threads.deferToThread(self.track)
+
+    def track(self) -> None:
+        """Records the policies created since the last call."""
+        agent = self._payment_method.agent
+        latest_block = agent.blockchain.client.block_number
+        if self._last_block is None:
+            # Older policies are looked up on demand
+            self._last_block = latest_block
+            return
+        if latest_block <= self._last_block:
+            return
+
+        events = ContractEventsThrottler(agent=agent,
+                                         event_name='PolicyCreated',
+                                         from_block=self._last_block + 1,
+                                         to_block=latest_block)
+        for event in events:
+            self._payment_method.policy_statuses.record(policy_id=bytes(event.args['policyId']),
+                                                        active=True,
+                                                        end_timestamp=event.args['endTimestamp'])
+        self._last_block = latest_block
+
+    def handle_errors(self, failure: Failure) -> None:
+        cleaned_traceback = self.clean_traceback(failure)
+        self.log.warn(f"Unhandled error while tracking created policies: {cleaned_traceback}")
+        self.start(now=False)  # keep tracking; statuses fall back to contract calls meanwhile
+
+
 class SubscriptionManagerPayment(ContractPayment):
     """Handle policy payment using the SubscriptionManager contract."""
 
     _AGENT = SubscriptionManagerAgent
     NAME = 'SubscriptionManager'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.policy_statuses = PolicyStatusCache()
+        self.policy_tracker = PolicyCreatedTracker(payment_method=self)
+
     def verify(self, payee: ChecksumAddress, request: ReencryptionRequest) -> bool:
-        """Verify policy payment by reading the SubscriptionManager contract"""
-        result = self.agent.is_policy_active(policy_id=bytes(request.hrac))
+        """Verify policy payment by reading the SubscriptionManager contract, unless the policy status is cached"""
+        policy_id = bytes(request.hrac)
+        result = self.policy_statuses.get(policy_id)
+        if result is None:
+            # A single call for both the status and the expiration, not to remember the policy as active past it
+            policy = self.agent.fetch_policy(policy_id=policy_id)
+            result = self.policy_statuses.record_end_timestamp(policy_id=policy_id, end_timestamp=policy.end_timestamp)
         return result
 
     def pay(self, policy: BlockchainPolicy) -> TxReceipt:
@@ -101,19 +101,28 @@ class Policy(ABC):
         receipt = self.payment_method.pay(policy=self)
         return receipt
 
-    def _ping_node(self, address: ChecksumAddress, network_middleware: RestMiddleware) -> 'Ursula':
+    def _ping_node(self,
+                   address: ChecksumAddress,
+                   network_middleware: RestMiddleware,
+                   timeout: Optional[float] = None
+                   ) -> 'Ursula':
         # Handles edge case when provided address is not a known peer.
         if address not in self.publisher.known_nodes:
             raise RuntimeError(f"{address} is not a known peer")
 
         ursula = self.publisher.known_nodes[address]
-        response = network_middleware.ping(node=ursula)
-        status_code = response.status_code
-
-        if status_code == 200:
-            return ursula
-        else:
-            raise RuntimeError(f"{ursula} is not available for selection ({status_code}).")
+        try:
+            self.publisher.verify_sampled_node(ursula, timeout=timeout)
+        except ursula.VerificationTimedOut as e:
+            raise RestMiddleware.Unreachable(message=f"{ursula} is unreachable: {e}")
+        with self.publisher.node_performance.measure(address):
+            response = network_middleware.ping(node=ursula)
+            status_code = response.status_code
+
+            if status_code == 200:
+                return ursula
+            else:
+                raise RuntimeError(f"{ursula} is not available for selection ({status_code}).")
 
     def get_enough_ursulas(self, worker_pool: WorkerPool) -> Dict[ChecksumAddress, 'Ursula']:
         from nulink.utilities.porter.porter import Porter
@@ -155,10 +164,12 @@ class Policy(ABC):
         self.publisher.block_until_number_of_known_nodes_is(self.shares, learn_on_this_thread=True, eager=True)
         # 获取 active stakers
         reservoir = self._make_reservoir(handpicked_addresses)
-        value_factory = PrefetchStrategy(reservoir, self.shares)
+        # Among the sampled nodes, the ones that were fast and reliable so far are pinged first
+        value_factory = PrefetchStrategy(reservoir, self.shares, rank=self.publisher.node_performance.rank)
 
         def worker(address) -> 'Ursula':
-            return self._ping_node(address, network_middleware)
+            # Waiting for a node's verification does not hold up the sampling past its timeout
+            return self._ping_node(address, network_middleware, timeout=timeout)
 
         worker_pool = WorkerPool(
             worker=worker,
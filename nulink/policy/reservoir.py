@@ -16,12 +16,13 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 
-from typing import Iterable, List, Optional
+from typing import Callable, Iterable, List, Optional
 
 from eth_typing import ChecksumAddress
 
 from nulink.acumen.perception import FleetSensor
 from nulink.blockchain.eth.agents import StakingProvidersReservoir, PREApplicationAgent
+from nulink.blockchain.eth.staking import StakingStatusCache
 
 
 def make_federated_staker_reservoir(known_nodes: FleetSensor,
@@ -53,7 +54,12 @@ def make_decentralized_staking_provider_reservoir(application_agent: PREApplicat
     include_addresses = include_addresses or ()
     without_set = set(include_addresses) | set(exclude_addresses or ())
     try:
-        reservoir = application_agent.get_staking_provider_reservoir(without=without_set, pagination_size=pagination_size)
+        if pagination_size is None:
+            # From the snapshot of the active staking providers shared by the process, read anew once stale
+            staking_statuses = StakingStatusCache.for_registry(registry=application_agent.registry)
+            reservoir = staking_statuses.get_staking_provider_reservoir(without=without_set)
+        else:
+            reservoir = application_agent.get_staking_provider_reservoir(without=without_set, pagination_size=pagination_size)
     except PREApplicationAgent.NotEnoughStakingProviders:
         # TODO: do that in `get_staking_provider_reservoir()`?
         reservoir = StakingProvidersReservoir({})
@@ -87,19 +93,60 @@ class PrefetchStrategy:
     Encapsulates the batch draw strategy from a reservoir.
     Determines how many values to draw based on the number of values
     that have already led to successes.
+
+    With a ``rank`` function, each batch drawn from the staking providers reservoir is handed out
+    in the order of ``rank``, which leaves the stake-weighted sample unchanged.  Handpicked values
+    are always handed out first.
+
+    A ``lookahead`` above 1 draws that many times as many values as needed, hands out the best ranked
+    ones, and keeps the others for the next batches.  This changes the sample: nodes ranked well are
+    picked more often than their stake warrants, and nodes ranked badly less often.
     """
 
-    def __init__(self, reservoir: MergedReservoir, need_successes: int):
+    DEFAULT_LOOKAHEAD = 1
+
+    def __init__(self,
+                 reservoir: MergedReservoir,
+                 need_successes: int,
+                 rank: Optional[Callable[[List[ChecksumAddress]], List[ChecksumAddress]]] = None,
+                 lookahead: int = DEFAULT_LOOKAHEAD):
+        if lookahead < 1:
+            raise ValueError(f"Lookahead must be at least 1, got {lookahead}")
         self.reservoir = reservoir
         self.need_successes = need_successes
+        self.rank = rank
+        self.lookahead = lookahead
+        self._standby = []  # drawn, but not handed out yet
 
     def __call__(self, successes: int) -> Optional[List[ChecksumAddress]]:
+        quantity = self.need_successes - successes
+        if self.rank is None:
+            batch = self._draw(quantity)
+        else:
+            batch = self._draw_ranked(quantity)
+        if not batch:
+            return None
+        return batch
+
+    def _draw(self, quantity: int) -> List[ChecksumAddress]:
         batch = []
-        for i in range(self.need_successes - successes):
+        for i in range(quantity):
             value = self.reservoir()
             if value is None:
                 break
             batch.append(value)
-        if not batch:
-            return None
+        return batch
+
+    def _draw_ranked(self, quantity: int) -> List[ChecksumAddress]:
+        batch = []
+        while len(batch) < quantity and self.reservoir.values:
+            batch.append(self.reservoir())
+        quantity -= len(batch)
+        if quantity <= 0:
+            return batch
+
+        self._standby.extend(self._draw(self.lookahead * quantity - len(self._standby)))
+        self._standby = self.rank(self._standby)
+        batch.extend(self._standby[:quantity])
+        del self._standby[:quantity]
         return batch
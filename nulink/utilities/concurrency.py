@@ -15,17 +15,24 @@ You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import heapq
 import io
+import itertools
+import os
 import sys
+import time
 import traceback
-from queue import Queue
-from threading import Thread, Event, Lock
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread, Event, Lock, local
 from typing import Callable, List, Any, Optional, Dict
 
 from constant_sorrow.constants import PRODUCER_STOPPED, TIMEOUT_TRIGGERED
-from twisted.python.threadpool import ThreadPool
 from nucypher_core.umbral import PublicKey
 
+from nulink.config.constants import NULINK_ENVVAR_WORKER_THREADS
+from nulink.utilities.logging import Logger
+
 
 class Success:
     def __init__(self, value, result):
@@ -39,10 +46,6 @@ class Failure:
         self.exc_info = exc_info
 
 
-class Cancelled(Exception):
-    pass
-
-
 class FutureResult:
 
     def __init__(self, value=None, exc_info=None):
@@ -115,14 +118,179 @@ class WorkerPoolException(Exception):
         return exc_tracebacks
 
 
+class AllAtOnceFactory:
+    """
+    A value factory that returns all its values in a single batch.
+    """
+
+    def __init__(self, values):
+        self.values = values
+        self._produced = False
+
+    def __call__(self, _successes):
+        if self._produced:
+            return None
+        else:
+            self._produced = True
+            return self.values
+
+
+class ScheduledCall:
+    """A handle on a call scheduled with `WorkerExecutor.call_later`."""
+
+    __slots__ = ('function', '_executor')
+
+    def __init__(self, function: Callable, executor: 'WorkerExecutor'):
+        self.function = function
+        self._executor = executor
+
+    @property
+    def cancelled(self) -> bool:
+        return self.function is None
+
+    def cancel(self) -> None:
+        """Prevents the call, and releases the function right away.  Does nothing if it ran already."""
+        self._executor._cancel(self)
+
+
+class WorkerExecutor:
+    """
+    A long-lived executor shared by the worker pools of the process: it runs their workers
+    on a bounded number of reused threads, and their timeouts and staggered value production
+    on a single scheduler thread.
+
+    A worker must not wait for other tasks of the executor it runs on: with all the threads taken
+    by such workers, the tasks they wait for would never start.  `WorkerPool` guards against this
+    by giving the pools started by a worker an executor of their own (see `current`).
+    """
+
+    DEFAULT_MAX_THREADS = int(os.environ.get(NULINK_ENVVAR_WORKER_THREADS, default=64))
+
+    __shared = None
+    __shared_lock = Lock()
+    __local = local()
+
+    @classmethod
+    def shared(cls) -> 'WorkerExecutor':
+        with cls.__shared_lock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+            return cls.__shared
+
+    @classmethod
+    def current(cls) -> Optional['WorkerExecutor']:
+        """The executor running the current thread's task, if it is one of the threads of an executor."""
+        return getattr(cls.__local, 'executor', None)
+
+    def __init__(self, max_threads: int = DEFAULT_MAX_THREADS):
+        if max_threads < 1:
+            raise ValueError(f"The executor needs at least one thread, got {max_threads}")
+        self.max_threads = max_threads
+        self.log = Logger(self.__class__.__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix=self.__class__.__name__)
+
+        self._timers = []  # heap of (deadline, sequence, ScheduledCall)
+        self._cancelled_timers = 0
+        self._sequence = itertools.count()
+        self._condition = Condition()
+        self._scheduler_thread = None
+        self._shut_down = False
+
+        # Metrics
+        self.submitted = 0
+        self.running = 0
+
+    def submit(self, function: Callable, *args) -> None:
+        """Runs a function on one of the threads, as soon as one is available."""
+        self.submitted += 1
+        self._executor.submit(self._run, function, *args)
+
+    def call_later(self, delay: float, function: Callable) -> ScheduledCall:
+        """Runs a (quick) function on the scheduler thread, after ``delay`` seconds, unless cancelled."""
+        call = ScheduledCall(function=function, executor=self)
+        with self._condition:
+            deadline = time.monotonic() + delay
+            heapq.heappush(self._timers, (deadline, next(self._sequence), call))
+            if self._scheduler_thread is None:
+                self._scheduler_thread = Thread(target=self._schedule, name=f'{self.__class__.__name__}Scheduler', daemon=True)
+                self._scheduler_thread.start()
+            self._condition.notify()
+        return call
+
+    def shutdown(self) -> None:
+        """Lets the threads exit once their tasks are done, and drops the scheduled calls."""
+        self._executor.shutdown(wait=False)
+        with self._condition:
+            self._shut_down = True
+            self._timers.clear()
+            self._cancelled_timers = 0
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._condition:
+            timers = len(self._timers) - self._cancelled_timers
+        return dict(submitted=self.submitted, running=self.running, timers=timers)
+
+    def _cancel(self, call: ScheduledCall) -> None:
+        with self._condition:
+            if call.function is None:
+                return  # ran, or cancelled already
+            call.function = None
+            self._cancelled_timers += 1
+            # Cancelled calls are dropped when due; compact the heap if they are most of it
+            if self._cancelled_timers > len(self._timers) // 2:
+                self._timers = [timer for timer in self._timers if not timer[2].cancelled]
+                heapq.heapify(self._timers)
+                self._cancelled_timers = 0
+
+    def _run(self, function: Callable, *args) -> None:
+        self.running += 1
+        previous, self.__local.executor = self.current(), self
+        try:
+            function(*args)
+        finally:
+            self.__local.executor = previous
+            self.running -= 1
+
+    def _schedule(self) -> None:
+        while True:
+            with self._condition:
+                while not self._shut_down and (not self._timers or self._timers[0][0] > time.monotonic()):
+                    self._condition.wait(timeout=self._timers[0][0] - time.monotonic() if self._timers else None)
+                if self._shut_down:
+                    return
+                _deadline, _sequence, call = heapq.heappop(self._timers)
+                function, call.function = call.function, None
+                if function is None:
+                    self._cancelled_timers -= 1
+                    continue
+            try:
+                function()
+            except Exception as e:
+                self.log.warn(f"Unhandled error in a scheduled worker pool call: {e}")
+
+
 class WorkerPool:
     """
     A generalized class that can start multiple workers in a thread pool with values
     drawn from the given value factory object,
     and wait for their completion and a given number of successes
     (a worker returning something without throwing an exception).
+
+    The workers run on the threads of a shared `WorkerExecutor`, at most ``threadpool_size``
+    of them at a time; the value factory is called from `start()`, then from the executor's scheduler
+    thread every ``stagger_timeout`` seconds, so it must not block.  A pool created by a worker
+    (of this or another pool) runs on an executor of its own instead, so that nested pools cannot deadlock
+    waiting for each other's threads.
+
+    The factory returns ``None`` once out of values.  Note that with a ``stagger_timeout``, an empty batch
+    means there is nothing to add until the next call, and no longer that the factory is out of values:
+    factories that may run out must return ``None``.  Without a ``stagger_timeout``, an empty batch
+    still stops the production of values.
     """
 
+    DEFAULT_THREADPOOL_SIZE = 20
+
     class TimedOut(WorkerPoolException):
         """Raised if waiting for the target number of successes timed out."""
 
@@ -144,7 +312,8 @@ class WorkerPool:
                  target_successes: int,
                  timeout: float,
                  stagger_timeout: float = 0,
-                 threadpool_size: int = None):
+                 threadpool_size: int = None,
+                 executor: WorkerExecutor = None):
 
         # TODO: make stagger_timeout a part of the value factory?
 
@@ -153,56 +322,50 @@ class WorkerPool:
         self._timeout = timeout
         self._stagger_timeout = stagger_timeout
         self._target_successes = target_successes
-
-        thread_pool_kwargs = {}
-        if threadpool_size is not None:
-            thread_pool_kwargs['minthreads'] = threadpool_size
-            thread_pool_kwargs['maxthreads'] = threadpool_size
-        self._threadpool = ThreadPool(**thread_pool_kwargs)
-
-        # These three tasks must be run in separate threads
-        # to avoid being blocked by workers in the thread pool.
-        self._bail_on_timeout_thread = Thread(target=self._bail_on_timeout)
-        self._produce_values_thread = Thread(target=self._produce_values)
-        self._process_results_thread = Thread(target=self._process_results)
+        self._max_running = threadpool_size or self.DEFAULT_THREADPOOL_SIZE
+        self._executor = executor or WorkerExecutor.shared()
+        self._owns_executor = WorkerExecutor.current() is not None
+        if self._owns_executor:
+            # Waiting for the workers of this pool would hold a thread their tasks may need
+            self._executor = WorkerExecutor(max_threads=self._max_running)
 
         self._successes = {}
         self._failures = {}
+        self._pending = deque()  # values waiting for a thread
+        self._running_tasks = 0
         self._started_tasks = 0
         self._finished_tasks = 0
+        self._started = False
+        self._producer_stopped = False
 
+        self._timeout_call = None  # type: Optional[ScheduledCall]
         self._cancel_event = Event()
-        self._result_queue = Queue()
+        self._done_event = Event()
         self._target_value = Future()
         self._producer_error = Future()
         self._results_lock = Lock()
-        self._threadpool_stop_lock = Lock()
-        self._threadpool_stopped = False
 
     def start(self):
-        # TODO: check if already started?
-        self._threadpool.start()
-        self._produce_values_thread.start()
-        self._process_results_thread.start()
-        self._bail_on_timeout_thread.start()
+        with self._results_lock:
+            if self._started:
+                return
+            self._started = True
+        self._timeout_call = self._executor.call_later(self._timeout, self._bail_on_timeout)
+        self._produce_values()
 
     def cancel(self):
         """
-        Cancels the tasks enqueued in the thread pool and stops the producer thread.
+        Cancels the tasks waiting for a thread and stops the production of values.
         """
         self._cancel_event.set()
-
-    def _stop_threadpool(self):
-        # This can be called from multiple threads
-        # (`join()` itself can be called from multiple threads,
-        # and we also attempt to stop the pool from the `_process_results()` thread).
-        with self._threadpool_stop_lock:
-            if not self._threadpool_stopped:
-                self._threadpool.stop()
-                self._threadpool_stopped = True
+        with self._results_lock:
+            self._producer_stopped = True
+            self._finished_tasks += len(self._pending)
+            self._pending.clear()
+        self._check_if_done()
 
     def _check_for_producer_error(self):
-        # Check for any unexpected exceptions in the producer thread
+        # Check for any unexpected exceptions in the value factory
         if self._producer_error.is_set():
             # Will raise if Future was set with an exception
             self._producer_error.get()
@@ -212,27 +375,12 @@ class WorkerPool:
 
     def join(self):
         """
-        Waits for all the threads to finish.
+        Waits for the production of values to stop and for all the started workers to finish.
         Can be called several times.
         """
-        self._produce_values_thread.join()
-        self._process_results_thread.join()
-        self._bail_on_timeout_thread.join()
-
-        # In most cases `_threadpool` will be stopped by the `_process_results()` thread.
-        # But in case there's some unexpected bug in its code, we're making sure the pool is stopped
-        # to avoid the whole process hanging.
-        self._stop_threadpool()
-
+        self._done_event.wait()
         self._check_for_producer_error()
 
-    def _sleep(self, timeout):
-        """
-        Sleeps for a given timeout, can be interrupted by a cancellation event.
-        """
-        if self._cancel_event.wait(timeout):
-            raise Cancelled
-
     def block_until_target_successes(self) -> Dict:
         """
         Blocks until the target number of successes is reached.
@@ -266,91 +414,91 @@ class WorkerPool:
 
     def _bail_on_timeout(self):
         """
-        A service thread that cancels the pool on timeout.
+        Cancels the pool on timeout, unless it is done already.
         """
-        if not self._cancel_event.wait(timeout=self._timeout):
+        if not self._cancel_event.is_set():
             self._target_value.set(TIMEOUT_TRIGGERED)
-        self._cancel_event.set()
+        self.cancel()
 
-    def _worker_wrapper(self, value):
+    def _run_pending(self):
         """
-        A wrapper that catches exceptions thrown by the worker
-        and sends the results to the processing thread.
+        Hands the values waiting for a thread to the executor, up to the size of the pool.
         """
-        try:
-            # If we're in the cancelled state, interrupt early
-            self._sleep(0)
-
-            result = self._worker(value)
-            self._result_queue.put(Success(value, result))
-        except Cancelled as e:
-            self._result_queue.put(e)
-        except BaseException as e:
-            self._result_queue.put(Failure(value, sys.exc_info()))
+        while True:
+            with self._results_lock:
+                if not self._pending or self._running_tasks >= self._max_running:
+                    return
+                value = self._pending.popleft()
+                self._running_tasks += 1
+            self._executor.submit(self._worker_wrapper, value)
 
-    def _process_results(self):
+    def _worker_wrapper(self, value):
         """
-        A service thread that processes worker results
-        and waits for the target number of successes to be reached.
+        A wrapper that catches exceptions thrown by the worker and processes the results.
         """
-        producer_stopped = False
-        success_event_reached = False
-        while True:
-            result = self._result_queue.get()
-
-            if result == PRODUCER_STOPPED:
-                producer_stopped = True
-            else:
-                self._finished_tasks += 1
-                if isinstance(result, Success):
-                    with self._results_lock:
-                        self._successes[result.value] = result.result
-                        len_successes = len(self._successes)
-                    if not success_event_reached and len_successes == self._target_successes:
-                        # A protection for the case of repeating values.
-                        # Only trigger the target value once.
-                        success_event_reached = True
-                        self._target_value.set(self.get_successes())
-                if isinstance(result, Failure):
-                    with self._results_lock:
-                        self._failures[result.value] = result.exc_info
-
-            if success_event_reached:
-                # no need to continue processing results
-                self.cancel()  # to cancel the timeout thread
-                break
+        result = None
+        try:
+            # If we're in the cancelled state, interrupt early
+            if not self._cancel_event.is_set():
+                result = Success(value, self._worker(value))
+        except BaseException:
+            result = Failure(value, sys.exc_info())
 
-            if producer_stopped and self._finished_tasks == self._started_tasks:
-                self.cancel()  # to cancel the timeout thread
-                self._target_value.set(PRODUCER_STOPPED)
-                break
+        target_reached = False
+        with self._results_lock:
+            self._running_tasks -= 1
+            self._finished_tasks += 1
+            if isinstance(result, Success):
+                self._successes[result.value] = result.result
+                # A protection for the case of repeating values: only trigger the target value once.
+                target_reached = len(self._successes) == self._target_successes
+            elif isinstance(result, Failure):
+                self._failures[result.value] = result.exc_info
+
+        if target_reached:
+            self._target_value.set(self.get_successes())
+            self.cancel()  # no need to start more workers
+        else:
+            self._run_pending()
+            self._check_if_done()
 
-        self._stop_threadpool()
+    def _check_if_done(self):
+        with self._results_lock:
+            done = self._producer_stopped and self._finished_tasks == self._started_tasks
+        if done:
+            self._cancel_event.set()
+            if self._timeout_call is not None:
+                self._timeout_call.cancel()  # so that the executor does not keep the pool until the timeout
+            if self._owns_executor:
+                self._executor.shutdown()
+            self._target_value.set(PRODUCER_STOPPED)  # ignored if the target was reached, or timed out
+            self._done_event.set()
+
+    def _stop_producing(self):
+        with self._results_lock:
+            self._producer_stopped = True
+        self._check_if_done()
 
     def _produce_values(self):
-        while True:
+        while not self._cancel_event.is_set():
             try:
-                with self._results_lock:
-                    len_successes = len(self._successes)
-                batch = self._value_factory(len_successes)
-                if not batch:
-                    break
-
-                self._started_tasks += len(batch)
-                for value in batch:
-                    # There is a possible race between `callInThread()` and `stop()`,
-                    # But we never execute them at the same time,
-                    # because `join()` checks that the producer thread is stopped.
-                    self._threadpool.callInThread(self._worker_wrapper, value)
-
-                self._sleep(self._stagger_timeout)
-
-            except Cancelled:
-                break
-
+                batch = self._value_factory(len(self.get_successes()))
             except BaseException:
                 self._producer_error.set_exception()
                 self.cancel()
+                return
+            if batch is None or (not batch and not self._stagger_timeout):
                 break
 
-        self._result_queue.put(PRODUCER_STOPPED)
+            with self._results_lock:
+                if self._producer_stopped:
+                    return  # cancelled meanwhile
+                self._started_tasks += len(batch)
+                self._pending.extend(batch)
+            self._run_pending()
+
+            if self._stagger_timeout:
+                self._executor.call_later(self._stagger_timeout, self._produce_values)
+                return
+
+        self._stop_producing()
@@ -29,6 +29,7 @@ from nucypher_core.umbral import PublicKey
 from nulink.blockchain.eth.agents import ContractAgency, PREApplicationAgent
 from nulink.blockchain.eth.interfaces import BlockchainInterfaceFactory
 from nulink.blockchain.eth.registry import BaseContractRegistry, InMemoryContractRegistry
+from nulink.blockchain.eth.staking import StakingSnapshotTracker, StakingStatusCache
 from nulink.characters.lawful import Ursula
 from nulink.cli.utils import random_dic
 from nulink.control.controllers import JSONRPCController, WebController
@@ -123,6 +124,8 @@ the Pipe for PRE Application network operations
                  node_class: object = Ursula,
                  eth_provider_uri: str = None,
                  execution_timeout: int = DEFAULT_EXECUTION_TIMEOUT,
+                 lazy_verification: bool = True,
+                 staking_snapshot_interval: float = StakingSnapshotTracker.INTERVAL,
                  *args, **kwargs):
         self.federated_only = federated_only
 
@@ -139,11 +142,23 @@ the Pipe for PRE Application network operations
             self.registry = NO_BLOCKCHAIN_CONNECTION.bool_value(False)
             node_class.set_federated_mode(federated_only)
 
-        super().__init__(save_metadata=True, domain=domain, node_class=node_class, *args, **kwargs)
+        super().__init__(save_metadata=True,
+                         domain=domain,
+                         node_class=node_class,
+                         lazy_verification=lazy_verification,
+                         *args, **kwargs)
 
         self.log = Logger(self.__class__.__name__)
         self.execution_timeout = execution_timeout
 
+        # Sampling staking providers uses a snapshot of the active ones, refreshed in the background
+        self.staking_snapshot_tracker = None
+        if not self.federated_only:
+            staking_statuses = StakingStatusCache.for_registry(registry=self.registry)
+            self.staking_snapshot_tracker = StakingSnapshotTracker(staking_statuses=staking_statuses,
+                                                                   interval=staking_snapshot_interval)
+            self.staking_snapshot_tracker.start(now=True)
+
         # Controller Interface
         self.interface = self._interface_class(porter=self)
         self.controller = NO_CONTROL_PROTOCOL
@@ -218,7 +233,7 @@ the Pipe for PRE Application network operations
         # return list(ursulas_info)
 
         reservoir = self._make_reservoir(quantity, exclude_ursulas, include_ursulas)
-        value_factory = PrefetchStrategy(reservoir, quantity)
+        value_factory = PrefetchStrategy(reservoir, quantity, rank=self.node_performance.rank)
 
         def get_ursula_info(ursula_address) -> Porter.UrsulaInfo:
             if to_checksum_address(ursula_address) not in self.known_nodes:
@@ -227,8 +242,10 @@ the Pipe for PRE Application network operations
             ursula_address = to_checksum_address(ursula_address)
             ursula = self.known_nodes[ursula_address]
             try:
-                # ensure node is up and reachable
-                self.network_middleware.ping(ursula)
+                # ensure node is valid, up and reachable
+                self.verify_sampled_node(ursula, timeout=self.execution_timeout)
+                with self.node_performance.measure(ursula_address):
+                    self.network_middleware.ping(ursula)
                 return Porter.UrsulaInfo(checksum_address=ursula_address,
                                          uri=f"{ursula.rest_interface.formal_uri}",
                                          encrypting_key=ursula.public_keys(DecryptingPower))
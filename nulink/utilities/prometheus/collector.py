@@ -32,9 +32,9 @@ from nulink.blockchain.eth.actors import NulinkTokenActor
 from nulink.blockchain.eth.agents import ContractAgency, PREApplicationAgent, EthereumContractAgent
 from nulink.blockchain.eth.interfaces import BlockchainInterfaceFactory
 from nulink.blockchain.eth.registry import BaseContractRegistry
-from nulink.datastore.queries import get_reencryption_requests
+from nulink.datastore.queries import count_reencryption_requests
 
-from typing import Dict, Type
+from typing import Callable, Dict, Type
 
 
 class MetricsCollector(ABC):
@@ -128,8 +128,7 @@ class UrsulaInfoMetricsCollector(BaseMetricsCollector):
 
         # TODO (#2797): for now we leave a terminology discrepancy here, for backward compatibility reasons.
         # Update "work orders" to "reencryption requests" when possible.
-        reencryption_requests = get_reencryption_requests(self.ursula.datastore)
-        self.metrics["work_orders_gauge"].set(len(reencryption_requests))
+        self.metrics["work_orders_gauge"].set(count_reencryption_requests(self.ursula.datastore))
 
         if not self.ursula.federated_only:
             application_agent = ContractAgency.get_agent(PREApplicationAgent, registry=self.ursula.registry)
@@ -145,6 +144,30 @@ class UrsulaInfoMetricsCollector(BaseMetricsCollector):
         self.metrics["host_info"].info(base_payload)
 
 
+class StatsMetricsCollector(BaseMetricsCollector):
+    """
+    Collector for the counters of an internal component (a pool, a cache, a queue, etc.),
+    exported as gauges named ``<metrics prefix>_<component>_<counter>``.
+    """
+    def __init__(self, component: str, description: str, get_stats: Callable[[], Dict[str, float]]):
+        super().__init__()
+        self.component = component
+        self.description = description
+        self.get_stats = get_stats
+
+    def initialize(self, metrics_prefix: str, registry: CollectorRegistry) -> None:
+        self.metrics = {
+            name: Gauge(f'{metrics_prefix}_{self.component}_{name}',
+                        f'{self.description} ({name})',
+                        registry=registry)
+            for name in self.get_stats()
+        }
+
+    def _collect_internal(self) -> None:
+        for name, value in self.get_stats().items():
+            self.metrics[name].set(value)
+
+
 class BlockchainMetricsCollector(BaseMetricsCollector):
     """Collector for Blockchain specific metrics."""
     def __init__(self, eth_provider_uri: str):
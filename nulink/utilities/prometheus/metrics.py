@@ -30,9 +30,13 @@ except ImportError:
 
 import json
 
+from nulink.blockchain.eth.staking import StakingStatusCache
+from nulink.policy.payment import SubscriptionManagerPayment
+from nulink.utilities.concurrency import WorkerExecutor
 from nulink.utilities.prometheus.collector import (
     MetricsCollector,
     UrsulaInfoMetricsCollector,
+    StatsMetricsCollector,
     BlockchainMetricsCollector,
     StakerMetricsCollector,
     OperatorMetricsCollector,
@@ -178,6 +182,41 @@ def create_metrics_collectors(ursula: 'Ursula', metrics_prefix: str) -> List[Met
     """Create collectors used to obtain metrics."""
     collectors: List[MetricsCollector] = [UrsulaInfoMetricsCollector(ursula=ursula)]
 
+    # Connections to other nodes
+    collectors.append(StatsMetricsCollector(component='peer_sessions',
+                                            description='Keep-alive HTTPS sessions with other nodes',
+                                            get_stats=ursula.network_middleware.client.session_pool.stats))
+    collectors.append(StatsMetricsCollector(component='pinned_certificates',
+                                            description='TLS certificates of other nodes cached in memory',
+                                            get_stats=ursula.network_middleware.client.certificates.stats))
+
+    # Reencryption
+    collectors.append(StatsMetricsCollector(component='kfrag_cache',
+                                            description='Verified kfrags cached for repeated reencryption requests',
+                                            get_stats=ursula.kfrag_cache.stats))
+    collectors.append(StatsMetricsCollector(component='reencryption_engine',
+                                            description='Capsules re-encrypted inline or in the worker pool',
+                                            get_stats=ursula.reencryption_engine.stats))
+    collectors.append(StatsMetricsCollector(component='reencryption_audit_log',
+                                            description='Reencryption requests queued and written to the datastore',
+                                            get_stats=ursula.audit_log.stats))
+    collectors.append(StatsMetricsCollector(component='datastore_sweeper',
+                                            description='Expired records deleted from the datastore',
+                                            get_stats=ursula.datastore_sweeper.stats))
+    collectors.append(StatsMetricsCollector(component='node_verifier',
+                                            description='Known nodes verified in the background',
+                                            get_stats=ursula.node_verifier.stats))
+    collectors.append(StatsMetricsCollector(component='node_performance',
+                                            description='Nodes with a recorded request latency and error rate',
+                                            get_stats=ursula.node_performance.stats))
+    collectors.append(StatsMetricsCollector(component='worker_executor',
+                                            description='Worker pool tasks run on the shared executor',
+                                            get_stats=WorkerExecutor.shared().stats))
+    if isinstance(ursula.payment_method, SubscriptionManagerPayment):
+        collectors.append(StatsMetricsCollector(component='policy_statuses',
+                                                description='Policy payment statuses cached instead of read on-chain',
+                                                get_stats=ursula.payment_method.policy_statuses.stats))
+
     if not ursula.federated_only:
         # Blockchain prometheus
         collectors.append(BlockchainMetricsCollector(eth_provider_uri=ursula.eth_provider_uri))
@@ -191,6 +230,9 @@ def create_metrics_collectors(ursula: 'Ursula', metrics_prefix: str) -> List[Met
         collectors.append(OperatorMetricsCollector(domain=ursula.domain,
                                                  operator_address=ursula.operator_address,
                                                  contract_registry=ursula.registry))
+        collectors.append(StatsMetricsCollector(component='staking_statuses',
+                                                description='Staking and bonding statuses cached for node validation',
+                                                get_stats=StakingStatusCache.for_registry(registry=ursula.registry).stats))
 
         #
         # Events
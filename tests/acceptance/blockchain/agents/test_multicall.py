@@ -0,0 +1,115 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+
+import pytest
+from eth_utils import to_checksum_address
+
+from nulink.blockchain.eth.agents import ContractAgency, NulinkTokenAgent, PREApplicationAgent
+from nulink.blockchain.eth.constants import NULL_ADDRESS
+from nulink.blockchain.eth.multicall import ContractCallBatcher
+
+
+@pytest.fixture(scope='module')
+def multicall(testerchain, deploy_contract):
+    contract, _ = deploy_contract('MulticallMock')
+    return contract
+
+
+@pytest.fixture(params=['multicall', 'one by one'])
+def batcher(request, testerchain, multicall):
+    if request.param == 'multicall':
+        batcher = ContractCallBatcher(blockchain=testerchain, multicall_address=multicall.address, batch_size=3)
+        assert batcher.multicall is not None
+    else:
+        # There is no Multicall3 on the test chain, nor JSON-RPC batches with eth-tester
+        batcher = ContractCallBatcher(blockchain=testerchain, batch_size=3)
+        assert batcher.multicall is None
+    return batcher
+
+
+def test_batched_calls_match_single_calls(agency, test_registry, testerchain, batcher):
+    token_agent = ContractAgency.get_agent(NulinkTokenAgent, registry=test_registry)
+    application_agent = ContractAgency.get_agent(PREApplicationAgent, registry=test_registry)
+    accounts = testerchain.client.accounts[:7]
+
+    # Calls to several contracts, in several batches
+    functions = [token_agent.contract.functions.balanceOf(account) for account in accounts]
+    functions.append(application_agent.contract.functions.stakingProviderFromOperator(accounts[0]))
+    results = batcher.call(functions)
+    assert results[:-1] == [token_agent.get_balance(account) for account in accounts]
+    assert results[-1] == application_agent.get_staking_provider_from_operator(operator_address=accounts[0])
+    assert batcher.stats()['calls'] == len(functions)
+    if batcher.multicall is not None:
+        assert batcher.stats()['requests'] == 3
+
+
+def test_batched_call_failures(agency, test_registry, batcher):
+    application_agent = ContractAgency.get_agent(PREApplicationAgent, registry=test_registry)
+    population = application_agent.get_staking_providers_population()
+    functions = [application_agent.contract.functions.stakingProviders(0),
+                 application_agent.contract.functions.stakingProviders(population)]  # out of bounds
+
+    with pytest.raises(ContractCallBatcher.CallFailed):
+        batcher.call(functions)
+    first_provider, missing_provider = batcher.call(functions, allow_failure=True)
+    assert first_provider == application_agent.contract.functions.stakingProviders(0).call()
+    assert missing_provider is None
+
+
+def test_application_agent_batched_reads(agency, test_registry, staking_providers):
+    application_agent = ContractAgency.get_agent(PREApplicationAgent, registry=test_registry)
+    providers = application_agent.get_staking_providers()
+    assert set(staking_providers).issubset(providers)
+    assert list(application_agent.swarm()) == providers
+
+    stakes = application_agent.get_authorized_stakes(staking_providers=providers)
+    assert stakes == {provider: application_agent.get_authorized_stake(staking_provider=provider) for provider in providers}
+
+    random_address = to_checksum_address(os.urandom(20))
+    operators = [application_agent.get_operator_from_staking_provider(staking_provider=providers[0]), random_address]
+    bondings = application_agent.get_staking_providers_from_operators(operator_addresses=operators)
+    assert bondings == {operators[0]: providers[0], random_address: NULL_ADDRESS}
+
+    # Active staking providers read in a batch of pages are the same as read page by page
+    n_tokens, active_providers = application_agent.get_all_active_staking_providers(pagination_size=1)
+    assert (n_tokens, active_providers) == application_agent.get_all_active_staking_providers(pagination_size=0)
+
+
+def test_active_staking_providers_batches_fall_back_to_pages(agency, test_registry, staking_providers, mocker):
+    application_agent = PREApplicationAgent(registry=test_registry)
+    expected = application_agent.get_all_active_staking_providers(pagination_size=0)
+
+    # A transient failure: batches of pages are attempted again after a while
+    batch_call = mocker.patch.object(application_agent, 'batch_call', side_effect=TimeoutError)
+    assert application_agent.get_all_active_staking_providers(pagination_size=1) == expected
+    assert application_agent.get_all_active_staking_providers(pagination_size=1) == expected
+    assert batch_call.call_count == 1  # not attempted again yet
+
+    application_agent._batched_pages_retry_at -= application_agent.BATCHED_PAGES_RETRY_INTERVAL
+    batch_call.side_effect = ContractCallBatcher.BatchingUnsupported
+    assert application_agent.get_all_active_staking_providers(pagination_size=1) == expected
+    assert batch_call.call_count == 2
+
+    # Batching is unsupported: batches of pages are not attempted again
+    assert application_agent.get_all_active_staking_providers(pagination_size=1) == expected
+    assert batch_call.call_count == 2
+
+    # The state is kept per agent
+    other_agent = PREApplicationAgent(registry=test_registry)
+    assert not other_agent._batched_pages_unsupported
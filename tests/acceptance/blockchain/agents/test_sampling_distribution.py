@@ -22,7 +22,7 @@ from itertools import permutations
 import pytest
 
 from nulink.blockchain.eth.actors import Operator
-from nulink.blockchain.eth.agents import WeightedSampler, ContractAgency, PREApplicationAgent
+from nulink.blockchain.eth.agents import WeightedSampler, ContractAgency, PREApplicationAgent, StakingProvidersReservoir
 from nulink.blockchain.eth.constants import NULL_ADDRESS
 from nulink.blockchain.eth.signers.software import Web3Signer
 from nulink.config.constants import TEMPORARY_DOMAIN
@@ -137,3 +137,40 @@ def test_weighted_sampler(sample_size):
         # A little too forgiving for samples with smaller probabilities,
         # but can go up to 0.5 on occasion.
         assert abs(test_prob - ref_prob) * samples**0.5 < 1
+
+
+def test_weighted_sampler_draws_match_a_linear_scan():
+    rng = random.Random(456)
+    weights = {element: rng.choice([0, 1, 7, 1000, rng.randint(1, 10**9)]) for element in range(1000)}
+    nonzero = sum(1 for weight in weights.values() if weight)
+
+    # Reference: the cumulative weights, scanned and rewritten after each draw
+    def reference_samples(seed, quantity):
+        seeded_rng = random.Random(seed)
+        remaining = dict(weights)
+        samples = []
+        for _ in range(quantity):
+            position = seeded_rng.randint(0, sum(remaining.values()) - 1)
+            for element, weight in remaining.items():
+                if position < weight:
+                    break
+                position -= weight
+            samples.append(element)
+            remaining[element] = 0
+        return samples
+
+    for seed in range(10):
+        sampler = WeightedSampler(weights)
+        seeded_rng = random.Random(seed)
+        # Elements drawn in an earlier invocation are not drawn again
+        samples = sampler.sample_no_replacement(seeded_rng, 20) + sampler.sample_no_replacement(seeded_rng, 30)
+        assert samples == reference_samples(seed, 50)
+        assert len(set(samples)) == 50
+        assert all(weights[element] for element in samples)
+    assert nonzero > 50
+
+
+def test_staking_providers_reservoir_is_seedable():
+    staking_providers = {f'0x{i:040x}': i for i in range(1, 100)}
+    draws = [StakingProvidersReservoir(staking_providers, rng=random.Random(789)).draw(10) for _ in range(2)]
+    assert draws[0] == draws[1]
@@ -16,6 +16,8 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
 import pytest
 from eth_utils import to_checksum_address
 from twisted.logger import LogLevel, globalLogPublisher
@@ -25,6 +27,7 @@ from nulink.acumen.perception import FleetSensor
 from nulink.blockchain.eth.agents import ContractAgency, PREApplicationAgent
 from nulink.characters.unlawful import Vladimir
 from nulink.config.constants import TEMPORARY_DOMAIN
+from nulink.network.middleware import RestMiddleware
 from tests.utils.middleware import MockRestMiddleware
 
 
@@ -133,3 +136,15 @@ def test_alice_refuses_to_select_node_unless_ursula_is_valid(blockchain_alice,
     with pytest.raises(vladimir.InvalidNode):
         idle_blockchain_policy._ping_node(address=vladimir.checksum_address,
                                           network_middleware=blockchain_alice.network_middleware)
+
+
+def test_alice_skips_nodes_whose_verification_times_out(blockchain_alice,
+                                                        idle_blockchain_policy,
+                                                        blockchain_ursulas,
+                                                        mocker):
+    target = list(blockchain_ursulas)[3]
+    mocker.patch.object(blockchain_alice.node_verifier, 'wait_for', side_effect=FutureTimeoutError)
+    with pytest.raises(RestMiddleware.Unreachable):
+        idle_blockchain_policy._ping_node(address=target.checksum_address,
+                                          network_middleware=blockchain_alice.network_middleware,
+                                          timeout=1)
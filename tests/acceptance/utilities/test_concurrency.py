@@ -16,12 +16,13 @@
 """
 
 import random
+import threading
 import time
 from typing import Iterable, Tuple
 
 import pytest
 
-from nulink.utilities.concurrency import WorkerPool
+from nulink.utilities.concurrency import WorkerExecutor, WorkerPool
 
 
 class AllAtOnceFactory:
@@ -389,3 +390,98 @@ def test_buggy_factory_raises_on_join():
         pool.join()
     with pytest.raises(Exception, match="Buggy factory"):
         pool.join()
+
+
+def test_pools_share_a_bounded_executor():
+    """
+    Tests that the workers of several pools run on the same few threads of their executor.
+    """
+
+    executor = WorkerExecutor(max_threads=4)
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+    threads = set()
+
+    def worker(value):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+            threads.add(threading.get_ident())
+        time.sleep(0.1)
+        with lock:
+            running -= 1
+        return value
+
+    pools = [WorkerPool(worker, AllAtOnceFactory(list(range(8))), target_successes=8, timeout=10,
+                        threadpool_size=4, executor=executor)
+             for _ in range(3)]
+    for pool in pools:
+        pool.start()
+    for pool in pools:
+        assert len(pool.block_until_target_successes()) == 8
+        pool.join()
+
+    assert max_running <= 4
+    assert len(threads) <= 4
+    # Finished pools do not wait for their timeout in the executor
+    assert executor.stats()['timers'] == 0
+    assert not executor._timers
+
+
+def test_nested_pools_do_not_starve(join_worker_pool):
+    """
+    Tests that pools started by workers do not wait for the threads their parent pool holds.
+    """
+
+    executor = WorkerExecutor(max_threads=2)
+
+    def inner_worker(value):
+        return value
+
+    def outer_worker(value):
+        inner_pool = WorkerPool(inner_worker, AllAtOnceFactory([value]), target_successes=1, timeout=5,
+                                executor=executor)
+        inner_pool.start()
+        try:
+            return inner_pool.block_until_target_successes()[value]
+        finally:
+            inner_pool.join()
+
+    pool = WorkerPool(outer_worker, AllAtOnceFactory(list(range(4))), target_successes=4, timeout=5,
+                      threadpool_size=2, executor=executor)
+    join_worker_pool(pool)
+    pool.start()
+    assert pool.block_until_target_successes() == {value: value for value in range(4)}
+
+
+def test_empty_batches_with_stagger_timeout(join_worker_pool):
+    """
+    With a stagger timeout, an empty batch means that there are no values to add yet, not that
+    the factory is out of values; without one, it stops the production of values.
+    """
+
+    class LateFactory:
+
+        def __init__(self):
+            self.calls = 0
+
+        def __call__(self, _successes):
+            self.calls += 1
+            if self.calls == 1:
+                return []
+            elif self.calls == 2:
+                return [1]
+            return None
+
+    pool = WorkerPool(lambda value: value, LateFactory(), target_successes=1, timeout=5, stagger_timeout=0.05)
+    join_worker_pool(pool)
+    pool.start()
+    assert pool.block_until_target_successes() == {1: 1}
+
+    pool = WorkerPool(lambda value: value, LateFactory(), target_successes=1, timeout=5)
+    pool.start()
+    with pytest.raises(WorkerPool.OutOfValues):
+        pool.block_until_target_successes()
+    pool.join()
@@ -21,6 +21,7 @@ import lmdb
 import pytest
 from eth_utils.crypto import keccak
 
+from nulink.blockchain.eth.staking import StakingStatusCache
 from nulink.control.emitters import WebEmitter
 from nulink.crypto.powers import TransactingPower
 from nulink.network.nodes import Learner
@@ -199,3 +200,10 @@ def mock_get_external_ip_from_url_source(session_mocker):
 def disable_check_grant_requirements(session_mocker):
     target = 'nulink.characters.lawful.Alice._check_grant_requirements'
     session_mocker.patch(target, return_value=MOCK_IP_ADDRESS)
+
+
+@pytest.fixture(autouse=True)
+def reset_staking_status_cache():
+    # Tests bond operators and stake on the fly; don't let validations see earlier states
+    yield
+    StakingStatusCache.reset()
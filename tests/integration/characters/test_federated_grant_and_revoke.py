@@ -122,3 +122,25 @@ def test_revocation(federated_alice, federated_bob):
     # Try to revoke the already revoked policy
     receipt, already_revoked = federated_alice.revoke(policy)
     assert len(already_revoked) == 3
+
+
+def test_ursula_caches_verified_kfrags_until_revocation(federated_alice, federated_bob, federated_ursulas):
+    policy_end_datetime = maya.now() + datetime.timedelta(days=5)
+    label = b"kfrag cache test"
+    policy = federated_alice.grant(federated_bob, label, threshold=2, shares=3, expiration=policy_end_datetime)
+    treasure_map = federated_bob._decrypt_treasure_map(policy.treasure_map, policy.publisher_verifying_key)
+
+    ursula = [u for u in federated_ursulas if u.canonical_address in treasure_map.destinations][0]
+    encrypted_kfrag = treasure_map.destinations[ursula.canonical_address]
+    hits = ursula.kfrag_cache.hits
+
+    # Repeated requests for the same policy don't decrypt and verify the kfrag again
+    verified_kfrag = ursula._decrypt_kfrag(encrypted_kfrag, treasure_map.hrac, policy.publisher_verifying_key)
+    assert ursula._decrypt_kfrag(encrypted_kfrag, treasure_map.hrac, policy.publisher_verifying_key) is verified_kfrag
+    assert ursula.kfrag_cache.hits == hits + 1
+
+    # Revoking the policy forgets its kfrags
+    entries = len(ursula.kfrag_cache)
+    ursula.revoke_policy(treasure_map.hrac)
+    assert treasure_map.hrac in ursula.revoked_policies
+    assert len(ursula.kfrag_cache) == entries - 1
@@ -15,13 +15,15 @@ You should have received a copy of the GNU Affero General Public License
 along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import sqlite3
 import tempfile
+from pathlib import Path
 
 import pytest
 
 from nulink.characters.lawful import Ursula
 from nulink.config.constants import TEMPORARY_DOMAIN
-from nulink.config.storages import ForgetfulNodeStorage, TemporaryFileBasedNodeStorage
+from nulink.config.storages import EmbeddedNodeStorage, ForgetfulNodeStorage, TemporaryFileBasedNodeStorage
 from nulink.policy.payment import FreeReencryptions
 from nulink.utilities.networking import LOOPBACK_ADDRESS
 from tests.utils.ursula import MOCK_URSULA_STARTING_PORT
@@ -143,3 +145,66 @@ class TestTemporaryFileBasedNodeStorage(BaseTestNodeStorageBackends):
         restored_nodes = self.storage_backend.all(federated_only=True, certificates_only=False)
         total_nodes = 1 + ADDITIONAL_NODES_TO_LEARN_ABOUT
         assert total_nodes - 2 == len(restored_nodes)
+
+
+class TestEmbeddedNodeStorage(BaseTestNodeStorageBackends):
+    storage_backend = EmbeddedNodeStorage(storage_root=Path(tempfile.mkdtemp()),
+                                          character_class=BaseTestNodeStorageBackends.character_class,
+                                          federated_only=BaseTestNodeStorageBackends.federated_only)
+    storage_backend.initialize()
+
+    def test_bulk_save_and_indexes(self, light_ursula):
+        nodes = [Ursula(rest_host=LOOPBACK_ADDRESS,
+                        db_filepath=MOCK_URSULA_DB_FILEPATH,
+                        rest_port=port,
+                        federated_only=True,
+                        domain=TEMPORARY_DOMAIN,
+                        payment_method=FreeReencryptions())
+                 for port in range(MOCK_URSULA_STARTING_PORT, MOCK_URSULA_STARTING_PORT + 3)]
+        assert self.storage_backend.store_nodes_metadata(nodes) == 3
+        assert len(self.storage_backend.all(federated_only=True)) == 3
+
+        # Nodes can be found by their checksum address or host, besides their stamp
+        node = nodes[1]
+        for key in (dict(stamp=node.stamp),
+                    dict(stamp=bytes(node.stamp).hex()),
+                    dict(checksum_address=node.checksum_address)):
+            assert self.storage_backend.get(federated_only=True, **key).checksum_address == node.checksum_address
+        assert self.storage_backend.get(federated_only=True, host=LOOPBACK_ADDRESS).rest_interface.host == LOOPBACK_ADDRESS
+        with pytest.raises(EmbeddedNodeStorage.UnknownNode):
+            self.storage_backend.get(federated_only=True, host='203.0.113.1')
+        with pytest.raises(ValueError):
+            self.storage_backend.get(federated_only=True, stamp=node.stamp, host=LOOPBACK_ADDRESS)
+
+        # Certificates are only kept in the database
+        host, port = light_ursula.rest_interface.host, light_ursula.rest_interface.port
+        certificate_filepath = self.storage_backend.store_node_certificate(certificate=light_ursula.certificate,
+                                                                           port=port)
+        assert certificate_filepath == self.storage_backend.db_filepath
+        assert not self.storage_backend.generate_certificate_filepath(host=host, port=port).exists()
+        assert self.storage_backend.load_node_certificate(host=host, port=port) == light_ursula.certificate
+        assert self.storage_backend.all(federated_only=True, certificates_only=True) == {light_ursula.certificate}
+
+        # Saving a node again replaces it
+        self.storage_backend.store_nodes_metadata(nodes)
+        assert len(self.storage_backend.all(federated_only=True)) == 3
+
+        self.storage_backend.clear()
+        assert not self.storage_backend.all(federated_only=True)
+        assert not self.storage_backend.all(federated_only=True, certificates_only=True)
+        assert self.storage_backend.load_node_certificate(host=host, port=port) is None
+
+    def test_invalid_metadata(self, light_ursula):
+        self._read_and_write_metadata(ursula=light_ursula, node_storage=self.storage_backend)
+
+        # Let's break the metadata of a node (but not the version)
+        with sqlite3.connect(str(self.storage_backend.db_filepath)) as connection:
+            connection.execute('UPDATE nodes SET metadata = ? WHERE stamp = ?',
+                               (make_header(b'NdMd', 1, 0) + b'invalid', bytes(light_ursula.stamp)))
+
+        with pytest.raises(EmbeddedNodeStorage.InvalidNodeMetadata):
+            self.storage_backend.get(stamp=light_ursula.stamp, federated_only=True)
+
+        restored_nodes = self.storage_backend.all(federated_only=True)
+        assert len(restored_nodes) == ADDITIONAL_NODES_TO_LEARN_ABOUT
+        self.storage_backend.clear()
@@ -18,6 +18,7 @@ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
 
 import contextlib
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 from unittest.mock import patch
 
@@ -128,3 +129,18 @@ def test_alice_verifies_ursula_just_in_time(fleet_of_highperf_mocked_ursulas,
     # otherwise `grant()` would fail.
     assert total_verified >= 30
     _POLICY_PRESERVER.append(policy)
+
+
+def test_provisional_nodes_failing_verification_are_forgotten(lonely_ursula_maker, mocker):
+    learner, node = lonely_ursula_maker(quantity=2)
+    mark_as = mocker.spy(learner.known_nodes, 'mark_as')
+
+    # Not only for network failures and suspicious activity
+    mocker.patch.object(node, 'verify_node', side_effect=Teacher.WrongMode("oops"))
+    assert learner._verify_provisional_node(node) is False
+    mark_as.assert_called_once()
+
+    # Sampled nodes whose verification takes too long are not used
+    mocker.patch.object(learner.node_verifier, 'wait_for', side_effect=FutureTimeoutError)
+    with pytest.raises(Teacher.VerificationTimedOut):
+        learner.verify_sampled_node(node, timeout=1)
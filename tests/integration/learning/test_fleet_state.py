@@ -151,3 +151,137 @@ def test_teacher_records_new_fleet_state_upon_hearing_about_new_node(federated_u
 
     # ...is the same as the learner, because both have learned about everybody at this point.
     assert teacher_fleet_state_checksum == states[-1].checksum
+
+
+def test_state_is_recorded_once_after_learning_from_several_teachers(federated_ursulas, lonely_ursula_maker):
+    _lonely_ursula_maker = partial(lonely_ursula_maker, quantity=1)
+    lonely_learner = _lonely_ursula_maker().pop()
+    states = lonely_learner.known_nodes._archived_states
+
+    some_ursulas_in_the_fleet = list(federated_ursulas)[:3]
+    for ursula in some_ursulas_in_the_fleet:
+        lonely_learner.remember_node(ursula, record_fleet_state=False)
+    lonely_learner.load_seednodes(record_fleet_state=True)
+    lonely_learner.known_nodes.record_fleet_state()
+    states_before = len(states)
+
+    result = lonely_learner.learn_from_teacher_nodes(fanout=3)
+    assert result not in (None, FLEET_STATES_MATCH)
+
+    # All the teachers were contacted in one round, and the merged announcements produce a single new state.
+    assert len(states) == states_before + 1
+    assert states[-1].population == len(federated_ursulas) + 1
+
+    # Every teacher that responded has its own fleet state recorded, not the merged one.
+    for ursula in some_ursulas_in_the_fleet:
+        status = lonely_learner.known_nodes.status_info(ursula.checksum_address)
+        teacher_fleet_state = lonely_learner._teacher_fleet_states[ursula.checksum_address]
+        assert bytes(status.recorded_fleet_state.checksum) == teacher_fleet_state
+        assert status.recorded_fleet_state.population >= len(federated_ursulas)
+
+
+def test_checksum_is_carried_over_when_fleet_state_is_unchanged(federated_ursulas):
+    some_ursula = list(federated_ursulas)[0]
+    fleet_sensor = some_ursula.known_nodes
+
+    state_before = fleet_sensor.current_state
+    checksum_before = fleet_sensor.checksum
+    archived_states_before = len(fleet_sensor._archived_states)
+
+    diff = fleet_sensor.record_fleet_state()
+    assert diff.empty()
+
+    # A new state is recorded, but the checksum isn't recalculated.
+    assert fleet_sensor.current_state is not state_before
+    assert fleet_sensor.checksum is checksum_before
+    assert len(fleet_sensor._archived_states) == archived_states_before
+
+
+def test_teacher_serves_nodes_updated_since_a_fleet_state(federated_ursulas, lonely_ursula_maker):
+    teacher = list(federated_ursulas)[0]
+    fleet_sensor = teacher.known_nodes
+
+    checksum_before = bytes(fleet_sensor.checksum)
+    assert fleet_sensor.nodes_updated_since(checksum_before) == []
+
+    newcomer = lonely_ursula_maker(quantity=1).pop()
+    teacher.remember_node(newcomer)
+
+    updated_nodes = fleet_sensor.nodes_updated_since(checksum_before)
+    assert [node.checksum_address for node in updated_nodes] == [newcomer.checksum_address]
+
+    # There is no history for a fleet state the teacher has never been in.
+    assert fleet_sensor.nodes_updated_since(bytes(32)) is None
+
+
+def test_learner_asks_teacher_for_updates_since_the_last_exchange(federated_ursulas, lonely_ursula_maker):
+    lonely_learner = lonely_ursula_maker(quantity=1).pop()
+    teacher = list(federated_ursulas)[0]
+    lonely_learner.remember_node(teacher)
+
+    lonely_learner.learn_from_teacher_node()
+    assert teacher.checksum_address in lonely_learner._teacher_fleet_states
+    assert len(lonely_learner.known_nodes) >= len(federated_ursulas)
+
+    # The teacher learns about a new node, and the learner only gets told about that one.
+    newcomer = lonely_ursula_maker(quantity=1).pop()
+    teacher.remember_node(newcomer)
+    lonely_learner._current_teacher_node = teacher
+    sprouts = lonely_learner.learn_from_teacher_node()
+
+    announced = {sprout.checksum_address for sprout in sprouts}
+    assert announced == {teacher.checksum_address, newcomer.checksum_address}
+    assert newcomer.checksum_address in lonely_learner.known_nodes
+
+
+def test_learner_relearns_forgotten_nodes(federated_ursulas, lonely_ursula_maker):
+    lonely_learner = lonely_ursula_maker(quantity=1).pop()
+    teacher = list(federated_ursulas)[0]
+    lonely_learner.remember_node(teacher)
+    lonely_learner.learn_from_teacher_node()
+    assert teacher.checksum_address in lonely_learner._teacher_fleet_states
+
+    # The learner forgets a node the teacher still knows about...
+    forgotten = next(node for node in lonely_learner.known_nodes if node.checksum_address != teacher.checksum_address)
+    lonely_learner.known_nodes.mark_as(forgotten.InvalidNode, forgotten)
+    lonely_learner.known_nodes.record_fleet_state()
+    assert forgotten.checksum_address not in lonely_learner.known_nodes
+
+    # ... so it asks for all of the teacher's known nodes, not only for the updated ones, and learns it again.
+    lonely_learner._current_teacher_node = teacher
+    sprouts = lonely_learner.learn_from_teacher_node()
+    assert forgotten.checksum_address in {sprout.checksum_address for sprout in sprouts}
+    assert forgotten.checksum_address in lonely_learner.known_nodes
+    assert teacher.checksum_address in lonely_learner._teacher_fleet_states
+
+
+def test_teacher_signs_metadata_responses_once_per_fleet_state(federated_ursulas, lonely_ursula_maker):
+    teacher = list(federated_ursulas)[0]
+
+    all_known_nodes = teacher.bytestring_of_known_nodes()
+    no_known_nodes = teacher.bytestring_of_no_known_nodes()
+    assert all_known_nodes != no_known_nodes
+
+    # Recording an unchanged fleet state keeps the signed responses.
+    teacher.known_nodes.record_fleet_state()
+    assert teacher.bytestring_of_known_nodes() is all_known_nodes
+    assert teacher.bytestring_of_no_known_nodes() is no_known_nodes
+
+    # Learning about a new node invalidates them.
+    newcomer = lonely_ursula_maker(quantity=1).pop()
+    teacher.remember_node(newcomer)
+    assert teacher.bytestring_of_known_nodes() != all_known_nodes
+    assert bytes(newcomer.metadata()) in teacher.bytestring_of_known_nodes()
+
+
+def test_teacher_does_not_cache_responses_for_unknown_fleet_states(federated_ursulas):
+    teacher = list(federated_ursulas)[0]
+    metadata_responses_before = dict(teacher.known_nodes._metadata_responses)
+
+    for i in range(10):
+        assert teacher.bytestring_of_nodes_updated_since(i.to_bytes(32, 'big')) is None
+    assert teacher.known_nodes._metadata_responses == metadata_responses_before
+
+    checksum = bytes(teacher.known_nodes.checksum)
+    response = teacher.bytestring_of_nodes_updated_since(checksum)
+    assert teacher.bytestring_of_nodes_updated_since(checksum) is response
@@ -0,0 +1,53 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+import pytest_twisted
+
+from nulink.characters.lawful import Ursula
+from nulink.network.async_middleware import AsyncRestMiddleware
+from nulink.network.middleware import RestMiddleware
+
+
+@pytest_twisted.inlineCallbacks
+def test_async_middleware_requests_over_pinned_tls(lonely_ursula_maker):
+    node = lonely_ursula_maker(quantity=1).pop()
+    node_deployer = node.get_deployer()
+
+    node_deployer.addServices()
+    node_deployer.catalogServers(node_deployer.hendrix)
+    node_deployer.start()
+
+    middleware = AsyncRestMiddleware()
+    client = middleware.client
+    host, port = node.rest_interface.host, node.rest_interface.port
+    try:
+        node_metadata_bytes = yield middleware.node_information(host=host, port=port)
+        assert Ursula.from_metadata_bytes(node_metadata_bytes) == node
+
+        # The certificate was fetched once, and is pinned for the following requests
+        assert client.certificates.stats()['refreshes'] == 1
+        response = yield client.get(path='ping', host=host, port=port)
+        assert response.status_code == 200
+        assert response.json()['version']
+        assert client.certificates.stats()['refreshes'] == 1
+
+        # Same errors as RestMiddleware
+        with pytest.raises(RestMiddleware.NotFound):
+            yield client.get(path='no_such_endpoint', host=host, port=port)
+    finally:
+        yield client.close()
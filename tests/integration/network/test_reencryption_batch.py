@@ -0,0 +1,80 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from http import HTTPStatus
+
+import pytest
+from nucypher_core import ReencryptionRequest, ReencryptionResponse
+
+from nulink.characters.lawful import Enrico
+from nulink.crypto.powers import DecryptingPower
+from nulink.network.middleware import RestMiddleware
+from nulink.network.protocols import pack_batch, pack_batch_results, unpack_batch, unpack_batch_results
+from tests.utils.middleware import MockRestMiddleware
+
+
+def test_batch_envelopes():
+    items = [b'', b'a', b'\x00' * 300]
+    assert unpack_batch(pack_batch(items)) == items
+    assert unpack_batch(pack_batch([])) == []
+    with pytest.raises(ValueError):
+        unpack_batch(pack_batch(items)[:-1])
+
+    results = [(HTTPStatus.OK, b'cfrags'), (HTTPStatus.PAYMENT_REQUIRED, b'unpaid')]
+    assert unpack_batch_results(pack_batch_results(results)) == results
+
+
+def test_split_reencryption_batch():
+    reencryption_requests = [bytes(100)] * 5
+    batches = RestMiddleware.split_reencryption_batch(reencryption_requests, max_batch_size=2)
+    assert batches == [[bytes(100)] * 2, [bytes(100)] * 2, [bytes(100)]]
+
+    batches = RestMiddleware.split_reencryption_batch(reencryption_requests, max_batch_length=250)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_reencrypt_batch(enacted_federated_policy, federated_treasure_map, federated_bob, federated_ursulas):
+    ursula_address, encrypted_kfrag = list(federated_treasure_map.destinations.items())[0]
+    ursula = [u for u in federated_ursulas if u.canonical_address == ursula_address][0]
+
+    def make_request():
+        enrico = Enrico(policy_encrypting_key=enacted_federated_policy.public_key)
+        capsule = enrico.encrypt_message(b"plaintext").capsule
+        return ReencryptionRequest(hrac=federated_treasure_map.hrac,
+                                   capsules=[capsule],
+                                   encrypted_kfrag=encrypted_kfrag,
+                                   bob_verifying_key=federated_bob.stamp.as_umbral_pubkey(),
+                                   publisher_verifying_key=federated_treasure_map.publisher_verifying_key)
+
+    reencryption_requests = [make_request(), make_request()]
+    batch = [bytes(reencryption_requests[0]), b'not a reencryption request', bytes(reencryption_requests[1])]
+    results = MockRestMiddleware().reencrypt_batch(ursula, batch)
+
+    # Each request of the batch gets its own result, in order
+    assert [result.status_code for result in results] == [HTTPStatus.OK, HTTPStatus.BAD_REQUEST, HTTPStatus.OK]
+    with pytest.raises(RestMiddleware.BadRequest):
+        RestMiddleware.raise_for_status(results[1], request="reencrypt")
+
+    for reencryption_request, result in zip(reencryption_requests, (results[0], results[2])):
+        reencryption_response = ReencryptionResponse.from_bytes(result.content)
+        verified_cfrags = reencryption_response.verify(
+            capsules=reencryption_request.capsules,
+            alice_verifying_key=enacted_federated_policy.publisher_verifying_key,
+            ursula_verifying_key=ursula.stamp.as_umbral_pubkey(),
+            policy_encrypting_key=enacted_federated_policy.public_key,
+            bob_encrypting_key=federated_bob.public_keys(DecryptingPower))
+        assert len(verified_cfrags) == 1
@@ -25,31 +25,52 @@ from threading import Lock
 from constant_sorrow.constants import MOCK_DB
 
 
-def mock_lmdb_open(db_path: Path, map_size=10485760):
+def mock_lmdb_open(db_path: Path, map_size=10485760, max_dbs=0):
     if db_path == MOCK_DB:
         return MockEnvironment()
     else:
-        return lmdb.Environment(str(db_path), map_size=map_size)
+        return lmdb.Environment(str(db_path), map_size=map_size, max_dbs=max_dbs)
+
+
+class MockDatabase:
+
+    def __init__(self, name):
+        self.name = name
 
 
 class MockEnvironment:
 
     def __init__(self):
-        self._storage = {}
+        self._storage = {None: {}}  # {database name: {key: value}}
         self._lock = Lock()
 
     @contextmanager
     def begin(self, write=False):
-        with self._lock:
-            with MockTransaction(self, write=write) as tx:
+        if write:
+            # Like LMDB, there is a single writer at a time
+            with self._lock:
+                with MockTransaction(self, write=write) as tx:
+                    yield tx
+        else:
+            # ...but readers work on a snapshot and do not block it
+            with self._lock:
+                tx = MockTransaction(self, write=write)
+            with tx:
                 yield tx
 
+    def open_db(self, key=None, create=True, **kwargs):
+        with self._lock:
+            if key not in self._storage:
+                assert create
+                self._storage[key] = {}
+        return MockDatabase(key)
+
 
 class MockTransaction:
 
     def __init__(self, env, write=False):
         self._env = env
-        self._storage = dict(env._storage)
+        self._storage = {name: dict(database) for name, database in env._storage.items()}
         self._write = write
         self._invalid = False
 
@@ -64,35 +85,44 @@ class MockTransaction:
         else:
             self.commit()
 
-    def put(self, key, value, overwrite=True):
+    def _database(self, db):
+        return self._storage[db.name if db is not None else None]
+
+    def put(self, key, value, overwrite=True, db=None):
         if self._invalid:
             raise lmdb.Error()
         assert self._write
-        if not overwrite and key in self._storage:
+        database = self._database(db)
+        if not overwrite and key in database:
             return False
-        self._storage[key] = value
+        database[key] = value
         return True
 
-    def get(self, key, default=None):
+    def get(self, key, default=None, db=None):
         if self._invalid:
             raise lmdb.Error()
-        return self._storage.get(key, default)
+        return self._database(db).get(key, default)
 
-    def delete(self, key):
+    def delete(self, key, db=None):
         if self._invalid:
             raise lmdb.Error()
         assert self._write
-        if key in self._storage:
-            del self._storage[key]
+        database = self._database(db)
+        if key in database:
+            del database[key]
             return True
         else:
             return False
 
+    def stat(self, db=None):
+        return dict(entries=len(self._database(db)))
+
     def commit(self):
         if self._invalid:
             raise lmdb.Error()
         self._invalidate()
-        self._env._storage = self._storage
+        if self._write:
+            self._env._storage = self._storage
 
     def abort(self):
         self._invalidate()
@@ -101,17 +131,17 @@ class MockTransaction:
     def _invalidate(self):
         self._invalid = True
 
-    def cursor(self):
-        return MockCursor(self)
+    def cursor(self, db=None):
+        return MockCursor(self, db)
 
 
 class MockCursor:
 
-    def __init__(self, tx):
-        self._tx = tx
+    def __init__(self, tx, db=None):
+        self._database = tx._database(db)
         # TODO: assuming here that the keys are not changed while the cursor exists.
         # Any way to enforce it?
-        self._keys = list(sorted(tx._storage))
+        self._keys = list(sorted(self._database))
         self._pos = None
 
     def set_range(self, key):
@@ -127,4 +157,10 @@ class MockCursor:
         return self._keys[self._pos]
 
     def iternext(self, keys=True, values=True):
-        return iter(self._keys[self._pos:])
+        for key in self._keys[self._pos:]:
+            if keys and values:
+                yield key, self._database[key]
+            elif values:
+                yield self._database[key]
+            else:
+                yield key
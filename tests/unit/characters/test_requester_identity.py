@@ -0,0 +1,56 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import pytest
+from nucypher_core.umbral import SecretKey
+
+from nulink.characters.requesters import RequesterIdentity
+from nulink.crypto.powers import DecryptingPower, NoDecryptingPower, NoTransactingPower, SigningPower, \
+    TransactingPower
+
+
+def test_requester_identity_public_keys():
+    verifying_key = SecretKey.random().public_key()
+    encrypting_key = SecretKey.random().public_key()
+
+    bob = RequesterIdentity(verifying_key=verifying_key, encrypting_key=encrypting_key)
+    assert bob.public_keys(SigningPower) == verifying_key
+    assert bob.public_keys(DecryptingPower) == encrypting_key
+    assert bob.stamp.as_umbral_pubkey() == verifying_key
+    with pytest.raises(NoTransactingPower):
+        bob.public_keys(TransactingPower)
+
+    # A reencryption request only carries Bob's verifying key
+    bob = RequesterIdentity(verifying_key=verifying_key)
+    assert bob.public_keys(SigningPower) == verifying_key
+    with pytest.raises(NoDecryptingPower):
+        bob.public_keys(DecryptingPower)
+
+
+def test_requester_identities_are_reused():
+    verifying_key = SecretKey.random().public_key()
+    encrypting_key = SecretKey.random().public_key()
+
+    bob = RequesterIdentity.from_public_keys(verifying_key=verifying_key, encrypting_key=encrypting_key)
+    assert RequesterIdentity.from_public_keys(verifying_key=verifying_key, encrypting_key=encrypting_key) is bob
+
+    stranger = RequesterIdentity.from_public_keys(verifying_key=verifying_key)
+    assert stranger is not bob
+    assert stranger != bob
+    assert stranger == RequesterIdentity(verifying_key=verifying_key)
+    assert hash(stranger) == hash(bob)
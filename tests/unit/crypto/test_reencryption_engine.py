@@ -0,0 +1,77 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import pytest
+from nucypher_core import MessageKit
+from nucypher_core.umbral import CapsuleFrag, SecretKey, Signer, VerificationError, generate_kfrags
+
+from nulink.crypto.reencryption import ReencryptionEngine
+
+
+@pytest.fixture(scope='module')
+def delegation():
+    delegating_sk = SecretKey.random()
+    receiving_sk = SecretKey.random()
+    signing_sk = SecretKey.random()
+    kfrags = generate_kfrags(delegating_sk=delegating_sk,
+                             receiving_pk=receiving_sk.public_key(),
+                             signer=Signer(signing_sk),
+                             threshold=1,
+                             shares=1,
+                             sign_delegating_key=False,
+                             sign_receiving_key=False)
+    capsules = [MessageKit(delegating_sk.public_key(), f'message {i}'.encode()).capsule for i in range(40)]
+    keys = dict(verifying_pk=signing_sk.public_key(),
+                delegating_pk=delegating_sk.public_key(),
+                receiving_pk=receiving_sk.public_key())
+    return kfrags[0], capsules, keys
+
+
+@pytest.mark.parametrize('mode', ReencryptionEngine.MODES)
+def test_reencryption_engine_keeps_capsule_order(delegation, mode):
+    kfrag, capsules, keys = delegation
+    engine = ReencryptionEngine(mode=mode, workers=2, chunk_size=8, inline_threshold=10)
+    try:
+        cfrags = engine.reencrypt(kfrag=kfrag, capsules=capsules)
+    finally:
+        engine.shutdown()
+
+    assert len(cfrags) == len(capsules)
+    for capsule, cfrag in zip(capsules, cfrags):
+        CapsuleFrag.from_bytes(bytes(cfrag)).verify(capsule, **keys)
+    with pytest.raises(VerificationError):
+        CapsuleFrag.from_bytes(bytes(cfrags[0])).verify(capsules[1], **keys)
+
+    if mode == ReencryptionEngine.SERIAL:
+        assert engine.stats()['inline_requests'] == 1
+    else:
+        assert engine.stats()['pooled_requests'] == 1
+
+
+def test_small_requests_are_reencrypted_inline(delegation):
+    kfrag, capsules, keys = delegation
+    engine = ReencryptionEngine(mode=ReencryptionEngine.THREADS, inline_threshold=10)
+    cfrags = engine.reencrypt(kfrag=kfrag, capsules=capsules[:3])
+    assert len(cfrags) == 3
+    assert engine._executor is None
+    assert engine.stats()['inline_requests'] == 1
+
+
+def test_unknown_reencryption_mode():
+    with pytest.raises(ValueError):
+        ReencryptionEngine(mode='gpu')
@@ -32,6 +32,13 @@ class TestRecord(DatastoreRecord):
             decode=lambda val: datetime.fromisoformat(val.decode()))
 
 
+class IndexedRecord(DatastoreRecord):
+    _owner = RecordField(bytes)
+    _number = RecordField(int)
+
+    _indexes = {'owner': ('owner', 'number')}
+
+
 def test_datastore_create():
     temp_path = tempfile.mkdtemp()
     storage = datastore.Datastore(temp_path)
@@ -258,6 +265,148 @@ def test_datastore_query_by(mock_or_real_datastore):
             assert len(records) == 'this never gets executed'
 
 
+def test_datastore_query_by_index(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+
+    # Owners are chosen so that their keys would not sort like them without escaping
+    records = [(b'bob', 3), (b'alice', 2), (b'bob', -1), (b'bob\x00', 0), (b'alice', 5), (b'bob', 12)]
+    for record_id, (owner, number) in enumerate(records):
+        with storage.describe(IndexedRecord, record_id, writeable=True) as record:
+            record.owner = owner
+            record.number = number
+
+    def query(**kwargs):
+        with storage.query_by(IndexedRecord, index='owner', **kwargs) as results:
+            return [(result.owner, result.number) for result in results]
+
+    # Records are returned in the order of the index
+    assert query() == sorted(records)
+    assert query(start=(b'bob',), end=(b'bob',)) == [(b'bob', -1), (b'bob', 3), (b'bob', 12)]
+    assert query(start=(b'bob', 0), end=(b'bob', 3)) == [(b'bob', 3)]
+    assert query(start=(b'bob', 0), end=(b'bob',)) == [(b'bob', 3), (b'bob', 12)]
+    assert query(start=(b'alice',), limit=3) == [(b'alice', 2), (b'alice', 5), (b'bob', -1)]
+    assert query(end=(b'bob',), filter_func=lambda record: record.number % 2) == [(b'alice', 5), (b'bob', -1), (b'bob', 3)]
+    with pytest.raises(datastore.RecordNotFound):
+        query(start=(b'carol',))
+
+    # Indexes follow updates and deletions
+    with storage.describe(IndexedRecord, 0, writeable=True) as record:
+        record.number = 4
+    with storage.describe(IndexedRecord, 5, writeable=True) as record:
+        record.delete()
+    assert query(start=(b'bob',), end=(b'bob',)) == [(b'bob', -1), (b'bob', 4)]
+
+    # The indexes are not mistaken for records
+    with storage.query_by(IndexedRecord) as results:
+        assert len(results) == 5
+    with pytest.raises(ValueError):
+        with storage.query_by(IndexedRecord, index='number'):
+            pass
+
+
+
+def test_datastore_indexes_records_written_before_their_indexes(mock_or_real_datastore, mocker):
+    storage = mock_or_real_datastore
+
+    # Records written before `IndexedRecord` had indexes
+    mocker.patch.object(IndexedRecord, '_indexes', {})
+    records = [(b'bob', 3), (b'alice', 2), (b'bob', -1)]
+    for record_id, (owner, number) in enumerate(records):
+        with storage.describe(IndexedRecord, record_id, writeable=True) as record:
+            record.owner = owner
+            record.number = number
+    with storage.describe(IndexedRecord, len(records), writeable=True) as record:
+        record.owner = b'carol'  # not indexed, without a number
+    mocker.stopall()
+
+    # The indexes are filled when they are first opened (as if the datastore had been reopened)
+    storage._Datastore__index_dbs.clear()
+    with storage.query_by(IndexedRecord, index='owner') as results:
+        assert [(result.owner, result.number) for result in results] == sorted(records)
+
+    with storage.describe(IndexedRecord, 0, writeable=True) as record:
+        record.number = 4
+    with storage.query_by(IndexedRecord, index='owner', start=(b'bob',)) as results:
+        assert [result.number for result in results] == [-1, 4]
+
+
+def test_datastore_describe_many(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+
+    # All the records are written in the same transaction
+    with storage.describe_many(IndexedRecord, range(5), writeable=True) as records:
+        for number, record in enumerate(records):
+            record.owner = b'alice'
+            record.number = number
+
+    # They are returned in the order of the IDs
+    with storage.describe_many(IndexedRecord, ['3', 1, 4]) as records:
+        assert [record.number for record in records] == [3, 1, 4]
+        with pytest.raises(TypeError):
+            records[0].number = 1
+
+    # If any write fails, none is written
+    with pytest.raises(datastore.DatastoreTransactionError):
+        with storage.describe_many(IndexedRecord, [0, 1], writeable=True) as (first, second):
+            first.number = 10
+            second.number = 'eleven'
+    with storage.describe(IndexedRecord, 0) as record:
+        assert record.number == 0
+
+    with pytest.raises(datastore.RecordNotFound):
+        with storage.describe_many(IndexedRecord, [0, 5]) as records:
+            _ = [record.number for record in records]
+
+
+def test_datastore_query_iter(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+
+    # No records, no error
+    assert list(storage.query_iter(TestRecord)) == []
+
+    # Records with several fields are only returned once
+    for i in range(7):
+        with storage.describe(TestRecord, i, writeable=True) as record:
+            record.test = f'test {i}'.encode()
+            if i % 2:
+                record.test_date = datetime(2022, 1, i + 1)
+
+    def query(**kwargs):
+        return [record._record_id for record in storage.query_iter(TestRecord, **kwargs)]
+
+    for page_size in (1, 2, 3, 7, 100):
+        assert query(page_size=page_size) == list(range(7))
+        assert query(filter_field='test_date', page_size=page_size) == [1, 3, 5]
+        assert query(filter_func=lambda record: record.test > b'test 3', page_size=page_size) == [4, 5, 6]
+
+    # Each page is read in its own transaction, so records written meanwhile may be seen
+    records = storage.query_iter(TestRecord, page_size=2)
+    assert next(records).test == b'test 0'
+    with storage.describe(TestRecord, 5, writeable=True) as record:
+        record.test = b'updated'
+    assert [record.test for record in records][-2:] == [b'updated', b'test 6']
+
+    # Records can't be written or used after their page
+    records = storage.query_iter(TestRecord, page_size=1)
+    first = next(records)
+    with pytest.raises(TypeError):
+        first.test = b'should not write'
+    next(records)
+    with pytest.raises(lmdb.Error):
+        _ = first.test
+
+    # Index ranges are read in the order of the index
+    for record_id, (owner, number) in enumerate([(b'bob', 3), (b'alice', 2), (b'bob', -1), (b'bob', 12)]):
+        with storage.describe(IndexedRecord, record_id, writeable=True) as record:
+            record.owner = owner
+            record.number = number
+    for page_size in (1, 2, 10):
+        records = storage.query_iter(IndexedRecord, index='owner', start=(b'bob',), end=(b'bob',), page_size=page_size)
+        assert [record.number for record in records] == [-1, 3, 12]
+
+    with pytest.raises(ValueError):
+        list(storage.query_iter(TestRecord, start=(b'bob',)))
+
 def test_datastore_record_read(mock_or_real_lmdb_env):
     db_env = mock_or_real_lmdb_env
     with db_env.begin() as db_tx:
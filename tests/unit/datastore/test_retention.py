@@ -0,0 +1,139 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+import maya
+import pytest
+from nucypher_core.umbral import SecretKey
+
+from nulink.datastore import datastore
+from nulink.datastore.base import DatastoreRecord, RecordField, RetentionPolicy
+from nulink.datastore.models import ReencryptionRequest
+from nulink.datastore.sweeper import DatastoreSweeper
+
+NOW = 1_600_000_000
+
+
+class ExpiringRecord(DatastoreRecord):
+    _created = RecordField(int)
+
+    _indexes = {'created': ('created',)}
+    _retention = RetentionPolicy(index='created', max_age=450)
+
+
+def populate(storage, count=10):
+    # Record #i was created i * 100 seconds ago
+    for record_id in range(count):
+        with storage.describe(ExpiringRecord, record_id, writeable=True) as record:
+            record.created = NOW - record_id * 100
+
+
+def remaining(storage):
+    try:
+        with storage.query_by(ExpiringRecord, index='created') as results:
+            return sorted(result._record_id for result in results)
+    except datastore.RecordNotFound:
+        return []
+
+
+def test_datastore_expire_by_age(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+    populate(storage)
+
+    # Nothing was old enough back then
+    assert storage.expire(ExpiringRecord, now=NOW - 500) == 0
+    assert remaining(storage) == list(range(10))
+
+    # Oldest records go first, at most `max_records` at a time
+    assert storage.expire(ExpiringRecord, now=NOW, max_records=3) == 3
+    assert remaining(storage) == list(range(7))
+    assert storage.expire(ExpiringRecord, now=NOW, max_records=3) == 2
+    assert remaining(storage) == list(range(5))
+    assert storage.expire(ExpiringRecord, now=NOW) == 0
+
+    # The deleted records are gone, along with their index entries
+    with pytest.raises(datastore.RecordNotFound):
+        with storage.describe(ExpiringRecord, 9) as record:
+            _ = record.created
+
+
+def test_datastore_expire_by_count(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+    populate(storage)
+
+    retention = RetentionPolicy(index='created', max_count=4)
+    assert storage.expire(ExpiringRecord, retention=retention, now=NOW) == 6
+    assert remaining(storage) == list(range(4))
+
+    # Both limits apply
+    retention = RetentionPolicy(index='created', max_age=150, max_count=3)
+    assert storage.expire(ExpiringRecord, retention=retention, now=NOW) == 2
+    assert remaining(storage) == [0, 1]
+
+    # No policy, no expiration
+    assert storage.expire(ExpiringRecord, retention=RetentionPolicy(index='created'), now=NOW) == 0
+    with pytest.raises(ValueError):
+        storage.expire(ExpiringRecord, retention=RetentionPolicy(index='nope', max_count=1))
+
+
+def test_reencryption_requests_are_kept_by_default(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+    bob_verifying_key = SecretKey.random().public_key()
+    for record_id in range(3):
+        with storage.describe(ReencryptionRequest, record_id, writeable=True) as record:
+            record.bob_verifying_key = bob_verifying_key
+            record.timestamp = maya.MayaDT(NOW - 365 * 24 * 60 * 60)
+
+    # Audit records are only deleted once a limit is set
+    assert storage.expire(ReencryptionRequest, now=NOW) == 0
+    with storage.query_by(ReencryptionRequest, index='timestamp') as results:
+        assert len(results) == 3
+
+    retention = ReencryptionRequest._retention._replace(max_age=30 * 24 * 60 * 60)
+    assert storage.expire(ReencryptionRequest, retention=retention, now=NOW) == 3
+
+
+def test_datastore_sweeper(mock_or_real_datastore, mocker):
+    storage = mock_or_real_datastore
+    populate(storage)
+
+    sweeper = DatastoreSweeper(datastore=storage, retention={ExpiringRecord: ExpiringRecord._retention})
+    mocker.patch.object(sweeper, 'MAX_RECORDS_PER_TRANSACTION', 2)
+    mocker.patch('time.time', return_value=NOW)
+
+    assert sweeper.sweep() == 5
+    assert remaining(storage) == list(range(5))
+    assert sweeper.sweep() == 0
+    assert sweeper.stats()['swept'] == 5
+    assert sweeper.stats()['sweeps'] == 2
+
+
+def test_datastore_compact():
+    temp_path = Path(tempfile.mkdtemp())
+    try:
+        storage = datastore.Datastore(temp_path / 'datastore')
+        populate(storage, count=100)
+        while storage.expire(ExpiringRecord, now=NOW):
+            pass
+
+        storage.compact(temp_path / 'compacted')
+        compacted = datastore.Datastore(temp_path / 'compacted')
+        assert remaining(compacted) == list(range(5))
+    finally:
+        shutil.rmtree(temp_path)
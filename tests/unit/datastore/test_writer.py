@@ -0,0 +1,109 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from nulink.datastore import datastore
+from nulink.datastore.base import DatastoreRecord, RecordField
+from nulink.datastore.writer import BufferedRecordWriter
+
+
+class AuditRecord(DatastoreRecord):
+    __test__ = False    # For pytest
+
+    _message = RecordField(bytes)
+
+
+def read_messages(storage, count):
+    messages = []
+    for record_id in range(count):
+        with storage.describe(AuditRecord, record_id) as record:
+            messages.append(record.message)
+    return messages
+
+
+def test_datastore_write_records(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+
+    written = storage.write_records((AuditRecord, record_id, dict(message=b'%d' % record_id)) for record_id in range(3))
+    assert written == 3
+    assert read_messages(storage, 3) == [b'0', b'1', b'2']
+
+    # Records are written all together, or not at all
+    with pytest.raises(datastore.DatastoreTransactionError):
+        storage.write_records([(AuditRecord, 3, dict(message=b'3')), (AuditRecord, 4, dict(message='not bytes'))])
+    with pytest.raises(datastore.RecordNotFound):
+        read_messages(storage, 4)
+
+
+@pytest.mark.parametrize('durability', BufferedRecordWriter.DURABILITY_MODES)
+def test_buffered_record_writer(mock_or_real_datastore, durability):
+    storage = mock_or_real_datastore
+    writer = BufferedRecordWriter(storage, durability=durability, flush_interval=0.01)
+
+    threads = [threading.Thread(target=writer.write, args=(AuditRecord, i), kwargs=dict(message=b'%d' % i))
+               for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush()
+
+    assert read_messages(storage, 20) == [b'%d' % i for i in range(20)]
+    stats = writer.stats()
+    assert stats['written'] == 20
+    assert stats['failed'] == stats['dropped'] == 0
+    assert 1 <= stats['batches'] <= 20
+
+    writer.close()
+    with pytest.raises(BufferedRecordWriter.WriterClosed):
+        writer.write(AuditRecord, 20, message=b'20')
+
+
+def test_buffered_record_writer_failures(mock_or_real_datastore):
+    storage = mock_or_real_datastore
+
+    writer = BufferedRecordWriter(storage, durability=BufferedRecordWriter.SYNC)
+    with pytest.raises(datastore.DatastoreTransactionError):
+        writer.write(AuditRecord, 0, message='not bytes')
+    assert writer.stats()['failed'] == 1
+    writer.close()
+
+    # A bad record fails alone, not the records committed with it
+    writer = BufferedRecordWriter(storage, durability=BufferedRecordWriter.SYNC)
+    batch = [(AuditRecord, 0, dict(message=b'0'), Future()),
+             (AuditRecord, 1, dict(message='not bytes'), Future()),
+             (AuditRecord, 2, dict(message=b'2'), Future())]
+    writer._commit(batch)
+    assert batch[0][3].result() is None
+    with pytest.raises(datastore.DatastoreTransactionError):
+        batch[1][3].result()
+    assert batch[2][3].result() is None
+    with storage.describe(AuditRecord, 2) as record:
+        assert record.message == b'2'
+    assert writer.stats()['failed'] == 1
+    assert writer.stats()['written'] == 2
+    writer.close()
+
+    # Under load, best-effort writers drop records instead of blocking
+    writer = BufferedRecordWriter(storage, durability=BufferedRecordWriter.BEST_EFFORT, max_queue_size=1)
+    writer._thread = threading.current_thread()  # keeps the queue from being consumed
+    writer.write(AuditRecord, 0, message=b'0')
+    writer.write(AuditRecord, 1, message=b'1')
+    assert writer.stats()['dropped'] == 1
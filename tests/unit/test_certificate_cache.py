@@ -0,0 +1,149 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+
+import pytest
+from cryptography.hazmat.primitives import hashes
+
+from nulink.config.storages import EmbeddedNodeStorage, ForgetfulNodeStorage
+from nulink.crypto.tls import generate_self_signed_certificate
+from nulink.network.certificates import CertificateCache
+
+HOST = '127.0.0.1'
+PORT = 9151
+
+
+class Peer:
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.certificate, _private_key = generate_self_signed_certificate(host=HOST)
+        self.fetches = 0
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def fetch(self, host, port):
+        self.fetches += 1
+        self.fetching.set()
+        self.release.wait()
+        filepath = self.storage.store_node_certificate(certificate=self.certificate, port=port)
+        return self.certificate, filepath
+
+    def rotate_certificate(self):
+        self.certificate, _private_key = generate_self_signed_certificate(host=HOST)
+
+
+@pytest.fixture(params=['forgetful', 'embedded'])
+def storage(request, tmp_path):
+    if request.param == 'embedded':
+        storage = EmbeddedNodeStorage(storage_root=tmp_path)
+        storage.initialize()
+        return storage
+    return ForgetfulNodeStorage(parent_dir=tmp_path)
+
+
+def test_certificate_is_read_from_storage_once(storage, mocker):
+    peer = Peer(storage)
+    storage.store_node_certificate(certificate=peer.certificate, port=PORT)
+
+    cache = CertificateCache(storage=storage, fetch=peer.fetch)
+    read_from_storage = mocker.spy(cache, '_load')
+    pinned_certificate = cache.get(host=HOST, port=PORT)
+    assert pinned_certificate.fingerprint == peer.certificate.fingerprint(hashes.SHA256())
+    assert cache.get(host=HOST, port=PORT) is pinned_certificate
+    assert read_from_storage.call_count == 1
+    assert peer.fetches == 0
+    assert cache.stats() == dict(certificates=1, hits=1, misses=1, refreshes=0)
+
+
+def test_certificate_lookup_in_memory_only(storage):
+    peer = Peer(storage)
+    storage.store_node_certificate(certificate=peer.certificate, port=PORT)
+
+    cache = CertificateCache(storage=storage, fetch=peer.fetch)
+    assert cache.get(host=HOST, port=PORT, load=False) is None
+    pinned_certificate = cache.get(host=HOST, port=PORT)
+    assert cache.get(host=HOST, port=PORT, load=False) is pinned_certificate
+    assert cache.stats() == dict(certificates=1, hits=1, misses=1, refreshes=0)
+
+
+def test_unknown_certificate_is_fetched(storage):
+    peer = Peer(storage)
+    cache = CertificateCache(storage=storage, fetch=peer.fetch)
+    assert cache.get(host=HOST, port=PORT) is None
+
+    pinned_certificate = cache.refresh(host=HOST, port=PORT)
+    assert pinned_certificate.certificate is peer.certificate
+    assert cache.get(host=HOST, port=PORT) is pinned_certificate
+    assert peer.fetches == 1
+
+
+def test_stale_certificate_is_refreshed_once(storage):
+    peer = Peer(storage)
+    cache = CertificateCache(storage=storage, fetch=peer.fetch)
+    stale = cache.refresh(host=HOST, port=PORT)
+
+    peer.rotate_certificate()
+    peer.release.clear()
+    peer.fetching.clear()
+    results = []
+
+    def refresh():
+        results.append(cache.refresh(host=HOST, port=PORT, stale=stale))
+
+    threads = [threading.Thread(target=refresh) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    peer.fetching.wait(timeout=5)
+    peer.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert peer.fetches == 2
+    assert len(results) == 3
+    assert all(result is results[0] for result in results)
+    assert results[0] is not stale
+    assert results[0].certificate is peer.certificate
+
+    # Already replaced; nothing to fetch
+    assert cache.refresh(host=HOST, port=PORT, stale=stale) is results[0]
+    assert peer.fetches == 2
+
+
+def test_fetch_errors_are_raised(storage):
+    def unreachable(host, port):
+        raise ConnectionRefusedError
+
+    cache = CertificateCache(storage=storage, fetch=unreachable)
+    with pytest.raises(ConnectionRefusedError):
+        cache.refresh(host=HOST, port=PORT)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_certificate_is_dropped(storage):
+    peer = Peer(storage)
+    cache = CertificateCache(storage=storage, fetch=peer.fetch, max_certificates=2)
+    for port in (1, 2, 3):
+        cache.refresh(host=HOST, port=port)
+    assert len(cache) == 2
+
+    cache.get(host=HOST, port=3)
+    assert cache.stats()['misses'] == 0
+    cache.get(host=HOST, port=1)  # read back from storage
+    assert cache.stats()['misses'] == 1
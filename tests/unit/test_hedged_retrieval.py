@@ -0,0 +1,130 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+
+from nulink.network.retrieval import HedgedRetrievalStrategy, LatencyRecord
+from nulink.utilities.concurrency import WorkerPool
+
+ADDRESSES = [f'0x{i:040x}' for i in range(10)]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def test_latency_record_deadline():
+    latencies = LatencyRecord(percentile=90, default_deadline=2)
+    for latency in range(LatencyRecord.MIN_SAMPLES - 1):
+        latencies.record(latency / 10)
+    assert latencies.deadline() == 2  # not enough latencies yet
+
+    for latency in range(LatencyRecord.MIN_SAMPLES - 1, 100):
+        latencies.record(latency / 10)
+    assert latencies.deadline() == LatencyRecord.MAX_DEADLINE
+
+    latencies = LatencyRecord(percentile=50)
+    for latency in range(100):
+        latencies.record(latency / 100)
+    assert latencies.deadline() == 0.5
+
+
+def test_hedged_strategy_hedges_late_requests():
+    clock = FakeClock()
+    latencies = LatencyRecord(default_deadline=1)
+    strategy = HedgedRetrievalStrategy(list(ADDRESSES), threshold=3, hedge=1, latencies=latencies, clock=clock)
+
+    batch = strategy(0)
+    assert batch == ADDRESSES[:4]
+    for address in batch:
+        strategy.started(address)
+    assert strategy(0) == []
+
+    # Two requests succeed, one fails: it is replaced to keep `threshold + hedge` requests going
+    strategy.finished(ADDRESSES[0], success=True)
+    strategy.finished(ADDRESSES[1], success=True)
+    strategy.finished(ADDRESSES[2], success=False)
+    # Successes count even before the worker pool records them
+    assert strategy(0) == [ADDRESSES[4]]
+    strategy.started(ADDRESSES[4])
+
+    # Requests pending for longer than the deadline are hedged, once
+    clock.now += 1
+    assert strategy(2) == [ADDRESSES[5], ADDRESSES[6]]
+    assert strategy(2) == []
+    assert strategy.hedged == 2
+
+    # Out of Ursulas
+    for address in ADDRESSES[3:7]:
+        strategy.finished(address, success=False)
+    assert strategy(2) == ADDRESSES[7:9]
+    strategy.finished(ADDRESSES[7], success=False)
+    assert strategy(2) == ADDRESSES[9:]
+    assert strategy(2) is None
+
+
+def test_hedged_strategy_limits_running_hedges():
+    clock = FakeClock()
+    latencies = LatencyRecord(default_deadline=1)
+    strategy = HedgedRetrievalStrategy(list(ADDRESSES), threshold=3, hedge=1, latencies=latencies,
+                                       max_hedges=1, clock=clock)
+
+    batch = strategy(0)
+    for address in batch:
+        strategy.started(address)
+
+    # All four requests are late, but only one hedge runs at a time
+    clock.now += 1
+    assert strategy(0) == [ADDRESSES[4]]
+    strategy.started(ADDRESSES[4])
+    assert strategy(0) == []
+
+    # Once the hedge is done, the next late request gets hedged
+    strategy.finished(ADDRESSES[4], success=False)
+    assert strategy(0) == [ADDRESSES[5]]
+    assert strategy.hedged == 2
+
+
+def test_hedged_retrieval_does_not_wait_for_slow_ursulas():
+    delays = {address: 0.05 for address in ADDRESSES}
+    slow = ADDRESSES[0]
+    delays[slow] = 5
+    latencies = LatencyRecord(default_deadline=0.2)
+    strategy = HedgedRetrievalStrategy(list(ADDRESSES), threshold=3, hedge=0, latencies=latencies)
+
+    def worker(address):
+        strategy.started(address)
+        time.sleep(delays[address])
+        strategy.finished(address, success=True)
+        return address
+
+    pool = WorkerPool(worker, strategy, target_successes=3, timeout=10, stagger_timeout=0.05,
+                      threadpool_size=len(ADDRESSES))
+    t_start = time.monotonic()
+    pool.start()
+    successes = pool.block_until_target_successes()
+    pool.cancel()
+    t_end = time.monotonic()
+
+    assert len(successes) == 3
+    assert slow not in successes
+    assert t_end - t_start < 1
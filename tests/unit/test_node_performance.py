@@ -0,0 +1,114 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from nulink.blockchain.eth.agents import StakingProvidersReservoir
+from nulink.network.performance import NodePerformanceTracker
+from nulink.policy.reservoir import MergedReservoir, PrefetchStrategy
+
+NODES = [f'0x{i:040x}' for i in range(6)]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def tracker(clock):
+    return NodePerformanceTracker(alpha=0.5, clock=clock)
+
+
+def test_latencies_and_errors_are_averaged(tracker, clock):
+    tracker.record_success(NODES[0], latency=1)
+    tracker.record_success(NODES[0], latency=3)
+    assert tracker[NODES[0]].latency == 2
+    assert tracker[NODES[0]].last_seen == clock.now
+
+    with pytest.raises(RuntimeError):
+        with tracker.measure(NODES[0]):
+            raise RuntimeError
+    assert tracker[NODES[0]].error_rate == 0.5
+    assert tracker[NODES[0]].requests == 3
+
+    with tracker.measure(NODES[1]):
+        clock.now += 0.5
+    assert tracker[NODES[1]].latency == 0.5
+    assert tracker.score(NODES[1]) == 0.5
+
+
+def test_nodes_are_ranked_by_expected_cost(tracker, clock):
+    tracker.record_success(NODES[0], latency=2)  # slow
+    tracker.record_success(NODES[1], latency=0.1)  # fast
+    tracker.record_failure(NODES[2])  # flaky
+    tracker.record_success(NODES[3], latency=0.5)
+
+    # Nodes without records are ranked like an average node, keeping their order
+    assert tracker.rank(NODES) == [NODES[1], NODES[3], NODES[4], NODES[5], NODES[0], NODES[2]]
+
+    # Old records are ignored
+    clock.now += NodePerformanceTracker.STALE_AFTER + 1
+    assert tracker.rank(NODES) == NODES
+    assert tracker.stats() == dict(nodes=4, fresh=0, requests=4)
+
+
+def test_prefetch_strategy_keeps_the_stake_weighted_sample(tracker):
+    for node in NODES[1:]:
+        tracker.record_failure(node)
+    handpicked = [f'0x{99:040x}']
+    reservoir = MergedReservoir(handpicked, StakingProvidersReservoir({node: 1 for node in NODES}))
+    strategy = PrefetchStrategy(reservoir, need_successes=3, rank=tracker.rank)
+
+    # Exactly as many nodes as needed are drawn, only reordered
+    batch = strategy(0)
+    assert batch[0] == handpicked[0]
+    assert len(batch) == 3
+    assert not strategy._standby
+    assert len(reservoir.reservoir) == len(NODES) - 2
+    assert batch[1:] == tracker.rank(batch[1:])
+
+
+def test_prefetch_strategy_hands_out_the_best_ranked_nodes_first(tracker):
+    for node in NODES[1:]:
+        tracker.record_failure(node)
+    handpicked = [f'0x{99:040x}']
+    reservoir = MergedReservoir(handpicked, StakingProvidersReservoir({node: 1 for node in NODES}))
+    strategy = PrefetchStrategy(reservoir, need_successes=3, rank=tracker.rank, lookahead=2)
+
+    batch = strategy(0)
+    assert batch[0] == handpicked[0]
+    assert len(batch) == 3
+    assert len(strategy._standby) == 2
+
+    # All the sampled nodes are eventually handed out
+    drawn = set(batch)
+    while True:
+        batch = strategy(2)
+        if batch is None:
+            break
+        drawn.update(batch)
+    assert drawn == set(NODES) | set(handpicked)
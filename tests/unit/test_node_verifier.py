@@ -0,0 +1,123 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+
+import pytest
+
+from nulink.network.verification import NodeVerifier
+
+
+class Node:
+
+    def __init__(self, checksum_address, valid=True):
+        self.checksum_address = checksum_address
+        self.valid = valid
+
+
+class Verifier:
+
+    def __init__(self):
+        self.verified = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, node):
+        self.started.set()
+        self.release.wait(timeout=10)
+        self.verified.append(node.checksum_address)
+        if isinstance(node.valid, Exception):
+            raise node.valid
+        return node.valid
+
+
+@pytest.fixture()
+def verifier():
+    verify = Verifier()
+    node_verifier = NodeVerifier(verify=verify, workers=1)
+    yield node_verifier
+    verify.release.set()
+    node_verifier.stop()
+
+
+def test_nodes_are_verified_once_in_order(verifier):
+    blocker = Node('0xblocker')
+    verifier.submit(blocker)  # occupies the only worker
+    assert verifier.verify.started.wait(timeout=10)
+    nodes = [Node(f'0x{i}') for i in range(3)]
+    futures = [verifier.submit(node) for node in nodes]
+    assert verifier.submit(nodes[0]) is futures[0]
+    assert len(verifier) == 3
+
+    verifier.verify.release.set()
+    assert all(future.result(timeout=10) for future in futures)
+    assert verifier.verify.verified == ['0xblocker', '0x0', '0x1', '0x2']
+    assert verifier.stats() == dict(pending=0, verified=4, failed=0, prioritized=0)
+
+
+def test_sampled_nodes_jump_the_queue(verifier):
+    verifier.submit(Node('0xblocker'))
+    assert verifier.verify.started.wait(timeout=10)
+    nodes = [Node(f'0x{i}') for i in range(3)]
+    for node in nodes:
+        verifier.submit(node)
+    future = verifier.prioritize(nodes[2])
+
+    verifier.verify.release.set()
+    assert future.result(timeout=10) is True
+    assert verifier.wait_for(nodes[0], timeout=10) in (True, None)
+    assert verifier.verify.verified[:2] == ['0xblocker', '0x2']
+
+    # Nodes that are not waiting for verification are not waited for
+    assert verifier.prioritize(Node('0xunknown')) is None
+    assert verifier.wait_for(Node('0xunknown')) is None
+
+
+def test_nodes_being_verified_are_waited_for(verifier):
+    node = Node('0x0', valid=False)
+    future = verifier.submit(node)
+    assert verifier.verify.started.wait(timeout=10)
+    assert len(verifier) == 0  # no longer pending...
+
+    # ...but still waited for, and not verified again
+    assert verifier.prioritize(node) is future
+    assert verifier.submit(node) is future
+    threading.Timer(0.1, verifier.verify.release.set).start()
+    assert verifier.wait_for(node, timeout=10) is False
+    assert verifier.verify.verified == ['0x0']
+    assert verifier.wait_for(node) is None
+
+
+def test_invalid_nodes_are_reported(verifier):
+    verifier.verify.release.set()
+    assert verifier.submit(Node('0xinvalid', valid=False)).result(timeout=10) is False
+    with pytest.raises(RuntimeError):
+        verifier.submit(Node('0xbroken', valid=RuntimeError('oops'))).result(timeout=10)
+    assert verifier.stats()['failed'] == 2
+
+
+def test_stop_cancels_pending_verifications(verifier):
+    verifier.submit(Node('0xblocker'))
+    assert verifier.verify.started.wait(timeout=10)
+    future = verifier.submit(Node('0x0'))
+    verifier.stop()
+    assert future.cancelled()
+    assert len(verifier) == 0
+
+    # Nothing is verified after stopping
+    assert verifier.submit(Node('0x1')).cancelled()
+    assert len(verifier) == 0
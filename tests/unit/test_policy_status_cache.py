@@ -0,0 +1,84 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from unittest.mock import PropertyMock
+
+from nulink.policy.payment import PolicyStatusCache, SubscriptionManagerPayment
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_000_000
+
+    def __call__(self):
+        return self.now
+
+
+def test_policy_status_ttls():
+    clock = FakeClock()
+    statuses = PolicyStatusCache(active_ttl=600, inactive_ttl=30, clock=clock)
+    assert statuses.get(b'unknown') is None
+
+    statuses.record(b'paid', active=True)
+    statuses.record(b'unpaid', active=False)
+    statuses.record(b'expiring', active=True, end_timestamp=clock.now + 60)
+    statuses.record(b'expired', active=True, end_timestamp=clock.now - 1)
+    assert statuses.get(b'paid') is True
+    assert statuses.get(b'unpaid') is False
+    assert statuses.get(b'expiring') is True
+    assert statuses.get(b'expired') is None
+
+    # Unpaid policies are checked again soon, as they may be paid for at any time
+    clock.now += 31
+    assert statuses.get(b'unpaid') is None
+    assert statuses.get(b'expiring') is True
+
+    # Paid policies are not remembered past their expiration
+    clock.now += 30
+    assert statuses.get(b'expiring') is None
+    assert statuses.get(b'paid') is True
+
+
+def test_policy_payment_verification_is_cached(mocker):
+    clock = FakeClock()
+    agent = mocker.Mock()
+    agent.fetch_policy.return_value = mocker.Mock(end_timestamp=clock.now + 60)
+    mocker.patch.object(SubscriptionManagerPayment, 'agent', new_callable=PropertyMock, return_value=agent)
+
+    payment_method = SubscriptionManagerPayment(eth_provider='tester://pyevm', network='lynx', registry=mocker.Mock())
+    payment_method.policy_statuses = PolicyStatusCache(clock=clock)
+    request = mocker.Mock(hrac=b'0123456789abcdef')
+    assert payment_method.verify(payee=None, request=request)
+    assert payment_method.verify(payee=None, request=request)
+    agent.fetch_policy.assert_called_once_with(policy_id=b'0123456789abcdef')
+    agent.is_policy_active.assert_not_called()
+
+    # The policy is checked again once expired
+    clock.now += 61
+    assert not payment_method.verify(payee=None, request=request)
+    assert agent.fetch_policy.call_count == 2
+
+    # Unknown policies are not active
+    agent.fetch_policy.return_value = mocker.Mock(end_timestamp=0)
+    assert not payment_method.verify(payee=None, request=mocker.Mock(hrac=b'unknown policy!!'))
+
+    # A PolicyCreated event makes a policy active without a contract call
+    payment_method.policy_statuses.record(b'fedcba9876543210', active=True)
+    assert payment_method.verify(payee=None, request=mocker.Mock(hrac=b'fedcba9876543210'))
+    assert agent.fetch_policy.call_count == 3
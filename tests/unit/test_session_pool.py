@@ -0,0 +1,87 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from nulink.crypto.tls import generate_self_signed_certificate
+from nulink.network.certificates import PinnedCertificate
+from nulink.network.sessions import PeerSessionPool
+
+HOST = '127.0.0.1'
+
+
+def pin(port: int, host: str = HOST) -> PinnedCertificate:
+    certificate, _private_key = generate_self_signed_certificate(host=host)
+    return PinnedCertificate(host=host, port=port, certificate=certificate)
+
+
+def test_session_is_reused_for_the_same_peer():
+    pool = PeerSessionPool()
+    certificate = pin(port=9151)
+    session = pool.session(certificate=certificate)
+    assert pool.session(certificate=certificate) is session
+
+    # A different port or a different pinned certificate is a different peer
+    assert pool.session(certificate=pin(port=9152)) is not session
+    assert pool.session(certificate=pin(port=9151)) is not session
+
+    assert pool.stats() == dict(sessions=3, hits=1, misses=3, evictions=0)
+
+
+def test_least_recently_used_session_is_evicted():
+    pool = PeerSessionPool(max_sessions=2)
+    certificates = [pin(port=port) for port in (1, 2, 3)]
+    first = pool.session(certificate=certificates[0])
+    second = pool.session(certificate=certificates[1])
+    assert pool.session(certificate=certificates[0]) is first  # now the most recent
+
+    pool.session(certificate=certificates[2])
+    assert len(pool) == 2
+    assert pool.stats()['evictions'] == 1
+    assert pool.session(certificate=certificates[0]) is first
+    assert pool.session(certificate=certificates[1]) is not second
+
+
+def test_idle_sessions_are_closed(mocker):
+    pool = PeerSessionPool(idle_timeout=60)
+    certificate = pin(port=1)
+    monotonic = mocker.patch('nulink.network.sessions.time.monotonic', return_value=1000)
+    idle = pool.session(certificate=certificate)
+
+    monotonic.return_value = 1061
+    pool.session(certificate=pin(port=2))
+    assert len(pool) == 1
+    assert pool.stats()['evictions'] == 1
+    assert pool.session(certificate=certificate) is not idle
+
+
+def test_discard_peer_sessions():
+    pool = PeerSessionPool()
+    pool.session(certificate=pin(port=1))
+    pool.session(certificate=pin(port=1))  # e.g. an outdated certificate
+    pool.session(certificate=pin(port=2))
+
+    pool.discard(host=HOST, port=1)
+    assert len(pool) == 1
+
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_session_pool_must_hold_sessions():
+    with pytest.raises(ValueError):
+        PeerSessionPool(max_sessions=0)
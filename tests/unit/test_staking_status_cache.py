@@ -0,0 +1,211 @@
+"""
+This file is part of nucypher.
+
+nucypher is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+nucypher is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from nulink.blockchain.eth.agents import PREApplicationAgent
+from nulink.blockchain.eth.constants import NULL_ADDRESS
+from nulink.blockchain.eth.staking import StakingSnapshotTracker, StakingStatusCache
+
+PROVIDERS = [f'0x{i:040x}' for i in range(1, 4)]
+OPERATORS = [f'0x{i:040x}' for i in range(11, 14)]
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_000_000
+
+    def __call__(self):
+        return self.now
+
+
+class FakeApplicationAgent:
+
+    def __init__(self):
+        self.blockchain = SimpleNamespace(client=SimpleNamespace(block_number=100))
+        self.bondings = dict(zip(OPERATORS, PROVIDERS))
+        self.bonding_events = []  # [(block, staking provider, operator)]
+        self.get_all_active_staking_providers = Mock(side_effect=self._active_staking_providers)
+        self.get_staking_provider_from_operator = Mock(side_effect=lambda operator_address: self.bondings.get(operator_address, NULL_ADDRESS))
+        self.is_authorized = Mock(return_value=False)
+        self.events = dict(OperatorBonded=self._operator_bonded_events)
+
+    def _active_staking_providers(self):
+        providers = {provider: 100 for provider in self.bondings.values()}
+        return sum(providers.values()), providers
+
+    def _operator_bonded_events(self, from_block, to_block):
+        return [SimpleNamespace(args=dict(stakingProvider=provider, operator=operator))
+                for block, provider, operator in self.bonding_events
+                if from_block <= block <= to_block]
+
+    def bond(self, staking_provider, operator):
+        for bonded_operator, provider in list(self.bondings.items()):
+            if provider == staking_provider:
+                del self.bondings[bonded_operator]
+        if operator != NULL_ADDRESS:
+            self.bondings[operator] = staking_provider
+        self.bonding_events.append((self.blockchain.client.block_number, staking_provider, operator))
+
+    def mine(self, blocks):
+        self.blockchain.client.block_number += blocks
+
+
+@pytest.fixture()
+def agent():
+    return FakeApplicationAgent()
+
+
+@pytest.fixture()
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture()
+def staking_statuses(agent, clock):
+    return StakingStatusCache(agent=agent, max_age=10, clock=clock)
+
+
+def advance(agent, clock, blocks):
+    agent.mine(blocks)
+    clock.now += StakingStatusCache.BLOCK_NUMBER_TTL
+
+
+def test_staking_statuses_are_read_in_bulk(agent, clock, staking_statuses):
+    for provider in PROVIDERS:
+        assert staking_statuses.is_staking(provider)
+    assert agent.get_all_active_staking_providers.call_count == 1
+    agent.is_authorized.assert_not_called()
+
+    # Other staking providers are looked up one by one, and remembered
+    stranger = f'0x{99:040x}'
+    assert not staking_statuses.is_staking(stranger)
+    assert not staking_statuses.is_staking(stranger)
+    agent.is_authorized.assert_called_once_with(staking_provider=stranger)
+
+    # ...until they are more than `max_age` blocks old
+    advance(agent, clock, 11)
+    assert staking_statuses.is_staking(PROVIDERS[0])
+    assert not staking_statuses.is_staking(stranger)
+    assert agent.get_all_active_staking_providers.call_count == 2
+    assert agent.is_authorized.call_count == 2
+
+
+def test_bondings_are_kept_up_to_date_with_events(agent, clock, staking_statuses):
+    for operator, provider in zip(OPERATORS, PROVIDERS):
+        assert staking_statuses.get_staking_provider(operator) == provider
+    assert agent.get_staking_provider_from_operator.call_count == len(OPERATORS)
+
+    # Bondings do not go stale
+    advance(agent, clock, 100)
+    for operator, provider in zip(OPERATORS, PROVIDERS):
+        assert staking_statuses.get_staking_provider(operator) == provider
+    assert agent.get_staking_provider_from_operator.call_count == len(OPERATORS)
+
+    # A staking provider bonds a new operator, and another one unbonds hers
+    new_operator = f'0x{21:040x}'
+    advance(agent, clock, 1)
+    staking_statuses.snapshot()
+    agent.bond(staking_provider=PROVIDERS[0], operator=new_operator)
+    agent.bond(staking_provider=PROVIDERS[1], operator=NULL_ADDRESS)
+    advance(agent, clock, 1)
+
+    assert staking_statuses.get_staking_provider(new_operator) == PROVIDERS[0]
+    assert staking_statuses.get_staking_provider(OPERATORS[0]) == NULL_ADDRESS
+    assert staking_statuses.get_staking_provider(OPERATORS[1]) == NULL_ADDRESS
+    assert staking_statuses.get_staking_provider(OPERATORS[2]) == PROVIDERS[2]
+    assert agent.get_staking_provider_from_operator.call_count == len(OPERATORS)
+    assert staking_statuses.stats()['events'] == 2
+
+    # The snapshot of active staking providers is due after a bonding,
+    # and remains in use meanwhile, except for the (un)bonded staking providers
+    assert staking_statuses.snapshot_stale
+    assert not staking_statuses.is_staking(PROVIDERS[1])
+    assert staking_statuses.is_staking(PROVIDERS[2])
+    assert agent.get_all_active_staking_providers.call_count == 1
+    agent.is_authorized.assert_called_once_with(staking_provider=PROVIDERS[1])
+
+    staking_statuses.refresh_snapshot()
+    assert not staking_statuses.snapshot_stale
+    assert agent.get_all_active_staking_providers.call_count == 2
+
+
+def test_lookups_are_not_held_up_by_event_scans(agent, clock, staking_statuses):
+    assert staking_statuses.get_staking_provider(OPERATORS[0]) == PROVIDERS[0]
+    scanning = threading.Event()
+    release = threading.Event()
+    operator_bonded_events = agent.events['OperatorBonded']
+
+    def slow_operator_bonded_events(from_block, to_block):
+        scanning.set()
+        release.wait(timeout=10)
+        return operator_bonded_events(from_block=from_block, to_block=to_block)
+
+    agent.events['OperatorBonded'] = slow_operator_bonded_events
+    advance(agent, clock, 1)
+    agent.bond(staking_provider=PROVIDERS[0], operator=NULL_ADDRESS)
+    sync = threading.Thread(target=staking_statuses.sync)
+    sync.start()
+    try:
+        assert scanning.wait(timeout=10)
+        # The current bondings are used meanwhile
+        assert staking_statuses.get_staking_provider(OPERATORS[0]) == PROVIDERS[0]
+    finally:
+        release.set()
+        sync.join()
+    assert staking_statuses.get_staking_provider(OPERATORS[0]) == NULL_ADDRESS
+
+
+def test_bondings_are_read_again_after_a_long_gap(agent, clock, staking_statuses):
+    staking_statuses.get_staking_provider(OPERATORS[0])
+    advance(agent, clock, StakingStatusCache.MAX_EVENTS_GAP + 1)
+    staking_statuses.get_staking_provider(OPERATORS[0])
+    assert agent.get_staking_provider_from_operator.call_count == 2
+
+
+def test_staking_provider_reservoirs_are_made_from_the_snapshot(agent, staking_statuses):
+    reservoir = staking_statuses.get_staking_provider_reservoir(without=[PROVIDERS[0]])
+    assert set(reservoir.draw(2)) == set(PROVIDERS[1:])
+    assert len(staking_statuses.get_staking_provider_reservoir()) == len(PROVIDERS)
+    with pytest.raises(PREApplicationAgent.NotEnoughStakingProviders):
+        staking_statuses.get_staking_provider_reservoir(without=PROVIDERS)
+    assert agent.get_all_active_staking_providers.call_count == 1
+
+
+def test_staking_snapshot_tracker(agent, clock, staking_statuses):
+    tracker = StakingSnapshotTracker(staking_statuses=staking_statuses)
+    assert tracker.refresh()
+    assert not tracker.refresh()
+
+    # The snapshot is read again when half its maximum age has passed...
+    advance(agent, clock, 5)
+    assert tracker.refresh()
+    advance(agent, clock, 1)
+    assert not tracker.refresh()
+
+    # ...or when an operator is (un)bonded
+    advance(agent, clock, 1)
+    agent.bond(staking_provider=PROVIDERS[0], operator=NULL_ADDRESS)
+    advance(agent, clock, 1)
+    assert tracker.refresh()
+    assert PROVIDERS[0] not in staking_statuses.snapshot().staking_providers
+    assert agent.get_all_active_staking_providers.call_count == 3
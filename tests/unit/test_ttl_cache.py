@@ -0,0 +1,73 @@
+"""
+ This file is part of nucypher.
+
+ nucypher is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ nucypher is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+
+ You should have received a copy of the GNU Affero General Public License
+ along with nucypher.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from nulink.utilities.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire():
+    clock = Clock()
+    cache = TTLCache(max_entries=10, ttl=60, clock=clock)
+    cache.put('policy', 'kfrag')
+    cache.put('unpaid policy', False, ttl=5)
+
+    clock.now += 5
+    assert cache.get('policy') == 'kfrag'
+    assert cache.get('unpaid policy') is None
+    assert 'unpaid policy' not in cache
+
+    clock.now += 55
+    assert cache.get('policy') is None
+    assert cache.stats() == dict(entries=0, hits=1, misses=2, evictions=0, expirations=2, hit_rate=1 / 3)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.put(1, 'one')
+    cache.put(2, 'two')
+    assert cache.get(1) == 'one'  # now the most recent
+
+    cache.put(3, 'three')
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) == 'one'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_purge_entries():
+    cache = TTLCache(max_entries=10, ttl=60)
+    for key in (('a', 1), ('a', 2), ('b', 1)):
+        cache.put(key, key)
+
+    assert cache.purge(lambda key: key[0] == 'a') == 2
+    assert len(cache) == 1
+    assert cache.pop(('b', 1)) == ('b', 1)
+    assert cache.pop(('b', 1), default='gone') == 'gone'
+
+
+def test_cache_must_hold_entries():
+    with pytest.raises(ValueError):
+        TTLCache(max_entries=0, ttl=60)
@@ -110,7 +110,8 @@ class MockRestMiddlewareForLargeFleetTests(MockRestMiddleware):
     def get_nodes_via_rest(self,
                            node,
                            fleet_state_checksum,
-                           announce_nodes=None):
+                           announce_nodes=None,
+                           since_fleet_state=None):
         response_bytes = node.bytestring_of_known_nodes()
         r = Response(response_bytes)
         r.content = r.data